@@ -0,0 +1,896 @@
+"""
+Benchmark del Python SDK para Sistema de Inventario PYMES
+
+Levanta un servidor local que imita los endpoints de api-specs/openapi.yaml
+(con latencia, errores 429/5xx y headers de rate limit configurables) y mide
+escenarios reproducibles contra InventoryAPI, AsyncInventoryAPI y los
+receptores de webhooks: peticiones/s, latencia p50/p99, CPU y memoria pico.
+
+Uso:
+python python-sdk-benchmark.py
+python python-sdk-benchmark.py --scenarios paginated_reads,report_export --modes sync,async
+python python-sdk-benchmark.py --latency 0.005 --error-rate 0.02 --rate-limit-rate 0.01 --json
+python python-sdk-benchmark.py --serve --port 8080  # Solo el servidor simulado
+python python-sdk-benchmark.py --import-time  # Arranque en frío: import, cliente y primera petición
+"""
+
+import argparse
+import asyncio
+import gc
+import gzip
+import hashlib
+import hmac
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import py_compile
+import random
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+SDK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python-sdk.py')
+
+def load_sdk():
+    """Importa python-sdk.py (el guion del nombre impide un import normal)"""
+    spec = importlib.util.spec_from_file_location('inventory_sdk', SDK_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# ==================== SERVIDOR SIMULADO ====================
+
+class MockInventoryServer:
+    """Servidor HTTP local con datos deterministas que imita la API de inventario
+
+    Implementa autenticación, productos, stock, movimientos, reportes y su
+    exportación (con Range y gzip), alertas y webhooks. Cada petición puede
+    retrasarse ``latency`` (+ ``jitter`` aleatorio) segundos y fallar con 429
+    (``rate_limit_rate``) o 503 (``error_rate``). Con ``rate_limit`` se aplica
+    una ventana fija de ``window`` segundos y se envían los headers
+    X-RateLimit-*. Los datos y los errores dependen solo de ``seed``.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 rate_limit: int = None, window: int = 60, retry_after: float = 0.05,
+                 products: int = 2000, locations: int = 5, movements: int = 5000,
+                 seed: int = 42, request_counter: Any = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rate_limit = rate_limit
+        self.window = window
+        self.retry_after = retry_after
+        self.requests = request_counter if request_counter is not None else multiprocessing.Value('l', 0)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_start = time.time()
+        self._window_count = 0
+        self._httpd = None
+        self._thread = None
+        self._build_data(products, locations, movements, random.Random(seed))
+
+    def _build_data(self, products: int, locations: int, movements: int, rng: random.Random) -> None:
+        self.locations = [f'loc-{i:03d}' for i in range(locations)]
+        self.products = [{
+            'id': f'prod-{i:06d}',
+            'sku': f'SKU-{i:06d}',
+            'name': f'Producto {i}',
+            'categoryId': f'cat-{i % 20:02d}',
+            'unitPrice': round(rng.uniform(1000, 500000), 2),
+            'unitOfMeasure': 'unidad',
+            'isActive': i % 10 != 0
+        } for i in range(products)]
+        self.products_by_id = {p['id']: p for p in self.products}
+        self.stock = [{
+            'id': f'stock-{p["id"]}-{location}',
+            'productId': p['id'],
+            'locationId': location,
+            'quantity': float(rng.randint(0, 200)),
+            'reservedQuantity': float(rng.randint(0, 5)),
+            'minStock': 10.0,
+            'maxStock': 150.0,
+            'unitPrice': p['unitPrice'],
+            'lastUpdated': '2024-01-01T00:00:00Z'
+        } for p in self.products for location in self.locations]
+
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.movements = [{
+            'id': f'mov-{i:07d}',
+            'productId': self.products[rng.randrange(products)]['id'] if products else None,
+            'locationId': rng.choice(self.locations) if self.locations else None,
+            'movementType': rng.choice(('in', 'out', 'adjustment')),
+            'quantity': float(rng.randint(1, 20)),
+            'createdAt': (start + timedelta(minutes=7 * i)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        } for i in range(movements)]
+        self._exports = {}
+
+    # ---- Inyección de fallos y rate limit ----
+
+    def fault(self) -> Tuple[Optional[int], Dict[str, str]]:
+        """Status de error a inyectar (o None) y headers de rate limit de la respuesta"""
+        with self._lock:
+            self.requests.value += 1
+            roll = self._rng.random()
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            headers = {}
+            limited = False
+            if self.rate_limit:
+                now = time.time()
+                if now - self._window_start >= self.window:
+                    self._window_start, self._window_count = now, 0
+                self._window_count += 1
+                reset = self._window_start + self.window
+                headers = {
+                    'X-RateLimit-Limit': str(self.rate_limit),
+                    'X-RateLimit-Remaining': str(max(0, self.rate_limit - self._window_count)),
+                    'X-RateLimit-Reset': str(int(reset)),
+                    'X-RateLimit-Window': str(self.window)
+                }
+                if self._window_count > self.rate_limit:
+                    limited = True
+                    headers['Retry-After'] = str(max(1, int(reset - now)))
+
+        if delay:
+            time.sleep(delay)
+        if limited:
+            return 429, headers
+        if roll < self.rate_limit_rate:
+            return 429, {**headers, 'Retry-After': str(self.retry_after)}
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 503, headers
+        return None, headers
+
+    def export_body(self, report_type: str, format: str) -> Tuple[bytes, bytes]:
+        """Reporte exportado (CSV o JSON) y su versión gzip, generados una vez"""
+        key = (report_type, format)
+        if key not in self._exports:
+            if format == 'json':
+                body = json.dumps(self.stock).encode('utf-8')
+            else:
+                lines = ['productId,locationId,quantity,reservedQuantity,minStock,maxStock,unitPrice']
+                lines.extend(f'{s["productId"]},{s["locationId"]},{s["quantity"]},{s["reservedQuantity"]},'
+                             f'{s["minStock"]},{s["maxStock"]},{s["unitPrice"]}' for s in self.stock)
+                body = ('\n'.join(lines) + '\n').encode('utf-8')
+            self._exports[key] = (body, gzip.compress(body, 5))
+        return self._exports[key]
+
+    # ---- Ciclo de vida ----
+
+    def start(self) -> str:
+        """Arranca el servidor en un hilo y devuelve su URL base"""
+        handler = type('BoundHandler', (MockRequestHandler,), {'mock': self})
+        self._httpd = _MockHTTPServer((self.host, self.port), handler)
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.port}/api/v1'
+
+    def serve_forever(self) -> None:
+        self.start()
+        self._thread.join()
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # Ráfagas de conexiones del cliente async
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """Rutas de la API simulada (``mock`` lo asigna MockInventoryServer)"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # Headers y cuerpo van en escrituras separadas
+    mock: MockInventoryServer = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: Any = None, headers: Dict[str, str] = None) -> None:
+        body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, code: str, message: str, headers: Dict[str, str] = None) -> None:
+        self._send(status, {'code': code, 'message': message}, headers)
+
+    def _read_body(self) -> Any:
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return json.loads(body) if body else {}
+
+    def _route(self, method: str) -> None:
+        url = urlparse(self.path)
+        path = url.path[len('/api/v1'):] if url.path.startswith('/api/v1') else url.path
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        data = self._read_body() if method in ('POST', 'PUT', 'PATCH') else None
+
+        status, headers = self.mock.fault()
+        if status == 429:
+            return self._error(429, 'RATE_LIMIT_EXCEEDED', 'Demasiadas peticiones', headers)
+        if status is not None:
+            return self._error(status, 'SERVICE_UNAVAILABLE', 'Error simulado', headers)
+
+        parts = [p for p in path.split('/') if p]
+        handler = getattr(self, f'_{method.lower()}_{parts[0] if parts else "root"}'.replace('-', '_'), None)
+        if handler is None:
+            return self._error(404, 'NOT_FOUND', f'Ruta no encontrada: {path}', headers)
+        handler(parts, query, data, headers)
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def do_PUT(self):
+        self._route('PUT')
+
+    def do_PATCH(self):
+        self._route('PATCH')
+
+    def do_DELETE(self):
+        self._route('DELETE')
+
+    @staticmethod
+    def _paginate(items: List[Dict], query: Dict[str, str]) -> Dict:
+        page = max(1, int(query.get('page', 1)))
+        limit = max(1, min(1000, int(query.get('limit', 20))))
+        return {
+            'data': items[(page - 1) * limit:page * limit],
+            'pagination': {
+                'page': page,
+                'limit': limit,
+                'total': len(items),
+                'totalPages': max(1, (len(items) + limit - 1) // limit)
+            }
+        }
+
+    # ---- /auth ----
+
+    def _post_auth(self, parts, query, data, headers):
+        if parts[1:] == ['logout']:
+            return self._send(200, {'message': 'ok'}, headers)
+        tokens = {'accessToken': 'bench-access', 'refreshToken': 'bench-refresh', 'expiresIn': 3600}
+        self._send(200, {**tokens, 'user': {'id': 'user-1', 'email': 'bench@empresa.com'}}, headers)
+
+    def _get_auth(self, parts, query, data, headers):
+        self._send(200, {'id': 'user-1', 'email': 'bench@empresa.com', 'role': 'admin'}, headers)
+
+    # ---- /products ----
+
+    def _get_products(self, parts, query, data, headers):
+        mock = self.mock
+        if len(parts) == 2 and parts[1] != 'search':
+            product = mock.products_by_id.get(parts[1])
+            if product is None:
+                return self._error(404, 'PRODUCT_NOT_FOUND', 'Producto no encontrado', headers)
+            return self._send(200, product, headers)
+
+        products = mock.products
+        search = query.get('search') or query.get('q')
+        if search:
+            products = [p for p in products if search.lower() in p['name'].lower() or search in p['sku']]
+        if query.get('isActive') in ('true', 'false'):
+            active = query['isActive'] == 'true'
+            products = [p for p in products if p['isActive'] == active]
+        self._send(200, self._paginate(products, query), headers)
+
+    def _post_products(self, parts, query, data, headers):
+        if parts[1:] == ['batch']:
+            created = [{**p, 'id': f'new-{i}'} for i, p in enumerate(data.get('products', []))]
+            return self._send(201, {'products': created, 'errors': []}, headers)
+        self._send(201, {**data, 'id': 'new-product'}, headers)
+
+    def _put_products(self, parts, query, data, headers):
+        self._send(200, {**self.mock.products_by_id.get(parts[-1], {}), **(data or {})}, headers)
+
+    def _delete_products(self, parts, query, data, headers):
+        self._send(204, None, headers)
+
+    # ---- /inventory ----
+
+    def _get_inventory(self, parts, query, data, headers):
+        mock = self.mock
+        if parts[1:] == ['movements']:
+            movements = mock.movements
+            if query.get('productId'):
+                movements = [m for m in movements if m['productId'] == query['productId']]
+            if query.get('startDate'):
+                movements = [m for m in movements if m['createdAt'] >= query['startDate']]
+            return self._send(200, self._paginate(movements, query), headers)
+
+        levels = mock.stock
+        if query.get('productId'):
+            levels = [s for s in levels if s['productId'] == query['productId']]
+        if query.get('locationId'):
+            levels = [s for s in levels if s['locationId'] == query['locationId']]
+        if query.get('lowStock') == 'true':
+            levels = [s for s in levels if s['quantity'] <= s['minStock']]
+        # Según la spec /inventory/stock es una lista plana: page y limit se ignoran
+        self._send(200, levels, headers)
+
+    def _post_inventory(self, parts, query, data, headers):
+        if parts[1:] == ['stock', 'batch-update']:
+            updates = data.get('updates', [])
+            return self._send(200, {'updated': len(updates), 'referenceNumber': data.get('referenceNumber')}, headers)
+        self._send(201, {**data, 'id': 'new-movement'}, headers)
+
+    # ---- /reports ----
+
+    def _get_reports(self, parts, query, data, headers):
+        if len(parts) == 3 and parts[2] == 'export':
+            return self._send_export(parts[1], query.get('format', 'csv'), headers)
+        self._send(200, {'reportType': parts[1], 'totalProducts': len(self.mock.products),
+                         'totalLocations': len(self.mock.locations)}, headers)
+
+    def _send_export(self, report_type: str, format: str, headers: Dict[str, str]) -> None:
+        body, compressed = self.mock.export_body(report_type, format)
+        content_type = 'application/json' if format == 'json' else 'text/csv'
+        range_header = self.headers.get('Range', '')
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        headers = {**headers, 'ETag': etag}
+        if self.headers.get('If-Range') not in (None, etag):
+            range_header = ''  # El reporte cambió: se envía completo
+
+        if range_header.startswith('bytes='):
+            start = int(range_header[6:].split('-')[0] or 0)
+            if start >= len(body):
+                return self._error(416, 'RANGE_NOT_SATISFIABLE', 'Rango fuera del reporte', headers)
+            status, payload = 206, body[start:]
+            headers = {**headers, 'Content-Range': f'bytes {start}-{len(body) - 1}/{len(body)}'}
+        elif 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            status, payload = 200, compressed
+            headers = {**headers, 'Content-Encoding': 'gzip'}
+        else:
+            status, payload = 200, body
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Accept-Ranges', 'bytes')
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    # ---- /alerts y /webhooks ----
+
+    def _get_alerts(self, parts, query, data, headers):
+        low = [s for s in self.mock.stock if s['quantity'] <= s['minStock']][:100]
+        self._send(200, {'data': [{'id': f'alert-{s["id"]}', 'productId': s['productId'], 'type': 'low_stock'}
+                                  for s in low]}, headers)
+
+    def _get_webhooks(self, parts, query, data, headers):
+        self._send(200, [{'id': 'webhook-1', 'url': 'http://localhost/hook', 'events': ['*']}], headers)
+
+def _serve_in_process(options: Dict, counter: Any, ready: Any) -> None:
+    server = MockInventoryServer(request_counter=counter, **options)
+    ready.send(server.start())
+    server._thread.join()
+
+def start_server_process(request_counter: Any, **options) -> Tuple[multiprocessing.Process, str]:
+    """Arranca el servidor simulado en otro proceso para no mezclar su CPU con la del cliente"""
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve_in_process, args=(options, request_counter, child), daemon=True)
+    process.start()
+    return process, parent.recv()
+
+# ==================== MEDICIÓN ====================
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+class BenchmarkResult:
+    """Resultado de un escenario para un modo de cliente"""
+
+    def __init__(self, scenario: str, mode: str):
+        self.scenario = scenario
+        self.mode = mode
+        self.operations = 0
+        self.requests = 0
+        self.elapsed = 0.0
+        self.cpu = 0.0
+        self.peak_memory = None
+        self.latencies = []
+        self.error = None
+
+    def to_dict(self) -> Dict:
+        latencies = sorted(self.latencies)
+        return {
+            'scenario': self.scenario,
+            'mode': self.mode,
+            'operations': self.operations,
+            'requests': self.requests,
+            'elapsed': round(self.elapsed, 4),
+            'requestsPerSec': round(self.requests / self.elapsed, 1) if self.elapsed else None,
+            'operationsPerSec': round(self.operations / self.elapsed, 1) if self.elapsed else None,
+            'latencyP50Ms': round(_percentile(latencies, 50) * 1000, 3) if latencies else None,
+            'latencyP99Ms': round(_percentile(latencies, 99) * 1000, 3) if latencies else None,
+            'cpuSeconds': round(self.cpu, 4),
+            'peakMemoryMB': round(self.peak_memory / 1024 / 1024, 2) if self.peak_memory is not None else None,
+            'error': self.error
+        }
+
+def _time_requests(client: Any, latencies: List[float]) -> None:
+    """Registra la duración de cada petición HTTP del cliente (reintentos incluidos)"""
+    perform = client._perform_request
+
+    if asyncio.iscoroutinefunction(perform):
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await perform(*args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - started)
+    else:
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return perform(*args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+    client._perform_request = timed
+
+def measure(scenario: str, mode: str, run: Callable[[List[float]], int], request_counter: Any,
+            trace_memory: bool = True) -> BenchmarkResult:
+    """Ejecuta ``run(latencies) -> operaciones`` midiendo tiempo, CPU, memoria y peticiones"""
+    result = BenchmarkResult(scenario, mode)
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    requests_before = request_counter.value
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+    try:
+        result.operations = run(result.latencies)
+    except Exception as e:
+        result.error = f'{type(e).__name__}: {e}'
+    result.elapsed = time.perf_counter() - started
+    result.cpu = time.process_time() - cpu_before
+    result.requests = request_counter.value - requests_before
+    if trace_memory:
+        result.peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+# ==================== ARRANQUE EN FRÍO ====================
+
+# Dependencias y módulos de la librería estándar que el SDK solo importa al usarlos
+DEFERRED_MODULES = ('requests', 'asyncio', 'aiohttp', 'httpx', 'numpy', 'pandas',
+                    'concurrent.futures', 'csv', 'decimal', 'gzip', 'hashlib', 'hmac',
+                    'queue', 'socket', 'sqlite3')
+
+COLD_START_SCRIPT = """
+import importlib.util, json, sys, time
+started = time.perf_counter()
+modules_before = len(sys.modules)
+for name in {preload!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+spec = importlib.util.spec_from_file_location('inventory_sdk', {path!r})
+sdk = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(sdk)
+imported = time.perf_counter()
+modules_after_import = len(sys.modules)
+client = sdk.InventoryAPI(base_url={base_url!r}, api_key='bench-key')
+constructed = time.perf_counter()
+client.get_products(limit=1)
+finished = time.perf_counter()
+print(json.dumps({{'import': imported - started, 'init': constructed - imported,
+                  'firstRequest': finished - constructed, 'total': finished - started,
+                  'importedModules': modules_after_import - modules_before,
+                  'modulesAfterFirstRequest': len(sys.modules) - modules_before,
+                  'loaded': [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+def cold_start(base_url: str, runs: int) -> List[Dict]:
+    """Mide en procesos nuevos el import del SDK, la creación del cliente y la primera petición
+    
+    ``eager`` importa antes las dependencias diferidas, como hacía el SDK al
+    cargarse; ``lazy`` es el comportamiento actual.
+    """
+    py_compile.compile(SDK_PATH)  # Medir con bytecode en cache, como un paquete instalado
+    rows = []
+    for mode, preload in (('eager', DEFERRED_MODULES), ('lazy', ())):
+        script = COLD_START_SCRIPT.format(preload=preload, path=SDK_PATH, base_url=base_url, 
+                                          deferred=DEFERRED_MODULES)
+        samples = []
+        for _ in range(runs + 1):  # La primera ejecución solo calienta la cache del sistema de archivos
+            output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+            samples.append(json.loads(output.stdout))
+        samples = samples[1:]
+        row = {'mode': mode, 'runs': runs}
+        for key in ('import', 'init', 'firstRequest', 'total'):
+            row[key + 'Ms'] = round(_percentile(sorted(sample[key] for sample in samples), 50) * 1000, 2)
+        # Crecimiento de sys.modules; en ``eager`` incluye los módulos precargados
+        row['sdkModules'] = samples[-1]['importedModules']
+        row['modulesAfterFirstRequest'] = samples[-1]['modulesAfterFirstRequest']
+        row['loadedAfterFirstRequest'] = ','.join(samples[-1]['loaded']) or '-'
+        rows.append(row)
+    return rows
+
+# ==================== ESCENARIOS ====================
+
+class Scenarios:
+    """Escenarios de carga; cada modo devuelve una función ``run(latencies) -> operaciones``"""
+
+    def __init__(self, sdk: Any, base_url: str, options: argparse.Namespace):
+        self.sdk = sdk
+        self.base_url = base_url
+        self.options = options
+
+    def client(self, **kwargs) -> Any:
+        return self.sdk.InventoryAPI(base_url=self.base_url, access_token='bench-access',
+                                     retry_attempts=self.options.retry_attempts,
+                                     retry_delay=self.options.retry_delay, **kwargs)
+
+    def async_client(self, **kwargs) -> Any:
+        return self.sdk.AsyncInventoryAPI(base_url=self.base_url, access_token='bench-access',
+                                          retry_attempts=self.options.retry_attempts,
+                                          retry_delay=self.options.retry_delay,
+                                          max_concurrency=self.options.concurrency, **kwargs)
+
+    def modes(self, scenario: str) -> Dict[str, Callable[[List[float]], int]]:
+        return getattr(self, scenario)()
+
+    # ---- Lecturas paginadas ----
+
+    def paginated_reads(self) -> Dict[str, Callable]:
+        page_size = self.options.page_size
+
+        def sync_run(latencies, **kwargs):
+            client = self.client(**kwargs)
+            _time_requests(client, latencies)
+            items = sum(1 for _ in client.iter_products(page_size=page_size))
+            return items + sum(1 for _ in client.iter_movements(page_size=page_size))
+
+        async def async_run(latencies):
+            async with self.async_client() as client:
+                _time_requests(client, latencies)
+                items = 0
+                async for _ in client.iter_products(page_size=page_size):
+                    items += 1
+                async for _ in client.iter_movements(page_size=page_size):
+                    items += 1
+                return items
+
+        return {
+            'sync': sync_run,
+            'sync-typed': lambda latencies: sync_run(latencies, typed_models=True),
+            'sync-instrumented': lambda latencies: sync_run(latencies, instrumentation=self.sdk.Instrumentation()),
+            'async': lambda latencies: asyncio.run(async_run(latencies))
+        }
+
+    # ---- Listado de stock sin paginar ----
+
+    def stock_listing(self) -> Dict[str, Callable]:
+        # Una página exactamente llena por ubicación: el servidor no pagina y no debe pedirse otra
+        page_size = self.options.products
+
+        def sync_run(latencies):
+            client = self.client()
+            _time_requests(client, latencies)
+            return sum(1 for i in range(self.options.locations)
+                       for _ in client.iter_stock_levels(location_id=f'loc-{i:03d}', page_size=page_size))
+
+        def snapshot_run(latencies):
+            client = self.client()
+            _time_requests(client, latencies)
+            with self.sdk.InventorySnapshot(client, page_size=page_size) as snapshot:
+                return snapshot.full_sync(include_history=False)['stockLevels']
+
+        async def async_run(latencies):
+            async with self.async_client() as client:
+                _time_requests(client, latencies)
+                items = 0
+                for i in range(self.options.locations):
+                    async for _ in client.iter_stock_levels(location_id=f'loc-{i:03d}', page_size=page_size):
+                        items += 1
+                return items
+
+        return {
+            'sync': sync_run,
+            'sync-snapshot': snapshot_run,
+            'async': lambda latencies: asyncio.run(async_run(latencies))
+        }
+
+    # ---- Actualización masiva de stock ----
+
+    def _stock_updates(self) -> List[Dict]:
+        rng = random.Random(self.options.seed)
+        return [{
+            'productId': f'prod-{rng.randrange(self.options.products):06d}',
+            'locationId': f'loc-{rng.randrange(self.options.locations):03d}',
+            'quantity': float(rng.randint(0, 200))
+        } for _ in range(self.options.updates)]
+
+    def bulk_stock_update(self) -> Dict[str, Callable]:
+        updates = self._stock_updates()
+
+        def sync_run(latencies, **kwargs):
+            client = self.client(**kwargs)
+            _time_requests(client, latencies)
+            report = client.parallel_stock_update(updates, max_workers=self.options.workers)
+            return len(updates) - len(report.failed_updates())
+
+        async def async_run(latencies):
+            async with self.async_client() as client:
+                _time_requests(client, latencies)
+                report = await client.parallel_stock_update(updates, max_workers=self.options.workers)
+                return len(updates) - len(report.failed_updates())
+
+        return {
+            'sync': sync_run,
+            'sync-gzip': lambda latencies: sync_run(latencies, compress_threshold=1024),
+            'async': lambda latencies: asyncio.run(async_run(latencies))
+        }
+
+    # ---- Exportación de reportes ----
+
+    def report_export(self) -> Dict[str, Callable]:
+        exports = self.options.exports
+
+        def sync_run(latencies, compress=True):
+            client = self.client()
+            for _ in range(exports):
+                started = time.perf_counter()
+                client.export_report_to('stock-summary', io.BytesIO(), compress=compress)
+                latencies.append(time.perf_counter() - started)
+            return exports
+
+        def sync_rows(latencies):
+            client = self.client()
+            rows = 0
+            for _ in range(exports):
+                started = time.perf_counter()
+                rows += sum(1 for _ in client.iter_report_rows('stock-summary'))
+                latencies.append(time.perf_counter() - started)
+            return rows
+
+        async def async_run(latencies):
+            async with self.async_client() as client:
+                for _ in range(exports):
+                    started = time.perf_counter()
+                    await client.export_report_to('stock-summary', io.BytesIO())
+                    latencies.append(time.perf_counter() - started)
+                return exports
+
+        return {
+            'sync': sync_run,
+            'sync-identity': lambda latencies: sync_run(latencies, compress=False),
+            'sync-rows': sync_rows,
+            'async': lambda latencies: asyncio.run(async_run(latencies))
+        }
+
+    # ---- Ráfaga de webhooks ----
+
+    def _deliveries(self, secret: str) -> List[Tuple[bytes, Dict[str, str]]]:
+        rng = random.Random(self.options.seed)
+        events = ('inventory.movement.created', 'inventory.stock.low', 'inventory.stock.updated')
+        timestamp = str(int(time.time()))
+        deliveries = []
+        for i in range(self.options.webhooks):
+            product_id = f'prod-{rng.randrange(self.options.products):06d}'
+            body = json.dumps({
+                'event': rng.choice(events),
+                'deliveryId': f'delivery-{i}',
+                'data': {'product': {'id': product_id}, 'movement': {'productId': product_id, 'quantity': 1}}
+            }).encode('utf-8')
+            signature = 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+            deliveries.append((body, {
+                'X-Webhook-Signature': signature,
+                'X-Webhook-Timestamp': timestamp,
+                'X-Webhook-Delivery': f'delivery-{i}'
+            }))
+        return deliveries
+
+    def webhook_burst(self) -> Dict[str, Callable]:
+        secret = 'bench-secret'
+        deliveries = self._deliveries(secret)
+        handler_time = self.options.handler_time
+
+        def sync_run(latencies, receiver):
+            lock = threading.Lock()
+
+            def handle(delivery):
+                if handler_time:
+                    time.sleep(handler_time)
+                with lock:
+                    latencies.append(time.monotonic() - delivery.received_at)
+
+            def handle_batch(run):
+                if handler_time:
+                    time.sleep(handler_time)
+                now = time.monotonic()
+                with lock:
+                    latencies.extend(now - delivery.received_at for delivery in run)
+
+            if isinstance(receiver, self.sdk.OrderedWebhookReceiver):
+                receiver.on_batch('*', handle_batch)
+            else:
+                receiver.on('*', handle)
+            with receiver:
+                accepted = sum(receiver.receive(body, headers)[0] == 200 for body, headers in deliveries)
+                receiver.join()
+            return accepted
+
+        async def async_run(latencies):
+            receiver = self.sdk.AsyncWebhookReceiver(secret, max_workers=self.options.workers,
+                                                     max_queue=len(deliveries))
+
+            async def handle(delivery):
+                if handler_time:
+                    await asyncio.sleep(handler_time)
+                latencies.append(time.monotonic() - delivery.received_at)
+
+            receiver.on('*', handle)
+            async with receiver:
+                accepted = sum(receiver.receive(body, headers)[0] == 200 for body, headers in deliveries)
+                await receiver.join()
+            return accepted
+
+        return {
+            'threaded': lambda latencies: sync_run(latencies, self.sdk.WebhookReceiver(
+                secret, max_workers=self.options.workers, max_queue=len(deliveries))),
+            'ordered': lambda latencies: sync_run(latencies, self.sdk.OrderedWebhookReceiver(
+                secret, partitions=self.options.workers, batch_window=0.05, max_queue=len(deliveries))),
+            'async': lambda latencies: asyncio.run(async_run(latencies))
+        }
+
+SCENARIOS = ('paginated_reads', 'stock_listing', 'bulk_stock_update', 'report_export', 'webhook_burst')
+
+# ==================== LÍNEA DE COMANDOS ====================
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Benchmark del Python SDK de Inventario PYMES')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Escenarios separados por comas')
+    parser.add_argument('--modes', default=None, help='Modos de cliente separados por comas (por defecto todos)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency', type=float, default=0.002, help='Latencia por petición (s)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Latencia aleatoria adicional (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Proporción de respuestas 503')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Proporción de respuestas 429')
+    parser.add_argument('--rate-limit', type=int, default=None, help='Peticiones por ventana (headers X-RateLimit-*)')
+    parser.add_argument('--window', type=int, default=60, help='Ventana del rate limit (s)')
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--locations', type=int, default=5)
+    parser.add_argument('--movements', type=int, default=5000)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--updates', type=int, default=5000, help='Actualizaciones en bulk_stock_update')
+    parser.add_argument('--exports', type=int, default=5, help='Descargas en report_export')
+    parser.add_argument('--webhooks', type=int, default=5000, help='Entregas en webhook_burst')
+    parser.add_argument('--handler-time', type=float, default=0.0, help='Trabajo simulado por webhook (s)')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=50, help='Peticiones simultáneas del cliente async')
+    parser.add_argument('--retry-attempts', type=int, default=5)
+    parser.add_argument('--retry-delay', type=float, default=0.05)
+    parser.add_argument('--no-memory', action='store_true', help='No medir memoria pico (tracemalloc añade overhead)')
+    parser.add_argument('--json', action='store_true', help='Imprimir los resultados como JSON')
+    parser.add_argument('--serve', action='store_true', help='Solo levantar el servidor simulado')
+    parser.add_argument('--import-time', action='store_true', help='Medir solo el arranque en frío (mediana)')
+    parser.add_argument('--import-runs', type=int, default=10, help='Procesos por modo en --import-time')
+    parser.add_argument('--port', type=int, default=0)
+    return parser.parse_args(argv)
+
+def server_options(options: argparse.Namespace) -> Dict:
+    return {
+        'port': options.port,
+        'latency': options.latency,
+        'jitter': options.jitter,
+        'error_rate': options.error_rate,
+        'rate_limit_rate': options.rate_limit_rate,
+        'rate_limit': options.rate_limit,
+        'window': options.window,
+        'retry_after': options.retry_delay,
+        'products': options.products,
+        'locations': options.locations,
+        'movements': options.movements,
+        'seed': options.seed
+    }
+
+def print_table(results: List[BenchmarkResult]) -> None:
+    columns = ('scenario', 'mode', 'operations', 'requests', 'requestsPerSec', 'operationsPerSec', 'latencyP50Ms',
+               'latencyP99Ms', 'cpuSeconds', 'peakMemoryMB')
+    rows = [[str(r.to_dict()[c]) for c in columns] for r in results]
+    widths = [max(len(c), *(len(row[i]) for row in rows)) for i, c in enumerate(columns)]
+    print('  '.join(c.ljust(w) for c, w in zip(columns, widths)))
+    for row, result in zip(rows, results):
+        print('  '.join(v.ljust(w) for v, w in zip(row, widths)) + (f'  ERROR {result.error}' if result.error else ''))
+
+def print_rows(rows: List[Dict]) -> None:
+    columns = list(rows[0])
+    widths = [max(len(c), *(len(str(row[c])) for row in rows)) for c in columns]
+    print('  '.join(c.ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row[c]).ljust(w) for c, w in zip(columns, widths)))
+
+def main(argv: List[str] = None) -> int:
+    options = parse_args(argv)
+
+    if options.serve:
+        server = MockInventoryServer(**server_options(options))
+        print(f'Servidor simulado en {server.start()}')
+        try:
+            server._thread.join()
+        except KeyboardInterrupt:
+            server.stop()
+        return 0
+
+    random.seed(options.seed)
+    counter = multiprocessing.Value('l', 0)
+    process, base_url = start_server_process(counter, **server_options(options))
+    if options.import_time:
+        try:
+            rows = cold_start(base_url, options.import_runs)
+        finally:
+            process.terminate()
+            process.join()
+        print(json.dumps(rows, indent=2)) if options.json else print_rows(rows)
+        return 0
+
+    sdk = load_sdk()
+    scenarios = Scenarios(sdk, base_url, options)
+    wanted_modes = set(options.modes.split(',')) if options.modes else None
+
+    results = []
+    try:
+        for scenario in options.scenarios.split(','):
+            for mode, run in scenarios.modes(scenario).items():
+                if wanted_modes and mode not in wanted_modes:
+                    continue
+                if mode == 'async' and not sdk.aiohttp and scenario != 'webhook_burst':
+                    continue
+                results.append(measure(scenario, mode, run, counter, trace_memory=not options.no_memory))
+    finally:
+        process.terminate()
+        process.join()
+
+    if options.json:
+        print(json.dumps([r.to_dict() for r in results], indent=2))
+    else:
+        print_table(results)
+    return 1 if any(r.error for r in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
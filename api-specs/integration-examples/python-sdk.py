@@ -4,18 +4,87 @@ Versión: 1.0.0
 
 Instalación:
 pip install requests
+pip install aiohttp  # opcional, para AsyncInventoryAPI
+pip install httpx[http2]  # opcional, para TransportConfig(http2=True)
+pip install pandas  # opcional, para InventoryAnalytics
 
 Uso:
 from python_sdk import InventoryAPI
 client = InventoryAPI(api_key='your-api-key')
+
+Benchmark (servidor simulado local, sin red):
+python python-sdk-benchmark.py --help
 """
 
-import requests
+import base64
+import bisect
+import codecs
+import copy
+import functools
+import importlib
+import os
 import json
 import time
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Callable, Iterable, Iterator, Tuple
+from collections import deque
+from itertools import islice
+from datetime import date, datetime, timedelta, timezone
 import logging
+import random
+import sys
+import threading
+from collections import OrderedDict
+
+class _LazyModule:
+    """Módulo que se importa en el primer acceso a uno de sus atributos
+    
+    Evalúa a False si el módulo no está instalado, de modo que las
+    dependencias opcionales se comprueban con ``if not aiohttp:``.
+    """
+    
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+    
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+    
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+    
+    def __bool__(self) -> bool:
+        try:
+            self._load()
+        except ImportError:
+            return False
+        return True
+    
+    def __repr__(self):
+        state = 'cargado' if self._module is not None else 'sin cargar'
+        return f'<módulo diferido {self._name!r} ({state})>'
+
+# Dependencias pesadas: se importan al usarse por primera vez, no al cargar el SDK
+asyncio = _LazyModule('asyncio')  # solo lo usan los clientes y helpers asíncronos
+uuid = _LazyModule('uuid')
+requests = _LazyModule('requests')
+aiohttp = _LazyModule('aiohttp')  # opcional, solo lo requiere AsyncInventoryAPI
+httpx = _LazyModule('httpx')  # opcional, solo lo requiere TransportConfig(http2=True)
+np = _LazyModule('numpy')  # numpy/pandas son opcionales, solo los requiere InventoryAnalytics
+pd = _LazyModule('pandas')
+
+# Librería estándar que solo usan subsistemas concretos (snapshots, exportación,
+# webhooks, colas, pools de hilos): no se paga su import en el arranque
+concurrent_futures = _LazyModule('concurrent.futures')
+csv = _LazyModule('csv')
+decimal = _LazyModule('decimal')
+gzip = _LazyModule('gzip')
+hashlib = _LazyModule('hashlib')
+hmac = _LazyModule('hmac')
+queue = _LazyModule('queue')
+socket = _LazyModule('socket')
+sqlite3 = _LazyModule('sqlite3')
 
 class APIError(Exception):
     """Excepción personalizada para errores de la API"""
@@ -35,236 +104,2645 @@ class APIError(Exception):
     def __str__(self):
         return f"APIError [{self.code}]: {self.message} (Status: {self.status})"
 
-class InventoryAPI:
-    """Cliente Python para la API de Sistema de Inventario PYMES"""
+class JSONCodec:
+    """Codec JSON de la librería estándar y base de los codecs acelerados
     
-    def __init__(self, base_url: str = None, api_key: str = None, access_token: str = None, 
-                 refresh_token: str = None, timeout: int = 30, retry_attempts: int = 3, 
-                 retry_delay: float = 1.0):
-        self.base_url = base_url or 'https://api.inventario-pymes.com/v1'
-        self.api_key = api_key
-        self.access_token = access_token
-        self.refresh_token = refresh_token
-        self.timeout = timeout
-        self.retry_attempts = retry_attempts
-        self.retry_delay = retry_delay
-        
-        # Configurar logging
-        self.logger = logging.getLogger(__name__)
+    Los codecs decodifican directamente desde los bytes de la respuesta y
+    codifican a bytes, sin cadenas intermedias.
+    """
+    
+    name = 'json'
+    
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data) if data else None
+    
+    def decode(self, data: bytes, record_type: Callable[[Dict], Any] = None) -> Any:
+        """Decodifica y, si se indica, convierte cada registro con ``record_type``"""
+        value = self.loads(data)
+        if record_type is None or value is None:
+            return value
+        if isinstance(value, list):
+            return [record_type(item) for item in value]
+        if isinstance(value, dict) and isinstance(value.get('data'), list):
+            return {**value, 'data': [record_type(item) for item in value['data']]}
+        return record_type(value)
+
+class OrjsonCodec(JSONCodec):
+    """Codec basado en orjson"""
+    
+    name = 'orjson'
+    
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+    
+    def dumps(self, obj: Any) -> bytes:
+        return self._orjson.dumps(obj)
+    
+    def loads(self, data: bytes) -> Any:
+        return self._orjson.loads(data) if data else None
+
+class MsgspecCodec(JSONCodec):
+    """Codec basado en msgspec (reutiliza encoder y decoder)"""
+    
+    name = 'msgspec'
+    
+    def __init__(self):
+        import msgspec
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+    
+    def dumps(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+    
+    def loads(self, data: bytes) -> Any:
+        return self._decoder.decode(data) if data else None
+
+JSON_CODECS = {'orjson': OrjsonCodec, 'msgspec': MsgspecCodec, 'json': JSONCodec}
+
+def get_json_codec(name: str = None) -> JSONCodec:
+    """Codec indicado por nombre o el más rápido disponible (orjson > msgspec > json)"""
+    if name:
+        return JSON_CODECS[name]()
+    for codec_class in (OrjsonCodec, MsgspecCodec):
+        try:
+            return codec_class()
+        except ImportError:
+            continue
+    return JSONCodec()
+
+class CacheEntry:
+    """Respuesta almacenada en ResponseCache"""
+    
+    __slots__ = ('endpoint', 'body', 'content_type', 'etag', 'expires_at', 'size')
+    
+    def __init__(self, endpoint: str, body: bytes, content_type: str, etag: str, expires_at: float):
+        self.endpoint = endpoint
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+        self.expires_at = expires_at
+        self.size = len(body) + 200  # Cuerpo más una estimación del overhead de la entrada
+    
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+    
+    def value(self, codec: 'JSONCodec' = None, record_type: Callable[[Dict], Any] = None) -> Any:
+        """Decodifica el cuerpo almacenado (cada llamada devuelve un objeto nuevo)"""
+        if self.content_type.startswith('application/json'):
+            return (codec or JSONCodec()).decode(self.body, record_type)
+        return self.body.decode('utf-8', errors='replace')
+
+class ResponseCache:
+    """Cache LRU de respuestas GET con TTL por endpoint y revalidación por ETag
+    
+    Las entradas caducadas que tienen ETag se conservan para revalidarlas con
+    If-None-Match; un 304 renueva su TTL sin volver a descargar el cuerpo.
+    Cualquier escritura (POST/PUT/PATCH/DELETE) invalida los endpoints afectados.
+    """
+    
+    # TTL (segundos) por prefijo de endpoint; gana el prefijo más largo
+    DEFAULT_TTLS = {
+        '/auth/me': 300,
+        '/products': 60,
+        '/inventory/stock': 10,
+        '/reports/stock-summary': 60,
+        '/webhooks': 300,
+    }
+    
+    # Prefijos a invalidar cuando se escribe sobre un recurso
+    INVALIDATION_RULES = {
+        '/products': ('/products', '/inventory', '/reports'),
+        '/inventory': ('/inventory', '/reports'),
+        '/alerts': ('/alerts',),
+        '/webhooks': ('/webhooks',),
+        '/users': ('/users', '/auth/me'),
+    }
+    
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024, 
+                 default_ttl: float = 30.0, ttl_by_endpoint: Dict[str, float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttl_by_endpoint = dict(self.DEFAULT_TTLS)
+        if ttl_by_endpoint:
+            self.ttl_by_endpoint.update(ttl_by_endpoint)
         
-        # Configurar sesión HTTP
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'User-Agent': 'InventoryAPI-Python-SDK/1.0.0'
-        })
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+        self.invalidations = 0
     
-    def _get_auth_headers(self) -> Dict[str, str]:
-        """Obtiene headers de autenticación"""
-        headers = {}
-        if self.access_token:
-            headers['Authorization'] = f'Bearer {self.access_token}'
-        elif self.api_key:
-            headers['X-API-Key'] = self.api_key
-        return headers
+    @staticmethod
+    def make_key(method: str, endpoint: str, params: Dict = None) -> Tuple:
+        """Clave de cache: método + endpoint + parámetros normalizados"""
+        items = tuple(sorted((k, str(v)) for k, v in (params or {}).items() if v is not None))
+        return (method.upper(), endpoint, items)
     
-    def _calculate_retry_delay(self, attempt: int, status_code: int = None) -> float:
-        """Calcula el delay para reintentos"""
-        if status_code == 429:  # Rate limit
-            return min(60.0, self.retry_delay * (2 ** attempt))
-        return self.retry_delay * attempt
+    def ttl_for(self, endpoint: str) -> float:
+        """TTL aplicable a un endpoint"""
+        best = None
+        for prefix in self.ttl_by_endpoint:
+            if endpoint.startswith(prefix) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return self.ttl_by_endpoint[best] if best is not None else self.default_ttl
     
-    def request(self, endpoint: str, method: str = 'GET', data: Dict = None, 
-                params: Dict = None, headers: Dict = None, **kwargs) -> Any:
-        """Realiza una petición HTTP con reintentos automáticos"""
-        url = f"{self.base_url}{endpoint}"
+    def get(self, key: Tuple) -> Optional[CacheEntry]:
+        """Obtiene una entrada vigente (cuenta como hit) o None (miss)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.is_fresh():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+    
+    def get_stale(self, key: Tuple) -> Optional[CacheEntry]:
+        """Obtiene una entrada caducada que pueda revalidarse con su ETag"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry if entry is not None and entry.etag else None
+    
+    def revalidate(self, key: Tuple, entry: CacheEntry) -> CacheEntry:
+        """Renueva el TTL de una entrada tras recibir un 304 Not Modified"""
+        with self._lock:
+            entry.expires_at = time.monotonic() + self.ttl_for(entry.endpoint)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.revalidations += 1
+        return entry
+    
+    def put(self, key: Tuple, endpoint: str, body: bytes, content_type: str, 
+            etag: str = None) -> CacheEntry:
+        """Almacena una respuesta y devuelve la entrada (aunque no quepa en la cache)"""
+        ttl = self.ttl_for(endpoint)
+        entry = CacheEntry(endpoint, body, content_type or '', etag, time.monotonic() + ttl)
         
-        # Preparar headers
-        request_headers = self.session.headers.copy()
-        request_headers.update(self._get_auth_headers())
-        if headers:
-            request_headers.update(headers)
+        # Sin TTL ni ETag no hay nada que reutilizar
+        if (ttl <= 0 and not etag) or entry.size > self.max_bytes:
+            return entry
         
-        # Preparar datos
-        json_data = data if data else None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+        return entry
+    
+    def invalidate(self, prefixes: Tuple[str, ...]) -> int:
+        """Elimina las entradas cuyos endpoints empiezan por alguno de los prefijos"""
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if e.endpoint.startswith(prefixes)]
+            for key in keys:
+                self._bytes -= self._entries.pop(key).size
+            self.invalidations += len(keys)
+            return len(keys)
+    
+    def invalidate_for(self, endpoint: str) -> int:
+        """Invalida lo que puede haber cambiado tras escribir en ``endpoint``"""
+        resource = '/' + endpoint.lstrip('/').split('/', 1)[0]
+        return self.invalidate(self.INVALIDATION_RULES.get(resource, (resource,)))
+    
+    def clear(self) -> None:
+        """Vaciar la cache"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict:
+        """Contadores para dimensionar la cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRatio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'revalidations': self.revalidations,
+                'invalidations': self.invalidations
+            }
+
+class RateLimitGovernor:
+    """Limitador proactivo (token bucket) alimentado por los headers X-RateLimit-*
+    
+    Se comparte entre todos los hilos y tareas asíncronas que usan un cliente (o
+    varios clientes, pasando la misma instancia). Cada petición reserva un token
+    con ``acquire()`` y espera el tiempo devuelto; el ritmo se ajusta en cada
+    respuesta repartiendo ``X-RateLimit-Remaining`` hasta ``X-RateLimit-Reset``,
+    y un 429 bloquea a todos hasta que vence ``Retry-After``.
+    """
+    
+    def __init__(self, rate_per_second: float = None, burst: int = 10, jitter: float = 0.1):
+        self.burst = burst
+        self.jitter = jitter
         
-        last_error = None
+        # Último presupuesto informado por el servidor
+        self.limit = None
+        self.remaining = None
+        self.window = None
+        self._reset_at = None
         
-        for attempt in range(1, self.retry_attempts + 1):
-            try:
-                response = self.session.request(
-                    method=method,
-                    url=url,
-                    json=json_data,
-                    params=params,
-                    headers=request_headers,
-                    timeout=self.timeout,
-                    **kwargs
-                )
-                
-                # Manejar respuestas exitosas
-                if response.ok:
-                    if response.headers.get('content-type', '').startswith('application/json'):
-                        return response.json()
-                    return response.text
-                
-                # Manejar errores
-                try:
-                    error_data = response.json()
-                except:
-                    error_data = {}
-                
-                error = APIError(
-                    code=error_data.get('code', 'UNKNOWN_ERROR'),
-                    message=error_data.get('message', response.reason),
-                    status=response.status_code,
-                    details=error_data.get('details', {}),
-                    request_id=error_data.get('requestId')
-                )
-                
-                # Renovar token si es necesario
-                if response.status_code == 401 and self.refresh_token and attempt == 1:
-                    self.refresh_access_token()
-                    request_headers.update(self._get_auth_headers())
-                    continue
-                
-                # No reintentar errores 4xx (excepto 429)
-                if 400 <= response.status_code < 500 and response.status_code != 429:
-                    raise error
-                
-                last_error = error
-                
-                # Esperar antes del siguiente intento
-                if attempt < self.retry_attempts:
-                    delay = self._calculate_retry_delay(attempt, response.status_code)
-                    time.sleep(delay)
-                    
-            except requests.exceptions.RequestException as e:
-                last_error = APIError('NETWORK_ERROR', str(e), 0)
-                
-                if attempt < self.retry_attempts:
-                    time.sleep(self.retry_delay * attempt)
+        self._rate = rate_per_second
+        self._capacity = float(burst)
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()  # Momento en que _tokens es válido (puede ser futuro)
+        self._lock = threading.Lock()
         
-        raise last_error
+        self.throttled = 0
+        self.total_wait = 0.0
     
-    # ==================== AUTENTICACIÓN ====================
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Convierte un header Retry-After (segundos o fecha HTTP) en segundos"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
     
-    def login(self, email: str, password: str) -> Dict:
-        """Iniciar sesión y obtener tokens"""
-        response = self.request('/auth/login', 'POST', {
-            'email': email,
-            'password': password
-        })
-        
-        self.access_token = response['accessToken']
-        self.refresh_token = response['refreshToken']
-        
-        return response
+    @staticmethod
+    def _header_number(headers: Any, name: str) -> Optional[float]:
+        try:
+            return float(headers.get(name))
+        except (TypeError, ValueError):
+            return None
+    
+    def _refill(self, now: float) -> None:
+        if self._rate is not None and now > self._stamp:
+            self._tokens = min(self._capacity, self._tokens + (now - self._stamp) * self._rate)
+        self._stamp = max(self._stamp, now)
     
-    def refresh_access_token(self) -> Dict:
-        """Renovar el access token"""
-        if not self.refresh_token:
-            raise ValueError('No refresh token available')
+    def _block(self, now: float, seconds: float) -> None:
+        """Detiene el envío hasta ``now + seconds``; luego sale exactamente una petición"""
+        until = now + seconds
+        if until > self._stamp:
+            self._stamp = until
+            self._tokens = 1.0
+    
+    def acquire(self) -> float:
+        """Reserva un token y devuelve los segundos que hay que esperar antes de enviar"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = self._stamp - now
+            if self._rate is not None:
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait += -self._tokens / self._rate
+            elif wait > 0:
+                self._tokens = max(0.0, self._tokens - 1)
         
-        response = self.request('/auth/refresh', 'POST', {
-            'refreshToken': self.refresh_token
-        })
+        if wait <= 0:
+            return 0.0
         
-        self.access_token = response['accessToken']
-        return response
+        # Jitter siempre positivo: nunca antes de lo permitido y sin despertar en bloque
+        wait += random.uniform(0, wait * self.jitter)
+        with self._lock:
+            self.throttled += 1
+            self.total_wait += wait
+        return wait
     
-    def logout(self) -> Dict:
-        """Cerrar sesión"""
-        response = self.request('/auth/logout', 'POST', {
-            'refreshToken': self.refresh_token
-        })
-        
-        self.access_token = None
-        self.refresh_token = None
+    def update(self, status: int, headers: Any) -> None:
+        """Aprende el presupuesto a partir de los headers de una respuesta"""
+        limit = self._header_number(headers, 'X-RateLimit-Limit')
+        remaining = self._header_number(headers, 'X-RateLimit-Remaining')
+        reset = self._header_number(headers, 'X-RateLimit-Reset')
+        window = self._header_number(headers, 'X-RateLimit-Window')
+        retry_after = self.parse_retry_after(headers.get('Retry-After'))
         
-        return response
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            
+            if limit is not None:
+                self.limit = int(limit)
+            if window is not None:
+                self.window = window
+            if remaining is not None:
+                self.remaining = int(remaining)
+            
+            seconds_to_reset = None
+            if reset is not None:
+                # El reset puede venir como epoch (1642266000) o como segundos restantes
+                seconds_to_reset = max(0.0, reset - time.time()) if reset > 1e9 else reset
+                self._reset_at = now + seconds_to_reset
+            
+            # Ritmo sostenible: repartir lo que queda hasta el reset
+            if remaining is not None and seconds_to_reset:
+                rate = max(remaining, 0) / seconds_to_reset
+            elif self.limit and self.window:
+                rate = self.limit / self.window
+            else:
+                rate = None
+            
+            if rate:
+                self._rate = rate
+                self._capacity = float(max(1, self.burst))
+            
+            # Los tokens locales nunca superan el presupuesto que informa el servidor
+            if remaining is not None:
+                self._tokens = min(self._tokens, remaining)
+                if remaining <= 0 and seconds_to_reset:
+                    self._block(now, seconds_to_reset)
+            
+            if status == 429:
+                if retry_after is None:
+                    retry_after = seconds_to_reset
+                if retry_after is not None:
+                    self._block(now, retry_after)
     
-    def get_current_user(self) -> Dict:
-        """Obtener información del usuario actual"""
-        return self.request('/auth/me')
+    def blocked_for(self) -> float:
+        """Segundos que faltan para poder volver a enviar tras un bloqueo"""
+        with self._lock:
+            return max(0.0, self._stamp - time.monotonic())
     
-    # ==================== PRODUCTOS ====================
+    def budget(self) -> Dict:
+        """Presupuesto actual conocido"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                'limit': self.limit,
+                'remaining': self.remaining,
+                'window': self.window,
+                'resetIn': max(0.0, self._reset_at - now) if self._reset_at is not None else None,
+                'ratePerSecond': self._rate,
+                'tokens': self._tokens,
+                'blockedFor': max(0.0, self._stamp - now),
+                'throttled': self.throttled,
+                'totalWait': self.total_wait
+            }
+
+class ChunkResult:
+    """Resultado de un lote dentro de una actualización masiva de stock"""
     
-    def get_products(self, page: int = 1, limit: int = 20, search: str = None, 
-                    category: str = None, is_active: bool = None) -> Dict:
-        """Obtener lista de productos"""
-        params = {'page': page, 'limit': limit}
-        if search:
-            params['search'] = search
-        if category:
-            params['category'] = category
-        if is_active is not None:
-            params['isActive'] = str(is_active).lower()
+    def __init__(self, index: int, start: int, updates: List[Dict]):
+        self.index = index
+        self.start = start
+        self.size = len(updates)
+        self.updates = updates  # Se libera al confirmarse el lote
+        self.reference = None
+        self.payload_bytes = 0
+        self.sent = False
+        self.latency = 0.0
+        self.result = None
+        self.error = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.sent and self.error is None
+    
+    def to_dict(self) -> Dict:
+        return {
+            'index': self.index,
+            'start': self.start,
+            'size': self.size,
+            'reference': self.reference,
+            'status': 'success' if self.ok else 'failed',
+            'latency': self.latency,
+            'error': str(self.error) if self.error else None
+        }
+
+class BulkUpdateReport:
+    """Informe de una actualización masiva: lotes confirmados y fallidos
+    
+    Los reintentos de cada lote los hace ``request()`` con la política del
+    cliente y se cuentan en ``RetryPolicy.counters`` o en la instrumentación.
+    """
+    
+    def __init__(self):
+        self.chunks = []
+        self.elapsed = 0.0
+    
+    @property
+    def succeeded(self) -> List[ChunkResult]:
+        return [c for c in self.chunks if c.ok]
+    
+    @property
+    def failed(self) -> List[ChunkResult]:
+        return [c for c in self.chunks if not c.ok]
+    
+    @property
+    def ok(self) -> bool:
+        return all(c.ok for c in self.chunks)
+    
+    def failed_updates(self) -> List[Dict]:
+        """Actualizaciones de los lotes fallidos, listas para reenviarse"""
+        return [u for c in self.failed for u in (c.updates or [])]
+    
+    def summary(self) -> Dict:
+        return {
+            'chunks': len(self.chunks),
+            'succeededChunks': len(self.succeeded),
+            'failedChunks': len(self.failed),
+            'items': sum(c.size for c in self.chunks),
+            'failedItems': sum(c.size for c in self.failed),
+            'elapsed': self.elapsed
+        }
+
+class AdaptiveChunker:
+    """Ajusta el tamaño de lote según la latencia y el tamaño de payload observados"""
+    
+    def __init__(self, initial_size: int = 100, min_size: int = 10, max_size: int = 1000, 
+                 target_latency: float = 2.0, max_payload_bytes: int = 1024 * 1024):
+        self.size = max(min_size, min(initial_size, max_size))
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self.max_payload_bytes = max_payload_bytes
+        self._bytes_per_item = None
+    
+    def next_size(self) -> int:
+        size = self.size
+        if self._bytes_per_item:
+            size = min(size, int(self.max_payload_bytes / self._bytes_per_item))
+        return max(self.min_size, min(size, self.max_size))
+    
+    def observe(self, size: int, latency: float, payload_bytes: int) -> None:
+        """Registra un lote confirmado y recalcula el tamaño objetivo"""
+        if size <= 0:
+            return
+        per_item = payload_bytes / size
+        self._bytes_per_item = per_item if self._bytes_per_item is None else (
+            0.8 * self._bytes_per_item + 0.2 * per_item)
         
-        return self.request('/products', params=params)
+        if latency > 0:
+            ideal = size * self.target_latency / latency
+            # Suavizar y no crecer más del doble por paso
+            self.size = int(min(ideal, self.size * 2) * 0.5 + self.size * 0.5)
+        self.size = max(self.min_size, min(self.size, self.max_size))
     
-    def get_product(self, product_id: str) -> Dict:
-        """Obtener producto específico"""
-        return self.request(f'/products/{product_id}')
+    def shrink(self) -> None:
+        """Reduce el tamaño a la mitad tras un lote fallido"""
+        self.size = max(self.min_size, self.size // 2)
+
+PRODUCT_REQUIRED_FIELDS = ('sku', 'name', 'unitPrice')
+PRODUCT_NUMERIC_FIELDS = ('unitPrice', 'costPrice', 'minStock', 'maxStock', 'reorderPoint')
+
+def _clean_csv_product(row: Dict) -> Dict:
+    """Normaliza una fila CSV: quita vacíos y convierte campos numéricos"""
+    product = {}
+    for key, value in row.items():
+        if key is None or value is None:
+            continue
+        value = value.strip()
+        if value == '':
+            continue
+        if key in PRODUCT_NUMERIC_FIELDS:
+            try:
+                value = float(value)
+            except ValueError:
+                pass  # validate_product informará el error
+        product[key.strip()] = value
+    return product
+
+def iter_product_rows(source: Any, format: str = None) -> Iterator[Dict]:
+    """Lee productos de forma perezosa desde un CSV, un JSONL o cualquier iterable de dicts
     
-    def create_product(self, product_data: Dict) -> Dict:
-        """Crear nuevo producto"""
-        return self.request('/products', 'POST', product_data)
+    ``source`` puede ser una ruta, un objeto de archivo de texto o un iterable.
+    Las líneas JSONL mal formadas se emiten como ``{'_invalid': motivo}``.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        format = format or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from iter_product_rows(f, format)
+        return
     
-    def update_product(self, product_id: str, product_data: Dict) -> Dict:
-        """Actualizar producto existente"""
-        return self.request(f'/products/{product_id}', 'PUT', product_data)
+    if hasattr(source, 'read'):
+        if (format or 'csv') == 'csv':
+            for row in csv.DictReader(source):
+                yield _clean_csv_product(row)
+        else:
+            for line_number, line in enumerate(source, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield {'_invalid': f'JSON inválido en la línea {line_number}: {e}'}
+        return
     
-    def delete_product(self, product_id: str) -> None:
-        """Eliminar producto"""
-        self.request(f'/products/{product_id}', 'DELETE')
+    yield from source
+
+def validate_product(product: Dict, required_fields: Tuple[str, ...] = PRODUCT_REQUIRED_FIELDS) -> List[str]:
+    """Valida un producto antes de enviarlo; devuelve la lista de errores"""
+    if not isinstance(product, dict):
+        return ['El registro no es un objeto']
+    if '_invalid' in product:
+        return [product['_invalid']]
     
-    def search_products(self, query: str, **filters) -> Dict:
-        """Buscar productos"""
-        params = {'q': query, **filters}
-        return self.request('/products/search', params=params)
+    errors = [f'Falta el campo obligatorio {field}' for field in required_fields
+              if product.get(field) in (None, '')]
+    price = product.get('unitPrice')
+    if price not in (None, ''):
+        if isinstance(price, bool) or not isinstance(price, (int, float)):
+            errors.append('unitPrice debe ser numérico')
+        elif price < 0:
+            errors.append('unitPrice no puede ser negativo')
+    return errors
+
+class ProductImportResult:
+    """Resultado de importar una fila de producto"""
     
-    def create_products_batch(self, products: List[Dict]) -> Dict:
-        """Crear múltiples productos"""
-        return self.request('/products/batch', 'POST', {'products': products})
+    __slots__ = ('row', 'sku', 'status', 'errors', 'product')
     
-    # ==================== INVENTARIO ====================
+    def __init__(self, row: int, sku: str, status: str, errors: List[str] = None, product: Dict = None):
+        self.row = row
+        self.sku = sku
+        self.status = status  # 'created', 'invalid' o 'failed'
+        self.errors = errors or []
+        self.product = product
     
-    def get_stock_levels(self, product_id: str = None, location_id: str = None, 
-                        low_stock: bool = None) -> List[Dict]:
-        """Obtener niveles de stock"""
-        params = {}
-        if product_id:
-            params['productId'] = product_id
-        if location_id:
-            params['locationId'] = location_id
-        if low_stock is not None:
-            params['lowStock'] = str(low_stock).lower()
+    @property
+    def ok(self) -> bool:
+        return self.status == 'created'
+    
+    def to_dict(self) -> Dict:
+        return {'row': self.row, 'sku': self.sku, 'status': self.status, 
+                'errors': self.errors, 'product': self.product}
+
+COUNT_QUANTITY_FIELDS = ('countedQuantity', 'quantity')
+
+class StockDiff:
+    """Diferencia entre el conteo físico y el stock de la API para un producto y ubicación"""
+    
+    __slots__ = ('product_id', 'location_id', 'sku', 'expected', 'counted', 'status')
+    
+    def __init__(self, product_id: str, location_id: str, sku: Optional[str], expected: float, 
+                 counted: float, status: str):
+        self.product_id = product_id
+        self.location_id = location_id
+        self.sku = sku
+        self.expected = expected
+        self.counted = counted
+        self.status = status  # 'adjust', 'missing' (sin nivel en la API) o 'uncounted'
+    
+    @property
+    def delta(self) -> float:
+        return self.counted - self.expected
+    
+    def to_update(self, operation: str = 'add') -> Dict:
+        """Actualización para /inventory/stock/batch-update"""
+        return {'productId': self.product_id, 'locationId': self.location_id, 
+                'quantity': self.delta if operation == 'add' else self.counted, 'operation': operation}
+    
+    def to_dict(self) -> Dict:
+        return {'productId': self.product_id, 'locationId': self.location_id, 'sku': self.sku, 
+                'expected': self.expected, 'counted': self.counted, 'delta': self.delta, 'status': self.status}
+
+class ReconciliationReport:
+    """Conciliación de un conteo físico contra los niveles de stock de la API
+    
+    Los conteos se indexan en un dict por (productId, locationId) (o por
+    (sku, locationId) si la fila no trae productId) y cada nivel de stock que
+    llega de la API se cruza contra ese índice en O(1); solo se guardan las
+    diferencias. Las filas repetidas de un mismo producto y ubicación se suman.
+    """
+    
+    REPORT_FIELDS = ('productId', 'locationId', 'sku', 'expected', 'counted', 'delta', 'status')
+    
+    def __init__(self, tolerance: float = 0.0, zero_uncounted: bool = False, dry_run: bool = True):
+        self.tolerance = tolerance
+        self.zero_uncounted = zero_uncounted  # Llevar a 0 lo que existe en la API y no se contó
+        self.dry_run = dry_run
+        self.diffs: List[StockDiff] = []
+        self.invalid: List[Dict] = []
+        self.rows = 0
+        self.levels = 0
+        self.matched = 0
+        self.uncounted = 0
+        self.applied: Optional[BulkUpdateReport] = None
+        self.elapsed = 0.0
+        self._counts = {}
+        self._sku_counts = {}
+        self._lock = threading.Lock()
+    
+    def _add_count(self, row_number: int, row: Dict, location_id: str = None) -> None:
+        self.rows += 1
+        if not isinstance(row, dict) or '_invalid' in row:
+            self.invalid.append({'row': row_number, 'error': row.get('_invalid') if isinstance(row, dict) 
+                                 else 'El registro no es un objeto'})
+            return
+        
+        location = row.get('locationId') or location_id
+        raw = next((row[field] for field in COUNT_QUANTITY_FIELDS if row.get(field) not in (None, '')), None)
+        try:
+            quantity = float(raw)
+        except (TypeError, ValueError):
+            quantity = None
+        
+        if quantity is None or not location or not (row.get('productId') or row.get('sku')):
+            self.invalid.append({'row': row_number, 'error': 'Faltan productId/sku, locationId o una cantidad numérica'})
+            return
         
-        return self.request('/inventory/stock', params=params)
+        if row.get('productId'):
+            key, index = (row['productId'], location), self._counts
+        else:
+            key, index = (row['sku'], location), self._sku_counts
+        index[key] = index.get(key, 0.0) + quantity
     
-    def get_product_stock(self, product_id: str, location_id: str = None) -> List[Dict]:
-        """Obtener stock de producto específico"""
-        params = {'productId': product_id}
-        if location_id:
-            params['locationId'] = location_id
+    def locations(self) -> List[str]:
+        """Ubicaciones presentes en el conteo"""
+        return sorted({key[1] for key in self._counts} | {key[1] for key in self._sku_counts})
+    
+    def _match_level(self, level: Dict) -> None:
+        product_id, location_id = level.get('productId'), level.get('locationId')
+        product = level.get('product') or {}
+        sku = product.get('sku')
+        expected = float(level.get('quantity') or 0)
         
-        return self.request('/inventory/stock', params=params)
+        with self._lock:
+            self.levels += 1
+            counted = self._counts.pop((product_id, location_id), None)
+            if counted is None and sku is not None:
+                counted = self._sku_counts.pop((sku, location_id), None)
+            
+            if counted is None:
+                self.uncounted += 1
+                if self.zero_uncounted and abs(expected) > self.tolerance:
+                    self.diffs.append(StockDiff(product_id, location_id, sku, expected, 0.0, 'uncounted'))
+                return
+            
+            self.matched += 1
+            if abs(counted - expected) > self.tolerance:
+                self.diffs.append(StockDiff(product_id, location_id, sku, expected, counted, 'adjust'))
     
-    def create_movement(self, movement_data: Dict) -> Dict:
-        """Crear movimiento de inventario"""
-        return self.request('/inventory/movements', 'POST', movement_data)
+    def _finish(self) -> None:
+        """Los conteos sin nivel de stock en la API se crean desde 0"""
+        for (product_id, location_id), counted in self._counts.items():
+            if abs(counted) > self.tolerance:
+                self.diffs.append(StockDiff(product_id, location_id, None, 0.0, counted, 'missing'))
+        for (sku, location_id), counted in self._sku_counts.items():
+            self.invalid.append({'row': None, 'error': f'SKU {sku} sin nivel de stock en {location_id}'})
+        self._counts.clear()
+        self._sku_counts.clear()
+        self.diffs.sort(key=lambda d: (d.location_id, d.product_id))
     
-    def get_movements(self, product_id: str = None, location_id: str = None, 
-                     movement_type: str = None, start_date: str = None, 
-                     end_date: str = None, page: int = 1, limit: int = 20) -> List[Dict]:
-        """Obtener movimientos de inventario"""
-        params = {'page': page, 'limit': limit}
-        if product_id:
-            params['productId'] = product_id
-        if location_id:
-            params['locationId'] = location_id
+    def updates(self, operation: str = 'add') -> List[Dict]:
+        """Ajustes mínimos, uno por producto y ubicación con diferencia"""
+        return [diff.to_update(operation) for diff in self.diffs]
+    
+    def summary(self) -> Dict:
+        return {
+            'rows': self.rows,
+            'invalidRows': len(self.invalid),
+            'levels': self.levels,
+            'matched': self.matched,
+            'uncounted': self.uncounted,
+            'adjustments': len(self.diffs),
+            'netDelta': sum(d.delta for d in self.diffs),
+            'dryRun': self.dry_run,
+            'applied': self.applied.summary() if self.applied else None,
+            'elapsed': self.elapsed
+        }
+    
+    def to_csv(self, destination: Any) -> None:
+        """Escribe el informe de diferencias en CSV (ruta u objeto de archivo)"""
+        if isinstance(destination, (str, os.PathLike)):
+            with open(destination, 'w', newline='', encoding='utf-8') as f:
+                return self.to_csv(f)
+        writer = csv.DictWriter(destination, fieldnames=self.REPORT_FIELDS)
+        writer.writeheader()
+        for diff in self.diffs:
+            writer.writerow(diff.to_dict())
+
+class CSVLineSplitter:
+    """Decodifica bytes UTF-8 por fragmentos y los corta en líneas completas
+    
+    Conserva los saltos de línea para que ``csv`` pueda reconstruir campos
+    entrecomillados que contienen saltos de línea.
+    """
+    
+    def __init__(self, encoding: str = 'utf-8-sig'):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._buffer = ''
+    
+    def feed(self, chunk: bytes) -> List[str]:
+        self._buffer += self._decoder.decode(chunk)
+        lines = self._buffer.splitlines(keepends=True)
+        # La última línea puede estar incompleta (o ser un \r a la espera de su \n)
+        self._buffer = lines.pop() if lines and not lines[-1].endswith('\n') else ''
+        return lines
+    
+    def close(self) -> List[str]:
+        self._buffer += self._decoder.decode(b'', final=True)
+        lines, self._buffer = ([self._buffer] if self._buffer else []), ''
+        return lines
+
+# ==================== MODELOS TIPADOS ====================
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+
+def _parse_decimal(value: Any) -> Optional['decimal.Decimal']:
+    try:
+        return decimal.Decimal(str(value))
+    except (decimal.InvalidOperation, ValueError):
+        return None
+
+class LazyField:
+    """Descriptor que convierte el valor crudo de un slot la primera vez que se lee"""
+    
+    def __init__(self, parse: Callable[[Any], Any], raw_types: Tuple[type, ...]):
+        self.parse = parse
+        self.raw_types = raw_types
+        self.slot = None
+    
+    def __set_name__(self, owner, name):
+        self.slot = '_' + name
+    
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        value = getattr(obj, self.slot)
+        if isinstance(value, self.raw_types) and not isinstance(value, bool):
+            value = self.parse(value)
+            setattr(obj, self.slot, value)
+        return value
+
+def lazy_datetime() -> LazyField:
+    return LazyField(_parse_datetime, (str,))
+
+def lazy_decimal() -> LazyField:
+    return LazyField(_parse_decimal, (str, int, float))
+
+class Model:
+    """Base de los modelos tipados con ``__slots__``
+    
+    Cada subclase declara en FIELDS el mapeo campo de la API -> atributo. Los
+    atributos declarados como LazyField guardan el valor crudo en ``_atributo``
+    y lo convierten (fecha, decimal) solo al leerlo. Los campos desconocidos se
+    conservan en ``extra``. Los identificadores que se repiten entre registros
+    (producto, ubicación, tipo...) se internan para que millones de registros
+    compartan una sola copia de cada cadena. Admite acceso tipo dict con los
+    nombres de la API (``stock['quantity']``, ``movement.get('createdAt')``).
+    """
+    
+    __slots__ = ('extra',)
+    FIELDS: Dict[str, str] = {}
+    NESTED: Dict[str, type] = {}
+    INTERNED = frozenset(('productId', 'locationId', 'destinationLocationId', 'movementType', 'userId', 
+                          'categoryId', 'unitOfMeasure', 'alertType', 'status'))
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        lazy = {name for name, value in vars(cls).items() if isinstance(value, LazyField)}
+        cls._STORAGE = {key: ('_' + attr if attr in lazy else attr) for key, attr in cls.FIELDS.items()}
+        cls._ATTRIBUTES = set(cls.FIELDS.values()) | {'_' + attr for attr in lazy}
+    
+    def __init__(self, data: Dict):
+        storage = self._STORAGE
+        nested = self.NESTED
+        interned = self.INTERNED
+        extra = None
+        for key, value in data.items():
+            slot = storage.get(key)
+            if slot is None:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+            elif key in nested and isinstance(value, dict):
+                setattr(self, slot, nested[key](value))
+            elif key in interned and type(value) is str:
+                setattr(self, slot, sys.intern(value))
+            else:
+                setattr(self, slot, value)
+        self.extra = extra
+    
+    def __getattr__(self, name):
+        # Slots no asignados: el campo no venía en la respuesta
+        if name in self._ATTRIBUTES:
+            return None
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+    
+    def __getitem__(self, key: str) -> Any:
+        attr = self.FIELDS.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+    
+    def __contains__(self, key: str) -> bool:
+        attr = self.FIELDS.get(key)
+        if attr is not None:
+            return getattr(self, self._STORAGE[key]) is not None
+        return bool(self.extra) and key in self.extra
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+    
+    def to_dict(self) -> Dict:
+        """Representación JSON equivalente a la respuesta de la API"""
+        result = {}
+        for key, attr in self.FIELDS.items():
+            value = getattr(self, attr)
+            if value is None:
+                continue
+            if isinstance(value, Model):
+                value = value.to_dict()
+            elif isinstance(value, datetime):
+                value = value.isoformat().replace('+00:00', 'Z')
+            elif isinstance(value, decimal.Decimal):
+                value = float(value)
+            result[key] = value
+        if self.extra:
+            result.update(self.extra)
+        return result
+    
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+    
+    def __repr__(self):
+        identifier = getattr(self, 'id', None)
+        return f'{type(self).__name__}(id={identifier!r})'
+
+class Product(Model):
+    """Producto del catálogo"""
+    
+    __slots__ = ('id', 'sku', 'name', 'description', 'category_id', '_unit_price', 'unit_of_measure', 
+                 'barcode', 'is_active', '_created_at', '_updated_at')
+    FIELDS = {'id': 'id', 'sku': 'sku', 'name': 'name', 'description': 'description', 
+              'categoryId': 'category_id', 'unitPrice': 'unit_price', 'unitOfMeasure': 'unit_of_measure', 
+              'barcode': 'barcode', 'isActive': 'is_active', 'createdAt': 'created_at', 
+              'updatedAt': 'updated_at'}
+    
+    unit_price = lazy_decimal()
+    created_at = lazy_datetime()
+    updated_at = lazy_datetime()
+
+class StockLevel(Model):
+    """Nivel de stock de un producto en una ubicación"""
+    
+    __slots__ = ('id', 'product_id', 'product', 'location_id', 'location', 'quantity', 
+                 'reserved_quantity', 'min_stock', 'max_stock', '_last_updated')
+    FIELDS = {'id': 'id', 'productId': 'product_id', 'product': 'product', 'locationId': 'location_id', 
+              'location': 'location', 'quantity': 'quantity', 'reservedQuantity': 'reserved_quantity', 
+              'minStock': 'min_stock', 'maxStock': 'max_stock', 'lastUpdated': 'last_updated'}
+    NESTED = {'product': Product}
+    
+    last_updated = lazy_datetime()
+
+class Movement(Model):
+    """Movimiento de inventario"""
+    
+    __slots__ = ('id', 'product_id', 'product', 'location_id', 'destination_location_id', 
+                 'movement_type', 'quantity', 'reference_number', 'notes', 'user_id', '_created_at')
+    FIELDS = {'id': 'id', 'productId': 'product_id', 'product': 'product', 'locationId': 'location_id', 
+              'destinationLocationId': 'destination_location_id', 'movementType': 'movement_type', 
+              'quantity': 'quantity', 'referenceNumber': 'reference_number', 'notes': 'notes', 
+              'userId': 'user_id', 'createdAt': 'created_at'}
+    NESTED = {'product': Product}
+    
+    created_at = lazy_datetime()
+
+class Alert(Model):
+    """Alerta de inventario"""
+    
+    __slots__ = ('id', 'product_id', 'alert_type', 'threshold', 'enabled', 'status', 
+                 'notification_methods', '_created_at', '_updated_at')
+    FIELDS = {'id': 'id', 'productId': 'product_id', 'alertType': 'alert_type', 'threshold': 'threshold', 
+              'enabled': 'enabled', 'status': 'status', 'notificationMethods': 'notification_methods', 
+              'createdAt': 'created_at', 'updatedAt': 'updated_at'}
+    
+    created_at = lazy_datetime()
+    updated_at = lazy_datetime()
+
+class Webhook(Model):
+    """Webhook configurado"""
+    
+    __slots__ = ('id', 'url', 'events', 'active', 'secret', '_created_at', '_updated_at')
+    FIELDS = {'id': 'id', 'url': 'url', 'events': 'events', 'active': 'active', 'secret': 'secret', 
+              'createdAt': 'created_at', 'updatedAt': 'updated_at'}
+    
+    created_at = lazy_datetime()
+    updated_at = lazy_datetime()
+
+# ==================== COALESCENCIA DE PETICIONES ====================
+
+class SingleFlight:
+    """Deduplica llamadas idénticas en vuelo entre hilos
+    
+    Solo la primera llamada con una clave se ejecuta; las que llegan mientras
+    tanto esperan y reciben una copia de su resultado (o su excepción).
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+    
+    def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = concurrent_futures.Future()
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            return copy.deepcopy(future.result())
+        
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+class AsyncSingleFlight:
+    """Versión asyncio de SingleFlight"""
+    
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+    
+    async def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            return await asyncio.shield(task)
+        
+        self.coalesced += 1
+        return copy.deepcopy(await asyncio.shield(task))
+
+class BatchLoader:
+    """Agrupa cargas individuales en una sola llamada por lotes (estilo DataLoader)
+    
+    Las llamadas a ``load(key)`` hechas desde distintos hilos dentro de
+    ``window`` segundos se resuelven con una única invocación de
+    ``batch_fn(keys) -> {key: valor}``. Las claves repetidas comparten la misma
+    carga, y un valor que sea una excepción se relanza solo a quien pidió esa
+    clave. El primer hilo de cada ventana es quien ejecuta el lote.
+    """
+    
+    def __init__(self, batch_fn: Callable[[List[Any]], Dict], window: float = 0.005, 
+                 max_batch_size: int = 100):
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._full = threading.Event()
+        self._has_leader = False
+        self.loads = 0
+        self.batches = 0
+    
+    def load(self, key: Any) -> Any:
+        with self._lock:
+            self.loads += 1
+            future = self._pending.get(key)
+            shared = future is not None
+            if not shared:
+                future = self._pending[key] = concurrent_futures.Future()
+                if len(self._pending) >= self.max_batch_size:
+                    self._full.set()
+            leader = not self._has_leader
+            self._has_leader = True
+        
+        if leader:
+            self._full.wait(self.window)
+            self._dispatch()
+        
+        value = future.result()
+        return copy.deepcopy(value) if shared else value
+    
+    def _dispatch(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, OrderedDict()
+            self._has_leader = False
+            self._full.clear()
+        
+        keys = list(pending)
+        for i in range(0, len(keys), self.max_batch_size):
+            chunk = keys[i:i + self.max_batch_size]
+            self.batches += 1
+            try:
+                results = self.batch_fn(chunk)
+            except BaseException as e:
+                for key in chunk:
+                    pending[key].set_exception(e)
+                continue
+            for key in chunk:
+                value = results.get(key)
+                if isinstance(value, BaseException):
+                    pending[key].set_exception(value)
+                else:
+                    pending[key].set_result(value)
+
+class AsyncBatchLoader:
+    """Versión asyncio de BatchLoader (``batch_fn`` es una corutina)"""
+    
+    def __init__(self, batch_fn: Callable[[List[Any]], Any], window: float = 0.005, 
+                 max_batch_size: int = 100):
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending = OrderedDict()
+        self._handle = None
+        self.loads = 0
+        self.batches = 0
+    
+    async def load(self, key: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        self.loads += 1
+        future = self._pending.get(key)
+        shared = future is not None
+        if not shared:
+            future = self._pending[key] = loop.create_future()
+            if len(self._pending) >= self.max_batch_size:
+                self._dispatch()
+            elif self._handle is None:
+                self._handle = loop.call_later(self.window, self._dispatch)
+        
+        value = await asyncio.shield(future)
+        return copy.deepcopy(value) if shared else value
+    
+    def _dispatch(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        pending, self._pending = self._pending, OrderedDict()
+        keys = list(pending)
+        for i in range(0, len(keys), self.max_batch_size):
+            self.batches += 1
+            asyncio.ensure_future(self._run({key: pending[key] for key in keys[i:i + self.max_batch_size]}))
+    
+    async def _run(self, futures: Dict[Any, 'asyncio.Future']) -> None:
+        try:
+            results = await self.batch_fn(list(futures))
+        except BaseException as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in futures.items():
+            if future.done():
+                continue
+            value = results.get(key)
+            if isinstance(value, BaseException):
+                future.set_exception(value)
+            else:
+                future.set_result(value)
+
+# ==================== INSTRUMENTACIÓN ====================
+
+@functools.lru_cache(maxsize=4096)
+def _route_template(endpoint: str) -> str:
+    """Ruta sin ids para agrupar métricas (``/products/prod-1`` -> ``/products/{id}``)"""
+    return '/'.join('{id}' if any(c.isdigit() for c in segment) else segment 
+                    for segment in endpoint.split('?', 1)[0].split('/'))
+
+class RequestTrace:
+    """Un intento HTTP tal como lo ven los hooks de Instrumentation (tiempos en segundos)"""
+    
+    __slots__ = ('method', 'endpoint', 'route', 'attempt', 'status', 'error', 'bytes_out', 'bytes_in', 
+                 'connect', 'ttfb', 'total', 'retry_delay', 'started', 'start_ns', 'connect_started')
+    
+    def __init__(self, method: str, endpoint: str, attempt: int, bytes_out: int):
+        self.method = method.upper()
+        self.endpoint = endpoint
+        self.route = _route_template(endpoint)
+        self.attempt = attempt
+        self.status = None
+        self.error = None
+        self.bytes_out = bytes_out
+        self.bytes_in = 0
+        self.connect = None  # DNS + conexión, solo si se abrió una conexión nueva
+        self.ttfb = None
+        self.total = None
+        self.retry_delay = None
+        self.started = time.perf_counter()
+        self.start_ns = time.time_ns()
+        self.connect_started = None
+
+class LatencyHistogram:
+    """Histograma acumulativo con los buckets por defecto de Prometheus"""
+    
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    __slots__ = ('counts', 'sum', 'count')
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Cota superior del bucket que contiene el cuantil ``q`` (0-1)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+class Instrumentation:
+    """Hooks y métricas por petición para InventoryAPI / AsyncInventoryAPI
+    
+    Se activa pasando ``instrumentation=Instrumentation()`` al cliente; sin
+    ella el cliente no mide nada. Registra por ruta (con los ids normalizados)
+    histogramas de latencia de conexión (DNS + connect, solo en el cliente
+    asíncrono), TTFB y total, peticiones por status, reintentos, segundos de
+    backoff, bytes enviados/recibidos y eventos de cache, rate limit y
+    renovación de token. ``prometheus_text()`` los exporta en formato de
+    exposición de Prometheus y, con ``tracer`` (un tracer de OpenTelemetry),
+    cada intento se emite además como span.
+    
+    Hooks (pueden lanzar excepciones, que se registran y se ignoran):
+    ``before(trace)`` antes de cada intento, ``after(trace)`` al terminarlo,
+    ``retry(trace)`` cuando se programa un reintento y ``event(name, route, value)``.
+    """
+    
+    PHASES = ('connect', 'ttfb', 'total')
+    
+    def __init__(self, namespace: str = 'inventory_sdk', tracer: Any = None):
+        self.namespace = namespace
+        self.tracer = tracer
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._hooks = {'before': [], 'after': [], 'retry': [], 'event': []}
+        self._latency = {}
+        self._requests = {}
+        self._retries = {}
+        self._backoff = {}
+        self._bytes_out = {}
+        self._bytes_in = {}
+        self._events = {}
+        self._event_seconds = {}
+    
+    def on(self, hook: str, fn: Callable = None) -> Callable:
+        """Registra un hook ('before', 'after', 'retry' o 'event'); usable como decorador"""
+        if hook not in self._hooks:
+            raise ValueError(f'Hook desconocido: {hook}')
+        
+        def register(f):
+            self._hooks[hook].append(f)
+            return f
+        
+        return register(fn) if fn is not None else register
+    
+    def _call(self, hook: str, *args) -> None:
+        for fn in self._hooks[hook]:
+            try:
+                fn(*args)
+            except Exception:
+                self.logger.exception('Error en hook de instrumentación %s', hook)
+    
+    # ---- Llamadas desde el cliente ----
+    
+    def start(self, method: str, endpoint: str, attempt: int, bytes_out: int = 0) -> RequestTrace:
+        trace = RequestTrace(method, endpoint, attempt, bytes_out)
+        if self._hooks['before']:
+            self._call('before', trace)
+        return trace
+    
+    def finish(self, trace: RequestTrace, status: int, bytes_in: int = 0, ttfb: float = None, 
+               error: Exception = None) -> None:
+        trace.total = time.perf_counter() - trace.started
+        trace.status = status
+        trace.bytes_in = bytes_in
+        trace.ttfb = ttfb
+        trace.error = error
+        route = trace.route
+        label = (trace.method, route, str(status) if status else 'error')
+        
+        with self._lock:
+            for phase in self.PHASES:
+                value = getattr(trace, phase)
+                if value is not None:
+                    histogram = self._latency.get((route, phase))
+                    if histogram is None:
+                        histogram = self._latency[(route, phase)] = LatencyHistogram()
+                    histogram.observe(value)
+            self._requests[label] = self._requests.get(label, 0) + 1
+            self._bytes_out[route] = self._bytes_out.get(route, 0) + trace.bytes_out
+            self._bytes_in[route] = self._bytes_in.get(route, 0) + bytes_in
+        
+        if self.tracer is not None:
+            self._emit_span(trace)
+        if self._hooks['after']:
+            self._call('after', trace)
+    
+    def retry(self, trace: RequestTrace, delay: float) -> None:
+        trace.retry_delay = delay
+        with self._lock:
+            self._retries[trace.route] = self._retries.get(trace.route, 0) + 1
+            self._backoff[trace.route] = self._backoff.get(trace.route, 0.0) + (delay or 0.0)
+        if self._hooks['retry']:
+            self._call('retry', trace)
+    
+    def event(self, name: str, endpoint: str = None, value: float = None) -> None:
+        """Evento puntual: cache_hit, cache_miss, cache_revalidated, rate_limit_wait, rate_limited, token_refresh"""
+        route = _route_template(endpoint) if endpoint else ''
+        with self._lock:
+            self._events[(name, route)] = self._events.get((name, route), 0) + 1
+            if value is not None:
+                self._event_seconds[name] = self._event_seconds.get(name, 0.0) + value
+        if self._hooks['event']:
+            self._call('event', name, route, value)
+    
+    def _emit_span(self, trace: RequestTrace) -> None:
+        attributes = {
+            'http.request.method': trace.method,
+            'url.path': trace.endpoint,
+            'http.route': trace.route,
+            'http.request.resend_count': trace.attempt - 1,
+            'http.request.body.size': trace.bytes_out,
+            'http.response.body.size': trace.bytes_in
+        }
+        if trace.status:
+            attributes['http.response.status_code'] = trace.status
+        if trace.error is not None:
+            attributes['error.type'] = type(trace.error).__name__
+        try:
+            span = self.tracer.start_span(f'{trace.method} {trace.route}', start_time=trace.start_ns, 
+                                          attributes=attributes)
+            span.end(end_time=trace.start_ns + int(trace.total * 1e9))
+        except Exception:
+            self.logger.exception('No se pudo emitir el span de %s %s', trace.method, trace.route)
+    
+    def aiohttp_trace_config(self) -> 'aiohttp.TraceConfig':
+        """TraceConfig de aiohttp que mide DNS + conexión de cada RequestTrace"""
+        async def on_start(session, context, params):
+            trace = context.trace_request_ctx
+            if isinstance(trace, RequestTrace):
+                trace.connect_started = time.perf_counter()
+        
+        async def on_end(session, context, params):
+            trace = context.trace_request_ctx
+            if isinstance(trace, RequestTrace) and trace.connect_started is not None:
+                trace.connect = time.perf_counter() - trace.connect_started
+        
+        config = aiohttp.TraceConfig()
+        config.on_connection_create_start.append(on_start)
+        config.on_connection_create_end.append(on_end)
+        return config
+    
+    # ---- Consulta y exportación ----
+    
+    def summary(self) -> List[Dict]:
+        """Métricas por ruta ordenadas por tiempo total consumido"""
+        with self._lock:
+            routes = {route for route, _ in self._latency}
+            rows = []
+            for route in routes:
+                total = self._latency.get((route, 'total'))
+                rows.append({
+                    'route': route,
+                    'requests': total.count if total else 0,
+                    'totalSeconds': total.sum if total else 0.0,
+                    'avgSeconds': total.sum / total.count if total and total.count else None,
+                    'p50Seconds': total.quantile(0.5) if total else None,
+                    'p99Seconds': total.quantile(0.99) if total else None,
+                    'retries': self._retries.get(route, 0),
+                    'backoffSeconds': self._backoff.get(route, 0.0),
+                    'bytesOut': self._bytes_out.get(route, 0),
+                    'bytesIn': self._bytes_in.get(route, 0)
+                })
+        return sorted(rows, key=lambda row: row['totalSeconds'], reverse=True)
+    
+    @staticmethod
+    def _labels(**labels) -> str:
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in labels.items()) + '}'
+    
+    def prometheus_text(self) -> str:
+        """Métricas en formato de exposición de texto de Prometheus"""
+        ns = self.namespace
+        lines = []
+        
+        def counter(name, help_text, samples):
+            lines.append(f'# HELP {ns}_{name} {help_text}')
+            lines.append(f'# TYPE {ns}_{name} counter')
+            for labels, value in samples:
+                lines.append(f'{ns}_{name}{self._labels(**labels)} {value}')
+        
+        with self._lock:
+            lines.append(f'# HELP {ns}_request_duration_seconds Latencia por ruta y fase (connect, ttfb, total)')
+            lines.append(f'# TYPE {ns}_request_duration_seconds histogram')
+            for (route, phase), histogram in sorted(self._latency.items()):
+                cumulative = 0
+                for bound, count in zip(LatencyHistogram.BUCKETS + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{ns}_request_duration_seconds_bucket'
+                                 f'{self._labels(route=route, phase=phase, le=le)} {cumulative}')
+                lines.append(f'{ns}_request_duration_seconds_sum{self._labels(route=route, phase=phase)} {histogram.sum}')
+                lines.append(f'{ns}_request_duration_seconds_count{self._labels(route=route, phase=phase)} {histogram.count}')
+            
+            counter('requests_total', 'Intentos HTTP por método, ruta y status', 
+                    [({'method': m, 'route': r, 'status': s}, v) for (m, r, s), v in sorted(self._requests.items())])
+            counter('retries_total', 'Reintentos programados por ruta', 
+                    [({'route': r}, v) for r, v in sorted(self._retries.items())])
+            counter('backoff_seconds_total', 'Segundos de espera entre reintentos por ruta', 
+                    [({'route': r}, v) for r, v in sorted(self._backoff.items())])
+            counter('bytes_sent_total', 'Bytes de cuerpo enviados por ruta', 
+                    [({'route': r}, v) for r, v in sorted(self._bytes_out.items())])
+            counter('bytes_received_total', 'Bytes de cuerpo recibidos por ruta', 
+                    [({'route': r}, v) for r, v in sorted(self._bytes_in.items())])
+            counter('events_total', 'Eventos de cache, rate limit y autenticación', 
+                    [({'event': e, 'route': r}, v) for (e, r), v in sorted(self._events.items())])
+            counter('event_seconds_total', 'Segundos acumulados por tipo de evento (p. ej. rate_limit_wait)', 
+                    [({'event': e}, v) for e, v in sorted(self._event_seconds.items())])
+        
+        return '\n'.join(lines) + '\n'
+    
+    def reset(self) -> None:
+        with self._lock:
+            for store in (self._latency, self._requests, self._retries, self._backoff, 
+                          self._bytes_out, self._bytes_in, self._events, self._event_seconds):
+                store.clear()
+
+# ==================== POLÍTICA DE REINTENTOS ====================
+
+class RetryBudget:
+    """Presupuesto de reintentos compartido: como máximo ``ratio`` del tráfico
+    
+    Cada llamada nueva deposita ``ratio`` fichas y cada reintento consume una;
+    además se reponen ``min_per_second`` fichas por segundo para que con poco
+    tráfico se pueda seguir reintentando. ``max_tokens`` limita la reserva.
+    """
+    
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+    
+    def deposit(self) -> None:
+        self._refill()
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+    
+    def try_withdraw(self) -> bool:
+        self._refill()
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+    
+    def refund(self) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + 1.0)
+    
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+class CircuitBreaker:
+    """Circuit breaker de un endpoint: closed -> open -> half_open -> closed
+    
+    Tras ``failure_threshold`` fallos consecutivos se abre durante
+    ``reset_timeout`` segundos; luego deja pasar hasta ``half_open_max``
+    llamadas de prueba: si una tiene éxito se cierra y si falla vuelve a abrirse.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    __slots__ = ('failure_threshold', 'reset_timeout', 'half_open_max', 'state', 
+                 'failures', 'opened_at', 'probes')
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+    
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+    
+    def allow(self) -> Optional[bool]:
+        """None si se rechaza la llamada; True si es una llamada de prueba (half-open)"""
+        if self.state == self.OPEN:
+            if self.retry_in() > 0:
+                return None
+            self.state, self.probes = self.HALF_OPEN, 0
+        if self.state == self.HALF_OPEN:
+            if self.probes >= self.half_open_max:
+                if time.monotonic() - self.opened_at < 2 * self.reset_timeout:
+                    return None
+                self.probes = 0  # Una prueba que nunca informó su resultado no bloquea el circuito
+            self.probes += 1
+            return True
+        return False
+    
+    def record(self, success: Optional[bool], probe: bool) -> bool:
+        """Registra un resultado (None = neutro, p. ej. 429); devuelve True si el circuito se abrió"""
+        if probe:
+            self.probes = max(0, self.probes - 1)
+        if success is None:
+            return False
+        if success:
+            if probe or self.state == self.CLOSED:
+                self.state, self.failures = self.CLOSED, 0
+            return False
+        if probe or (self.state == self.CLOSED and self.failures + 1 >= self.failure_threshold):
+            self.state, self.opened_at, self.failures = self.OPEN, time.monotonic(), 0
+            return True
+        if self.state == self.CLOSED:
+            self.failures += 1
+        return False
+
+class RetryCall:
+    """Estado de reintentos de una llamada en curso"""
+    
+    __slots__ = ('route', 'started', 'deadline', 'previous_delay', 'probe', 'stop_reason')
+    
+    def __init__(self, route: str, deadline: Optional[float], base_delay: float, probe: bool):
+        self.route = route
+        self.started = time.monotonic()
+        self.deadline = deadline
+        self.previous_delay = base_delay
+        self.probe = probe
+        self.stop_reason = None
+    
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - (time.monotonic() - self.started)
+
+class RetryPolicy:
+    """Política de reintentos con jitter decorrelado, deadline, presupuesto y circuit breaker
+    
+    Se activa con ``retry_policy=RetryPolicy(...)``; sustituye al reintento
+    lineal de ``retry_attempts``/``retry_delay``. Cada espera se elige al azar
+    entre ``base_delay`` y el triple de la anterior (sin superar ``max_delay``),
+    respetando Retry-After si es mayor. No se reintenta si la espera excede el
+    ``deadline`` total de la llamada, si se agota el RetryBudget compartido por
+    el cliente o si el circuito del endpoint está abierto. Con el circuito
+    abierto las llamadas fallan de inmediato con APIError ``CIRCUIT_OPEN``.
+    """
+    
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.1, max_delay: float = 20.0, 
+                 deadline: float = None, budget: RetryBudget = None, failure_threshold: int = 5, 
+                 reset_timeout: float = 30.0, half_open_max: int = 1, rng: random.Random = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.budget = budget if budget is not None else RetryBudget()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self.rng = rng or random.Random()
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            'calls': 0,
+            'retries': 0,
+            'rejected': 0,
+            'circuitOpened': 0,
+            'budgetExhausted': 0,
+            'deadlineExceeded': 0
+        }
+    
+    def _breaker(self, route: str) -> CircuitBreaker:
+        breaker = self._breakers.get(route)
+        if breaker is None:
+            breaker = self._breakers[route] = CircuitBreaker(self.failure_threshold, self.reset_timeout, 
+                                                             self.half_open_max)
+        return breaker
+    
+    def begin(self, endpoint: str) -> RetryCall:
+        """Inicia una llamada; lanza APIError CIRCUIT_OPEN si el endpoint está en cortocircuito"""
+        route = _route_template(endpoint)
+        with self._lock:
+            breaker = self._breaker(route)
+            probe = breaker.allow()
+            if probe is None:
+                self.counters['rejected'] += 1
+                raise APIError('CIRCUIT_OPEN', f'Circuito abierto para {route}', 503, 
+                               {'route': route, 'retryIn': round(breaker.retry_in(), 3)})
+            self.counters['calls'] += 1
+            self.budget.deposit()
+        return RetryCall(route, self.deadline, self.base_delay, probe)
+    
+    def record(self, call: RetryCall, status: int) -> None:
+        """Registra el resultado de un intento (0 = error de red)"""
+        success = None if status == 429 else (0 < status < 500)
+        with self._lock:
+            if self._breaker(call.route).record(success, call.probe):
+                self.counters['circuitOpened'] += 1
+        call.probe = False
+    
+    def next_delay(self, call: RetryCall, retry_after: float = None) -> Optional[float]:
+        """Espera antes del siguiente intento o None si no debe reintentarse"""
+        delay = min(self.max_delay, self.rng.uniform(self.base_delay, max(self.base_delay, call.previous_delay * 3)))
+        call.previous_delay = delay
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        
+        with self._lock:
+            if self._breaker(call.route).state == CircuitBreaker.OPEN:
+                call.stop_reason = 'circuit_open'
+                return None
+            remaining = call.remaining()
+            if remaining is not None and delay >= remaining:
+                call.stop_reason = 'deadline_exceeded'
+                self.counters['deadlineExceeded'] += 1
+                return None
+            if not self.budget.try_withdraw():
+                call.stop_reason = 'retry_budget_exhausted'
+                self.counters['budgetExhausted'] += 1
+                return None
+            self.counters['retries'] += 1
+        return delay
+    
+    def attempt_timeout(self, call: RetryCall, timeout: float) -> float:
+        """Timeout de un intento recortado a lo que queda del deadline"""
+        remaining = call.remaining()
+        if remaining is None:
+            return timeout
+        return max(0.001, min(timeout, remaining))
+    
+    def circuit_state(self, endpoint: str) -> str:
+        with self._lock:
+            return self._breaker(_route_template(endpoint)).state
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.counters,
+                'budgetTokens': round(self.budget.tokens, 3),
+                'openCircuits': sorted(route for route, breaker in self._breakers.items() 
+                                       if breaker.state != CircuitBreaker.CLOSED)
+            }
+
+# ==================== TRANSPORTE HTTP ====================
+
+class TransportConfig:
+    """Configuración del pool de conexiones y del protocolo HTTP
+    
+    Los valores None conservan el comportamiento por defecto de cada cliente.
+    
+    - ``max_per_host``: conexiones reutilizables por host. En InventoryAPI debe
+      ser al menos el número de hilos que comparten el cliente; si no, urllib3
+      abre y descarta conexiones extra en cada ráfaga.
+    - ``pool_block``: al agotarse el pool, esperar una conexión libre en lugar
+      de abrir una desechable.
+    - ``max_connections``: conexiones totales (AsyncInventoryAPI y HTTP/2).
+    - ``host_pools``: hosts distintos cuyos pools se mantienen abiertos.
+    - ``keepalive_expiry``: segundos que una conexión ociosa sigue abierta
+      (AsyncInventoryAPI y HTTP/2; urllib3 no los expira por tiempo).
+    - ``tcp_keepalive``: sondas TCP keep-alive para que los balanceadores no
+      corten conexiones ociosas del pool.
+    - ``http2``: en InventoryAPI usa httpx con HTTP/2 y multiplexa todas las
+      peticiones sobre pocas conexiones (``pip install httpx[http2]``).
+    - ``dns_cache_ttl``: segundos de cache DNS del conector aiohttp.
+    """
+    
+    def __init__(self, max_per_host: int = None, pool_block: bool = False, max_connections: int = None, 
+                 host_pools: int = None, keepalive_expiry: float = None, tcp_keepalive: bool = False, 
+                 tcp_keepalive_idle: int = 60, tcp_keepalive_interval: int = 10, tcp_keepalive_count: int = 5, 
+                 http2: bool = False, dns_cache_ttl: int = None):
+        self.max_per_host = max_per_host
+        self.pool_block = pool_block
+        self.max_connections = max_connections
+        self.host_pools = host_pools
+        self.keepalive_expiry = keepalive_expiry
+        self.tcp_keepalive = tcp_keepalive
+        self.tcp_keepalive_idle = tcp_keepalive_idle
+        self.tcp_keepalive_interval = tcp_keepalive_interval
+        self.tcp_keepalive_count = tcp_keepalive_count
+        self.http2 = http2
+        self.dns_cache_ttl = dns_cache_ttl
+    
+    def socket_options(self) -> Optional[List[Tuple[int, int, int]]]:
+        """Opciones de socket para las conexiones de urllib3 (None = por defecto)"""
+        if not self.tcp_keepalive:
+            return None
+        from urllib3.connection import HTTPConnection
+        options = list(HTTPConnection.default_socket_options)
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        # TCP_KEEPIDLE en Linux, TCP_KEEPALIVE en macOS; no todas las plataformas los exponen
+        idle = getattr(socket, 'TCP_KEEPIDLE', getattr(socket, 'TCP_KEEPALIVE', None))
+        for option, value in ((idle, self.tcp_keepalive_idle), 
+                              (getattr(socket, 'TCP_KEEPINTVL', None), self.tcp_keepalive_interval), 
+                              (getattr(socket, 'TCP_KEEPCNT', None), self.tcp_keepalive_count)):
+            if option is not None:
+                options.append((socket.IPPROTO_TCP, option, value))
+        return options
+
+@functools.lru_cache(maxsize=None)
+def _transport_adapter_class() -> type:
+    """Crea TransportAdapter en el primer uso (requiere importar requests)"""
+    
+    class TransportAdapter(requests.adapters.HTTPAdapter):
+        """HTTPAdapter de requests que aplica las opciones de socket de TransportConfig"""
+        
+        def __init__(self, socket_options: List[Tuple[int, int, int]] = None, **kwargs):
+            self.socket_options = socket_options  # init_poolmanager se llama desde el __init__ base
+            super().__init__(**kwargs)
+        
+        def init_poolmanager(self, *args, **kwargs):
+            if self.socket_options is not None:
+                kwargs['socket_options'] = self.socket_options
+            super().init_poolmanager(*args, **kwargs)
+        
+        def __getstate__(self):
+            state = super().__getstate__()
+            state['socket_options'] = self.socket_options
+            return state
+    
+    TransportAdapter.__qualname__ = 'TransportAdapter'  # pickle lo resuelve con el __getattr__ del módulo
+    return TransportAdapter
+
+def __getattr__(name: str) -> Any:
+    """Atributos del módulo que se crean en el primer acceso"""
+    if name == 'TransportAdapter':
+        return _transport_adapter_class()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+class HTTP2Response:
+    """Respuesta httpx con la interfaz de requests.Response que usa InventoryAPI"""
+    
+    __slots__ = ('_response',)
+    
+    def __init__(self, response: 'httpx.Response'):
+        self._response = response
+    
+    @property
+    def status_code(self) -> int:
+        return self._response.status_code
+    
+    @property
+    def ok(self) -> bool:
+        return self._response.status_code < 400
+    
+    @property
+    def reason(self) -> str:
+        return self._response.reason_phrase
+    
+    @property
+    def headers(self) -> Any:
+        return self._response.headers
+    
+    @property
+    def content(self) -> bytes:
+        return self._response.content
+    
+    @property
+    def text(self) -> str:
+        return self._response.text
+    
+    @property
+    def elapsed(self) -> timedelta:
+        return self._response.elapsed
+    
+    @property
+    def http_version(self) -> str:
+        return self._response.http_version
+    
+    def iter_content(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.HTTPError as e:
+            raise HTTP2Session.translate_error(e) from e
+    
+    def close(self) -> None:
+        self._response.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+class HTTP2Session:
+    """Sesión HTTP/2 sobre httpx con la interfaz de requests.Session que usa InventoryAPI
+    
+    Los errores de httpx se traducen a excepciones de ``requests`` para que
+    reintentos y manejo de errores del cliente funcionen igual.
+    """
+    
+    def __init__(self, transport: TransportConfig, headers: Dict[str, str]):
+        if not httpx:
+            raise ImportError('TransportConfig(http2=True) requiere httpx: pip install httpx[http2]')
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        limits = httpx.Limits(
+            max_connections=transport.max_connections,
+            max_keepalive_connections=transport.max_per_host,
+            keepalive_expiry=transport.keepalive_expiry if transport.keepalive_expiry is not None else 5.0
+        )
+        self._client = httpx.Client(http2=True, limits=limits)
+    
+    @staticmethod
+    def translate_error(error: Exception) -> 'requests.exceptions.RequestException':
+        if isinstance(error, httpx.TimeoutException):
+            return requests.exceptions.Timeout(str(error))
+        return requests.exceptions.ConnectionError(str(error))
+    
+    def request(self, method: str, url: str, data: bytes = None, params: Dict = None, 
+                headers: Dict = None, timeout: float = None, stream: bool = False, **kwargs) -> HTTP2Response:
+        try:
+            request = self._client.build_request(method, url, content=data, params=params, 
+                                                 headers=dict(headers or self.headers), timeout=timeout, **kwargs)
+            return HTTP2Response(self._client.send(request, stream=stream))
+        except httpx.HTTPError as e:
+            raise self.translate_error(e) from e
+    
+    def get(self, url: str, **kwargs) -> HTTP2Response:
+        return self.request('GET', url, **kwargs)
+    
+    def close(self) -> None:
+        self._client.close()
+
+def _jwt_expiry(token: Optional[str]) -> Optional[float]:
+    """Claim ``exp`` (epoch) de un JWT sin verificar la firma, o None si no lo tiene"""
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+class InventoryAPI:
+    """Cliente Python para la API de Sistema de Inventario PYMES
+    
+    Una instancia puede compartirse entre hilos: la renovación del token es
+    single-flight (una sola llamada a /auth/refresh aunque muchos hilos reciban
+    401 a la vez) y se hace de forma proactiva ``refresh_margin`` segundos antes
+    del ``exp`` del JWT.
+    """
+    
+    DEFAULT_HEADERS = {
+        'Content-Type': 'application/json',
+        'Accept': 'application/json',
+        'User-Agent': 'InventoryAPI-Python-SDK/1.0.0'
+    }
+    
+    EXPORT_CONTENT_TYPES = {
+        'csv': 'text/csv',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        'pdf': 'application/pdf'
+    }
+    
+    def __init__(self, base_url: str = None, api_key: str = None, access_token: str = None, 
+                 refresh_token: str = None, timeout: int = 30, retry_attempts: int = 3, 
+                 retry_delay: float = 1.0, cache: ResponseCache = None, 
+                 rate_limiter: RateLimitGovernor = None, codec: JSONCodec = None, 
+                 compress_threshold: int = None, typed_models: bool = False, 
+                 coalesce_requests: bool = False, batch_lookups: bool = False, 
+                 batch_window: float = 0.005, instrumentation: Instrumentation = None, 
+                 retry_policy: RetryPolicy = None, transport: TransportConfig = None, 
+                 refresh_margin: float = 60.0, multi_id_queries: bool = False):
+        self.base_url = base_url or 'https://api.inventario-pymes.com/v1'
+        self.api_key = api_key
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.timeout = timeout
+        self.retry_attempts = retry_attempts
+        self.retry_delay = retry_delay
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self._codec = codec  # None: el más rápido disponible, elegido en el primer uso
+        self.compress_threshold = compress_threshold  # Bytes a partir de los cuales se comprime el body
+        self.typed_models = typed_models  # Devolver Product/StockLevel/Movement/... en lugar de dicts
+        self.coalesce_requests = coalesce_requests  # Compartir GETs idénticos en vuelo
+        self.batch_lookups = batch_lookups  # Agrupar get_product/get_product_stock concurrentes (con multi_id_queries)
+        self.batch_window = batch_window
+        self.multi_id_queries = multi_id_queries  # El servidor admite ids=a,b y productId=a,b (fuera de la spec)
+        self.instrumentation = instrumentation  # Hooks y métricas por petición (None = desactivado)
+        self.retry_policy = retry_policy  # Sustituye al reintento lineal de retry_attempts/retry_delay
+        self.transport = transport or TransportConfig()
+        self.refresh_margin = refresh_margin  # Segundos antes del exp en que se renueva el token
+        self._auth_lock = threading.RLock()
+        self._token_expiry = (None, None)  # (token, epoch de expiración)
+        self._single_flight = self._create_single_flight() if coalesce_requests else None
+        self._loaders = {}
+        
+        # Configurar logging
+        self.logger = logging.getLogger(__name__)
+        
+        # La sesión HTTP se crea en la primera petición
+        self._session = None
+        self._session_lock = threading.Lock()
+    
+    @property
+    def session(self) -> Any:
+        """Sesión HTTP compartida; se crea al usarse por primera vez"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+    
+    @session.setter
+    def session(self, value: Any) -> None:
+        self._session = value
+    
+    @property
+    def codec(self) -> JSONCodec:
+        if self._codec is None:
+            self._codec = get_json_codec()
+        return self._codec
+    
+    @codec.setter
+    def codec(self, value: JSONCodec) -> None:
+        self._codec = value
+    
+    def _create_session(self) -> 'requests.Session':
+        """Crea la sesión HTTP compartida por todas las peticiones"""
+        transport = self.transport
+        if transport.http2:
+            return HTTP2Session(transport, self.DEFAULT_HEADERS)
+        
+        session = requests.Session()
+        session.headers.update(self.DEFAULT_HEADERS)
+        
+        pool = {}
+        if transport.host_pools is not None:
+            pool['pool_connections'] = transport.host_pools
+        if transport.max_per_host is not None:
+            pool['pool_maxsize'] = transport.max_per_host
+        if pool or transport.pool_block or transport.tcp_keepalive:
+            adapter = _transport_adapter_class()(socket_options=transport.socket_options(), 
+                                       pool_block=transport.pool_block, **pool)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        return session
+    
+    def close(self) -> None:
+        """Cerrar el pool de conexiones"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+    
+    def _create_single_flight(self) -> SingleFlight:
+        return SingleFlight()
+    
+    def _batching(self) -> bool:
+        """Agrupar consultas por id solo si hay consulta multi-id
+        
+        Sin ella el lote acabaría en un GET por id tras esperar la ventana: más
+        latencia y el mismo número de peticiones. Los GET idénticos en vuelo ya
+        los comparte ``coalesce_requests``.
+        """
+        return self.batch_lookups and self.multi_id_queries
+    
+    def _get_loader(self, name: str, batch_fn: Callable) -> BatchLoader:
+        """Obtiene (o crea) el BatchLoader de un tipo de consulta"""
+        loader = self._loaders.get(name)
+        if loader is None:
+            loader = self._loaders.setdefault(name, BatchLoader(batch_fn, self.batch_window))
+        return loader
+    
+    def _set_tokens(self, access_token: Optional[str], refresh_token: Optional[str] = None, 
+                    expires_in: float = None) -> None:
+        """Actualiza los tokens; ``expires_in`` se usa si el JWT no trae ``exp``"""
+        with self._auth_lock:
+            self.access_token = access_token
+            if refresh_token is not None:
+                self.refresh_token = refresh_token
+            expires_at = _jwt_expiry(access_token)
+            if expires_at is None and expires_in:
+                expires_at = time.time() + float(expires_in)
+            self._token_expiry = (access_token, expires_at)
+    
+    def _token_expires_at(self) -> Optional[float]:
+        token, expires_at = self._token_expiry
+        if token != self.access_token:
+            # El token se asignó directamente: leer su exp
+            expires_at = _jwt_expiry(self.access_token)
+            self._token_expiry = (self.access_token, expires_at)
+        return expires_at
+    
+    def _token_needs_refresh(self, endpoint: str) -> bool:
+        """True si el token está por expirar y puede renovarse antes de la petición"""
+        if not self.access_token or not self.refresh_token or endpoint.startswith('/auth/'):
+            return False
+        expires_at = self._token_expires_at()
+        return expires_at is not None and time.time() >= expires_at - self.refresh_margin
+    
+    def _ensure_fresh_token(self, endpoint: str) -> None:
+        """Renovación proactiva; si falla, la petición sigue y el 401 se maneja como siempre"""
+        if self._token_needs_refresh(endpoint):
+            try:
+                self.refresh_access_token(stale_token=self.access_token)
+            except APIError as e:
+                self.logger.warning('No se pudo renovar el token antes de expirar: %s', e)
+    
+    def _get_auth_headers(self) -> Dict[str, str]:
+        """Obtiene headers de autenticación"""
+        headers = {}
+        if self.access_token:
+            headers['Authorization'] = f'Bearer {self.access_token}'
+        elif self.api_key:
+            headers['X-API-Key'] = self.api_key
+        return headers
+    
+    def _calculate_retry_delay(self, attempt: int, status_code: int = None, 
+                              retry_after: float = None) -> float:
+        """Calcula el delay para reintentos"""
+        if status_code == 429:  # Rate limit
+            if retry_after is not None:
+                return retry_after
+            return min(60.0, self.retry_delay * (2 ** attempt))
+        return self.retry_delay * attempt
+    
+    def _retry_wait(self, attempt: int, status_code: int, response_headers: Any, 
+                    call: RetryCall = None) -> Optional[float]:
+        """Espera antes de reintentar una respuesta de error (None = no reintentar)
+        
+        Con un RateLimitGovernor que ya bloqueó el envío (Retry-After/reset) no se
+        duerme aquí: la espera la impone ``acquire()`` al siguiente intento.
+        """
+        if status_code == 429 and self.rate_limiter is not None and self.rate_limiter.blocked_for() > 0:
+            if call is not None and self.retry_policy.next_delay(call, self.rate_limiter.blocked_for()) is None:
+                return None
+            return 0.0
+        retry_after = RateLimitGovernor.parse_retry_after(response_headers.get('Retry-After'))
+        if call is not None:
+            return self.retry_policy.next_delay(call, retry_after)
+        return self._calculate_retry_delay(attempt, status_code, retry_after)
+    
+    def _network_retry_wait(self, attempt: int, call: RetryCall = None) -> Optional[float]:
+        """Espera antes de reintentar un error de red (None = no reintentar)"""
+        if call is not None:
+            return self.retry_policy.next_delay(call)
+        return self.retry_delay * attempt
+    
+    def _begin_call(self, endpoint: str) -> Tuple[Optional[RetryCall], int]:
+        """Estado de reintentos y número de intentos para una llamada"""
+        if self.retry_policy is None:
+            return None, self.retry_attempts
+        try:
+            return self.retry_policy.begin(endpoint), self.retry_policy.max_attempts
+        except APIError:
+            if self.instrumentation is not None:
+                self.instrumentation.event('circuit_open', endpoint)
+            raise
+    
+    def _retry_stopped(self, call: Optional[RetryCall], endpoint: str) -> None:
+        if call is not None and self.instrumentation is not None and call.stop_reason:
+            self.instrumentation.event(call.stop_reason, endpoint)
+    
+    @staticmethod
+    def _build_error(status: int, reason: str, error_data: Dict) -> APIError:
+        """Construye un APIError a partir del cuerpo de una respuesta fallida"""
+        return APIError(
+            code=error_data.get('code', 'UNKNOWN_ERROR'),
+            message=error_data.get('message', reason),
+            status=status,
+            details=error_data.get('details', {}),
+            request_id=error_data.get('requestId')
+        )
+    
+    def _model(self, model_class: type) -> Optional[type]:
+        """Clase de modelo a usar como record_type si el cliente devuelve modelos tipados"""
+        return model_class if self.typed_models else None
+    
+    def _encode_body(self, data: Any) -> Tuple[Optional[bytes], Dict[str, str]]:
+        """Serializa el body con el codec y lo comprime con gzip si supera el umbral"""
+        if not data:
+            return None, {}
+        body = self.codec.dumps(data)
+        if self.compress_threshold is not None and len(body) >= self.compress_threshold:
+            return gzip.compress(body, compresslevel=5), {'Content-Encoding': 'gzip'}
+        return body, {}
+    
+    def _decode_error(self, body: bytes) -> Dict:
+        """Decodifica el cuerpo de una respuesta de error (o {} si no es JSON)"""
+        try:
+            error_data = self.codec.loads(body)
+        except Exception:
+            return {}
+        return error_data if isinstance(error_data, dict) else {}
+    
+    def _lookup_cache(self, method: str, endpoint: str, params: Dict, 
+                      request_headers: Dict) -> Tuple[Optional[Tuple], Optional[CacheEntry], Optional[CacheEntry]]:
+        """Consulta la cache antes de una petición
+        
+        Devuelve (clave, entrada_vigente, entrada_a_revalidar). Si hay una entrada
+        caducada con ETag se añade If-None-Match a ``request_headers``.
+        """
+        if self.cache is None or method.upper() != 'GET':
+            return None, None, None
+        
+        key = self.cache.make_key(method, endpoint, params)
+        entry = self.cache.get(key)
+        if entry is not None:
+            return key, entry, None
+        
+        stale = self.cache.get_stale(key)
+        if stale is not None:
+            request_headers['If-None-Match'] = stale.etag
+        return key, None, stale
+    
+    def _store_cached(self, key: Tuple, endpoint: str, stale: Optional[CacheEntry], 
+                      status: int, response_headers: Any, body: bytes, 
+                      record_type: Callable[[Dict], Any] = None) -> Any:
+        """Guarda (o revalida con un 304) una respuesta y devuelve su valor decodificado"""
+        if status == 304 and stale is not None:
+            return self.cache.revalidate(key, stale).value(self.codec, record_type)
+        
+        entry = self.cache.put(key, endpoint, body, response_headers.get('content-type', ''), 
+                               response_headers.get('etag'))
+        return entry.value(self.codec, record_type)
+    
+    @staticmethod
+    def _split_page(response: Any, page: int, limit: int) -> Tuple[List[Dict], bool]:
+        """Separa una página en (registros, hay_más_páginas)
+        
+        Soporta respuestas ``{'data': [...], 'pagination': {...}}`` y listas planas.
+        Sin metadatos de paginación (p. ej. ``/inventory/stock``, que según la
+        spec es una lista plana) se asume que la respuesta ya es completa.
+        """
+        if not isinstance(response, dict):
+            return response or [], False
+        items = response.get('data') or []
+        pagination = response.get('pagination')
+        if not pagination:
+            return items, False
+        total_pages = pagination.get('totalPages', pagination.get('pages'))
+        if total_pages is not None:
+            return items, page < total_pages
+        if pagination.get('total') is not None:
+            return items, page * limit < pagination['total']
+        return items, len(items) == limit
+    
+    @staticmethod
+    def _page_signature(items: List[Any]) -> Optional[Tuple]:
+        """Primer y último registro de una página, para detectar un servidor que repite la misma página"""
+        return (items[0], items[-1]) if items else None
+    
+    def _iter_pages(self, fetch_page: Callable[[int], Any], limit: int, 
+                    max_items: int = None, prefetch: bool = True) -> Iterator[Dict]:
+        """Recorre un endpoint paginado registro a registro
+        
+        Solo mantiene en memoria la página actual y, con ``prefetch``, la siguiente,
+        que se descarga en segundo plano mientras se consume la actual.
+        """
+        executor = concurrent_futures.ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            page = 1
+            pending = executor.submit(fetch_page, page) if executor else None
+            yielded = 0
+            previous = None
+            
+            while True:
+                response = pending.result() if executor else fetch_page(page)
+                items, has_more = self._split_page(response, page, limit)
+                signature = self._page_signature(items)
+                if page > 1 and signature == previous:
+                    return  # El servidor ignoró ``page`` y devolvió la misma página
+                previous = signature
+                
+                # Pedir la siguiente página antes de procesar la actual
+                wants_more = max_items is None or yielded + len(items) < max_items
+                if executor and has_more and wants_more:
+                    pending = executor.submit(fetch_page, page + 1)
+                
+                for item in items:
+                    yield item
+                    yielded += 1
+                    if max_items is not None and yielded >= max_items:
+                        return
+                
+                if not has_more or not items:
+                    return
+                page += 1
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _coalesce_key(self, endpoint: str, method: str, data: Any, params: Dict, headers: Dict, 
+                      record_type: Any, kwargs: Dict) -> Optional[Tuple]:
+        """Clave para compartir una petición en vuelo, o None si no es coalescible"""
+        if self._single_flight is None or method.upper() != 'GET' or data or kwargs:
+            return None
+        return (ResponseCache.make_key(method, endpoint, params), 
+                tuple(sorted((headers or {}).items())), record_type)
+    
+    def request(self, endpoint: str, method: str = 'GET', data: Dict = None, 
+                params: Dict = None, headers: Dict = None, 
+                record_type: Callable[[Dict], Any] = None, **kwargs) -> Any:
+        """Realiza una petición HTTP con reintentos automáticos
+        
+        Con ``record_type`` cada registro JSON de la respuesta se convierte con él.
+        Con ``coalesce_requests`` los GET idénticos en vuelo se resuelven una sola vez.
+        """
+        key = self._coalesce_key(endpoint, method, data, params, headers, record_type, kwargs)
+        if key is not None:
+            return self._single_flight.do(key, lambda: self._perform_request(
+                endpoint, method, data, params, headers, record_type))
+        return self._perform_request(endpoint, method, data, params, headers, record_type, **kwargs)
+    
+    def _perform_request(self, endpoint: str, method: str = 'GET', data: Dict = None, 
+                         params: Dict = None, headers: Dict = None, 
+                         record_type: Callable[[Dict], Any] = None, **kwargs) -> Any:
+        """Ejecuta la petición HTTP con reintentos (sin coalescencia)"""
+        url = f"{self.base_url}{endpoint}"
+        self._ensure_fresh_token(endpoint)
+        
+        # Preparar headers
+        request_headers = self.session.headers.copy()
+        token_used = self.access_token
+        request_headers.update(self._get_auth_headers())
+        if headers:
+            request_headers.update(headers)
+        
+        instrumentation = self.instrumentation
+        
+        # Consultar la cache
+        cache_key, cached, stale = self._lookup_cache(method, endpoint, params, request_headers)
+        if instrumentation is not None and cache_key is not None:
+            instrumentation.event('cache_hit' if cached is not None else 'cache_miss', endpoint)
+        if cached is not None:
+            return cached.value(self.codec, record_type)
+        
+        # Preparar datos
+        body, body_headers = self._encode_body(data)
+        request_headers.update(body_headers)
+        
+        last_error = None
+        trace = None
+        call, attempts = self._begin_call(endpoint)
+        
+        for attempt in range(1, attempts + 1):
+            try:
+                if self.rate_limiter is not None:
+                    wait = self.rate_limiter.acquire()
+                    if wait:
+                        if instrumentation is not None:
+                            instrumentation.event('rate_limit_wait', endpoint, wait)
+                        time.sleep(wait)
+                
+                if instrumentation is not None:
+                    trace = instrumentation.start(method, endpoint, attempt, len(body) if body else 0)
+                
+                response = self.session.request(
+                    method=method,
+                    url=url,
+                    data=body,
+                    params=params,
+                    headers=request_headers,
+                    timeout=self.retry_policy.attempt_timeout(call, self.timeout) if call else self.timeout,
+                    **kwargs
+                )
+                
+                if self.rate_limiter is not None:
+                    self.rate_limiter.update(response.status_code, response.headers)
+                if call is not None:
+                    self.retry_policy.record(call, response.status_code)
+                if trace is not None:
+                    instrumentation.finish(trace, response.status_code, len(response.content), 
+                                           response.elapsed.total_seconds())
+                
+                # Manejar respuestas exitosas
+                if response.ok:
+                    if self.cache is not None and method.upper() != 'GET':
+                        self.cache.invalidate_for(endpoint)
+                    if cache_key is not None:
+                        if instrumentation is not None and response.status_code == 304:
+                            instrumentation.event('cache_revalidated', endpoint)
+                        return self._store_cached(cache_key, endpoint, stale, response.status_code, 
+                                                  response.headers, response.content, record_type)
+                    if response.headers.get('content-type', '').startswith('application/json'):
+                        return self.codec.decode(response.content, record_type)
+                    return response.text
+                
+                # Manejar errores
+                error_data = self._decode_error(response.content)
+                
+                error = self._build_error(response.status_code, response.reason, error_data)
+                
+                # Renovar token si es necesario
+                if (response.status_code == 401 and self.refresh_token and attempt == 1 
+                        and not endpoint.startswith('/auth/')):
+                    if instrumentation is not None:
+                        instrumentation.event('token_refresh', endpoint)
+                    self.refresh_access_token(stale_token=token_used)
+                    token_used = self.access_token
+                    request_headers.update(self._get_auth_headers())
+                    continue
+                
+                # No reintentar errores 4xx (excepto 429)
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    raise error
+                
+                last_error = error
+                if instrumentation is not None and response.status_code == 429:
+                    instrumentation.event('rate_limited', endpoint)
+                
+                # Esperar antes del siguiente intento
+                if attempt < attempts:
+                    delay = self._retry_wait(attempt, response.status_code, response.headers, call)
+                    if delay is None:
+                        break
+                    if trace is not None:
+                        instrumentation.retry(trace, delay)
+                    if delay:
+                        time.sleep(delay)
+                    
+            except requests.exceptions.RequestException as e:
+                last_error = APIError('NETWORK_ERROR', str(e), 0)
+                if trace is not None and trace.total is None:
+                    instrumentation.finish(trace, 0, error=e)
+                if call is not None:
+                    self.retry_policy.record(call, 0)
+                
+                if attempt < attempts:
+                    delay = self._network_retry_wait(attempt, call)
+                    if delay is None:
+                        break
+                    if trace is not None:
+                        instrumentation.retry(trace, delay)
+                    time.sleep(delay)
+        
+        self._retry_stopped(call, endpoint)
+        raise last_error
+    
+    # ==================== AUTENTICACIÓN ====================
+    
+    def login(self, email: str, password: str) -> Dict:
+        """Iniciar sesión y obtener tokens"""
+        response = self.request('/auth/login', 'POST', {
+            'email': email,
+            'password': password
+        })
+        
+        self._set_tokens(response['accessToken'], response['refreshToken'], response.get('expiresIn'))
+        if self.cache is not None:
+            self.cache.clear()
+        
+        return response
+    
+    def refresh_access_token(self, stale_token: str = None) -> Dict:
+        """Renovar el access token
+        
+        Con ``stale_token`` solo se renueva si el token actual sigue siendo ese:
+        los hilos que esperaban a otra renovación en curso reutilizan su resultado.
+        """
+        with self._auth_lock:
+            if stale_token is not None and self.access_token != stale_token:
+                return {'accessToken': self.access_token}
+            if not self.refresh_token:
+                raise ValueError('No refresh token available')
+            
+            response = self.request('/auth/refresh', 'POST', {
+                'refreshToken': self.refresh_token
+            })
+            
+            self._set_tokens(response['accessToken'], response.get('refreshToken'), response.get('expiresIn'))
+            return response
+    
+    def logout(self) -> Dict:
+        """Cerrar sesión"""
+        response = self.request('/auth/logout', 'POST', {
+            'refreshToken': self.refresh_token
+        })
+        
+        with self._auth_lock:
+            self.access_token = None
+            self.refresh_token = None
+        if self.cache is not None:
+            self.cache.clear()
+        
+        return response
+    
+    def get_current_user(self) -> Dict:
+        """Obtener información del usuario actual"""
+        return self.request('/auth/me')
+    
+    # ==================== PRODUCTOS ====================
+    
+    def get_products(self, page: int = 1, limit: int = 20, search: str = None, 
+                    category: str = None, is_active: bool = None) -> Dict:
+        """Obtener lista de productos"""
+        params = {'page': page, 'limit': limit}
+        if search:
+            params['search'] = search
+        if category:
+            params['category'] = category
+        if is_active is not None:
+            params['isActive'] = str(is_active).lower()
+        
+        return self.request('/products', params=params, record_type=self._model(Product))
+    
+    def get_product(self, product_id: str) -> Dict:
+        """Obtener producto específico"""
+        if self._batching():
+            return self._get_loader('products', self._batch_products).load(product_id)
+        return self._fetch_product(product_id)
+    
+    def _fetch_product(self, product_id: str) -> Dict:
+        return self.request(f'/products/{product_id}', record_type=self._model(Product))
+    
+    def _batch_products(self, product_ids: List[str]) -> Dict[str, Any]:
+        """Resuelve varios get_product agrupados por el BatchLoader
+        
+        Se usa una sola consulta ``/products?ids=...``; si el servidor la
+        rechaza, o falta algún producto en la respuesta, esos ids se piden
+        individualmente.
+        """
+        found = {}
+        try:
+            response = self.request('/products', params={'ids': ','.join(product_ids), 'limit': len(product_ids)}, 
+                                    record_type=self._model(Product))
+            found = {product.get('id'): product for product in _records(response)}
+        except APIError as e:
+            if e.status not in (400, 404, 422):
+                raise
+        
+        missing = [product_id for product_id in product_ids if product_id not in found]
+        found.update(self._fetch_each(self._fetch_product, missing))
+        return found
+    
+    @staticmethod
+    def _fetch_each(fetch: Callable, keys: List[Any]) -> Dict[Any, Any]:
+        """Carga cada clave en paralelo; los errores de API quedan como valor de su clave"""
+        def one(key):
+            try:
+                return fetch(*key) if isinstance(key, tuple) else fetch(key)
+            except APIError as e:
+                return e
+        
+        if len(keys) <= 1:
+            return {key: one(key) for key in keys}
+        with concurrent_futures.ThreadPoolExecutor(max_workers=min(len(keys), 8)) as executor:
+            return dict(zip(keys, executor.map(one, keys)))
+    
+    def create_product(self, product_data: Dict) -> Dict:
+        """Crear nuevo producto"""
+        return self.request('/products', 'POST', product_data, record_type=self._model(Product))
+    
+    def update_product(self, product_id: str, product_data: Dict) -> Dict:
+        """Actualizar producto existente"""
+        return self.request(f'/products/{product_id}', 'PUT', product_data, 
+                            record_type=self._model(Product))
+    
+    def delete_product(self, product_id: str) -> None:
+        """Eliminar producto"""
+        self.request(f'/products/{product_id}', 'DELETE')
+    
+    def search_products(self, query: str, **filters) -> Dict:
+        """Buscar productos"""
+        params = {'q': query, **filters}
+        return self.request('/products/search', params=params, record_type=self._model(Product))
+    
+    def iter_products(self, search: str = None, category: str = None, is_active: bool = None, 
+                      page_size: int = 100, max_items: int = None, prefetch: bool = True) -> Iterator[Dict]:
+        """Iterar todos los productos página a página sin cargarlos en memoria"""
+        def fetch_page(page: int):
+            return self.get_products(page=page, limit=page_size, search=search, 
+                                     category=category, is_active=is_active)
+        
+        return self._iter_pages(fetch_page, page_size, max_items, prefetch)
+    
+    def create_products_batch(self, products: List[Dict]) -> Dict:
+        """Crear múltiples productos"""
+        return self.request('/products/batch', 'POST', {'products': products})
+    
+    @staticmethod
+    def _iter_product_batches(rows: Iterator[Dict], batch_rows: int, batch_bytes: int, 
+                              required_fields: Tuple[str, ...], invalid: deque):
+        """Agrupa filas válidas en lotes acotados por filas y por bytes
+        
+        Las filas inválidas se acumulan en ``invalid`` para informarlas sin enviarlas.
+        """
+        batch, size = [], 0
+        for row_number, product in enumerate(rows, 1):
+            errors = validate_product(product, required_fields)
+            if errors:
+                sku = product.get('sku') if isinstance(product, dict) else None
+                invalid.append(ProductImportResult(row_number, sku, 'invalid', errors))
+                continue
+            
+            row_bytes = len(json.dumps(product, separators=(',', ':')))
+            if batch and (len(batch) >= batch_rows or size + row_bytes > batch_bytes):
+                yield batch
+                batch, size = [], 0
+            batch.append((row_number, product))
+            size += row_bytes
+        if batch:
+            yield batch
+    
+    @staticmethod
+    def _product_batch_results(batch: List[Tuple[int, Dict]], response: Any) -> List[ProductImportResult]:
+        """Reparte la respuesta de /products/batch entre las filas del lote"""
+        created = []
+        row_errors = {}
+        if isinstance(response, dict):
+            created = response.get('products') or response.get('data') or []
+            for error in response.get('errors') or []:
+                if isinstance(error, dict) and 'index' in error:
+                    row_errors[error['index']] = error.get('message', 'Error al crear el producto')
+        
+        results = []
+        for i, (row_number, product) in enumerate(batch):
+            if i in row_errors:
+                results.append(ProductImportResult(row_number, product.get('sku'), 'failed', [row_errors[i]]))
+            else:
+                item = created[i] if len(created) == len(batch) else None
+                results.append(ProductImportResult(row_number, product.get('sku'), 'created', product=item))
+        return results
+    
+    def _send_product_batch(self, batch: List[Tuple[int, Dict]]) -> List[ProductImportResult]:
+        """Envía un lote a /products/batch; si excede el tamaño permitido (413) lo divide"""
+        try:
+            response = self.create_products_batch([product for _, product in batch])
+            return self._product_batch_results(batch, response)
+        except APIError as e:
+            if e.status == 413 and len(batch) > 1:
+                middle = len(batch) // 2
+                return self._send_product_batch(batch[:middle]) + self._send_product_batch(batch[middle:])
+            return [ProductImportResult(row, product.get('sku'), 'failed', [str(e)]) for row, product in batch]
+    
+    def import_products(self, source: Any, format: str = None, batch_rows: int = 500, 
+                        batch_bytes: int = 1024 * 1024, max_workers: int = 4, 
+                        required_fields: Tuple[str, ...] = PRODUCT_REQUIRED_FIELDS) -> Iterator[ProductImportResult]:
+        """Importar productos desde CSV, JSONL o un iterable con memoria constante
+        
+        Las filas se leen y validan bajo demanda, se agrupan en lotes acotados para
+        /products/batch y se envían con hasta ``max_workers`` lotes en vuelo; no se
+        lee más de la fuente hasta que termina algún lote. Devuelve un generador de
+        ProductImportResult por fila, en el orden en que se resuelven.
+        """
+        invalid = deque()
+        batches = self._iter_product_batches(iter_product_rows(source, format), batch_rows, 
+                                             batch_bytes, required_fields, invalid)
+        executor = concurrent_futures.ThreadPoolExecutor(max_workers=max_workers)
+        in_flight = set()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(in_flight) < max_workers:
+                    batch = next(batches, None)
+                    if batch is None:
+                        exhausted = True
+                    else:
+                        in_flight.add(executor.submit(self._send_product_batch, batch))
+                    while invalid:
+                        yield invalid.popleft()
+                
+                if not in_flight:
+                    return
+                
+                done, in_flight = concurrent_futures.wait(in_flight, return_when=concurrent_futures.FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    # ==================== INVENTARIO ====================
+    
+    def get_stock_levels(self, product_id: str = None, location_id: str = None, 
+                        low_stock: bool = None, page: int = None, limit: int = None) -> List[Dict]:
+        """Obtener niveles de stock"""
+        params = {}
+        if product_id:
+            params['productId'] = product_id
+        if location_id:
+            params['locationId'] = location_id
+        if low_stock is not None:
+            params['lowStock'] = str(low_stock).lower()
+        if page is not None:
+            params['page'] = page
+        if limit is not None:
+            params['limit'] = limit
+        
+        return self.request('/inventory/stock', params=params, record_type=self._model(StockLevel))
+    
+    def iter_stock_levels(self, product_id: str = None, location_id: str = None, low_stock: bool = None, 
+                          page_size: int = 1000, max_items: int = None, prefetch: bool = True) -> Iterator[Dict]:
+        """Iterar los niveles de stock página a página (o de una vez si el servidor no pagina)"""
+        def fetch_page(page: int):
+            return self.get_stock_levels(product_id=product_id, location_id=location_id, 
+                                         low_stock=low_stock, page=page, limit=page_size)
+        
+        return self._iter_pages(fetch_page, page_size, max_items, prefetch)
+    
+    def get_product_stock(self, product_id: str, location_id: str = None) -> List[Dict]:
+        """Obtener stock de producto específico"""
+        if self._batching():
+            return self._get_loader('stock', self._batch_product_stock).load((product_id, location_id))
+        return self._fetch_product_stock(product_id, location_id)
+    
+    def _fetch_product_stock(self, product_id: str, location_id: str = None) -> List[Dict]:
+        params = {'productId': product_id}
+        if location_id:
+            params['locationId'] = location_id
+        
+        return self.request('/inventory/stock', params=params, record_type=self._model(StockLevel))
+    
+    @staticmethod
+    def _group_stock_keys(keys: List[Tuple[str, Optional[str]]]) -> Dict[Optional[str], List[str]]:
+        """Agrupa claves (producto, ubicación) por ubicación"""
+        groups = {}
+        for product_id, location_id in keys:
+            groups.setdefault(location_id, []).append(product_id)
+        return groups
+    
+    @staticmethod
+    def _split_stock_levels(levels: Any, product_ids: List[str], location_id: Optional[str]) -> Dict:
+        """Reparte los niveles de una consulta multi-id entre las claves pedidas"""
+        by_product = {product_id: [] for product_id in product_ids}
+        for level in _records(levels):
+            if level.get('productId') in by_product:
+                by_product[level.get('productId')].append(level)
+        return {(product_id, location_id): stock for product_id, stock in by_product.items()}
+    
+    def _batch_product_stock(self, keys: List[Tuple[str, Optional[str]]]) -> Dict:
+        """Resuelve varios get_product_stock agrupados por el BatchLoader
+        
+        Se hace una consulta ``productId=a,b,c`` por ubicación, y los productos
+        que no aparecen en la respuesta se piden individualmente (un servidor
+        que no la admite suele devolver 200 vacío).
+        """
+        results = {}
+        missing = []
+        for location_id, product_ids in self._group_stock_keys(keys).items():
+            params = {'productId': ','.join(product_ids)}
+            if location_id:
+                params['locationId'] = location_id
+            try:
+                levels = self.request('/inventory/stock', params=params, record_type=self._model(StockLevel))
+            except APIError as e:
+                if e.status not in (400, 404, 422):
+                    raise
+                missing.extend((product_id, location_id) for product_id in product_ids)
+                continue
+            for key, stock in self._split_stock_levels(levels, product_ids, location_id).items():
+                if stock:
+                    results[key] = stock
+                else:
+                    missing.append(key)
+        results.update(self._fetch_each(self._fetch_product_stock, missing))
+        return results
+    
+    def create_movement(self, movement_data: Dict) -> Dict:
+        """Crear movimiento de inventario"""
+        return self.request('/inventory/movements', 'POST', movement_data, 
+                            record_type=self._model(Movement))
+    
+    def get_movements(self, product_id: str = None, location_id: str = None, 
+                     movement_type: str = None, start_date: str = None, 
+                     end_date: str = None, page: int = 1, limit: int = 20) -> List[Dict]:
+        """Obtener movimientos de inventario"""
+        params = {'page': page, 'limit': limit}
+        if product_id:
+            params['productId'] = product_id
+        if location_id:
+            params['locationId'] = location_id
         if movement_type:
             params['movementType'] = movement_type
         if start_date:
@@ -272,250 +2750,3538 @@ class InventoryAPI:
         if end_date:
             params['endDate'] = end_date
         
-        return self.request('/inventory/movements', params=params)
+        return self.request('/inventory/movements', params=params, record_type=self._model(Movement))
+    
+    def iter_movements(self, product_id: str = None, location_id: str = None, 
+                       movement_type: str = None, start_date: str = None, 
+                       end_date: str = None, page_size: int = 100, max_items: int = None, 
+                       prefetch: bool = True) -> Iterator[Dict]:
+        """Iterar todo el historial de movimientos página a página"""
+        def fetch_page(page: int):
+            return self.get_movements(product_id=product_id, location_id=location_id, 
+                                      movement_type=movement_type, start_date=start_date, 
+                                      end_date=end_date, page=page, limit=page_size)
+        
+        return self._iter_pages(fetch_page, page_size, max_items, prefetch)
+    
+    def adjust_stock(self, product_id: str, location_id: str, quantity: float, 
+                    reason: str = '') -> Dict:
+        """Ajustar stock de producto"""
+        return self.create_movement({
+            'productId': product_id,
+            'locationId': location_id,
+            'movementType': 'adjustment',
+            'quantity': quantity,
+            'notes': reason
+        })
+    
+    def transfer_stock(self, product_id: str, from_location_id: str, 
+                      to_location_id: str, quantity: float, notes: str = '') -> Dict:
+        """Transferir stock entre ubicaciones"""
+        return self.create_movement({
+            'productId': product_id,
+            'locationId': from_location_id,
+            'movementType': 'transfer',
+            'quantity': -abs(quantity),
+            'destinationLocationId': to_location_id,
+            'notes': notes
+        })
+    
+    def update_stock_batch(self, updates: List[Dict], reference_number: str = '', 
+                          notes: str = '', idempotency_key: str = None) -> Dict:
+        """Actualizar stock en lote"""
+        return self.request('/inventory/stock/batch-update', 'POST', {
+            'updates': updates,
+            'referenceNumber': reference_number,
+            'notes': notes
+        }, headers={'Idempotency-Key': idempotency_key} if idempotency_key else None)
+    
+    # ==================== REPORTES ====================
+    
+    def get_stock_summary(self, location_id: str = None, category_id: str = None) -> Dict:
+        """Obtener resumen de stock"""
+        params = {}
+        if location_id:
+            params['locationId'] = location_id
+        if category_id:
+            params['categoryId'] = category_id
+        
+        return self.request('/reports/stock-summary', params=params)
+    
+    def get_movement_summary(self, start_date: str, end_date: str, 
+                           group_by: str = None) -> Dict:
+        """Obtener resumen de movimientos"""
+        params = {'startDate': start_date, 'endDate': end_date}
+        if group_by:
+            params['groupBy'] = group_by
+        
+        return self.request('/reports/movement-summary', params=params)
+    
+    def get_top_products(self, period: str = '30days', product_type: str = 'sold', 
+                        limit: int = 10) -> Dict:
+        """Obtener productos más vendidos/comprados"""
+        params = {'period': period, 'type': product_type, 'limit': limit}
+        return self.request('/reports/top-products', params=params)
+    
+    def _export_request_args(self, report_type: str, format: str, params: Dict, offset: int, 
+                             compress: bool, validator: str = None) -> Tuple[str, Dict, Dict]:
+        """URL, parámetros y headers para descargar un reporte desde ``offset``"""
+        headers = {**self._get_auth_headers(), 'Accept': self.EXPORT_CONTENT_TYPES.get(format, 'application/json')}
+        if offset:
+            # Range se aplica sobre la representación: reanudar siempre sin comprimir
+            headers['Range'] = f'bytes={offset}-'
+            headers['Accept-Encoding'] = 'identity'
+            if validator:
+                # Si el reporte cambió el servidor responde 200 con el reporte completo
+                headers['If-Range'] = validator
+        elif not compress:
+            headers['Accept-Encoding'] = 'identity'
+        return f"{self.base_url}/reports/{report_type}/export", {**params, 'format': format}, headers
+    
+    @staticmethod
+    def _export_validator(headers: Any) -> Optional[str]:
+        """ETag fuerte o Last-Modified de una respuesta completa, para If-Range"""
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return headers.get('Last-Modified')
+    
+    @staticmethod
+    def _export_resume_state(destination: str, report_type: str, format: str, 
+                             params: Dict) -> Tuple[int, Optional[str], Callable[[Optional[str]], None]]:
+        """(offset, validador, guardar_validador) para reanudar una descarga en ``destination``
+        
+        El validador se guarda junto al reporte en ``<destination>.resume``; sin
+        él, o si corresponde a otro reporte, la descarga empieza de cero.
+        """
+        sidecar = f'{os.fspath(destination)}.resume'
+        identity = json.dumps([report_type, format, params], sort_keys=True, default=str)
+        offset, validator = 0, None
+        try:
+            with open(sidecar, encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('report') == identity and state.get('validator') and os.path.exists(destination):
+                offset, validator = os.path.getsize(destination), state['validator']
+        except (OSError, ValueError):
+            pass
+        
+        def remember(new_validator: Optional[str]) -> None:
+            if new_validator:
+                with open(sidecar, 'w', encoding='utf-8') as f:
+                    json.dump({'report': identity, 'validator': new_validator}, f)
+            elif os.path.exists(sidecar):
+                os.remove(sidecar)
+        
+        return offset, validator, remember
+    
+    def _iter_export(self, report_type: str, format: str, params: Dict, chunk_size: int, 
+                     compress: bool = True, resume: bool = True, offset: int = 0, 
+                     on_restart: Callable[[], None] = None, validator: str = None, 
+                     on_validator: Callable[[Optional[str]], None] = None) -> Iterator[bytes]:
+        """Descarga un reporte por fragmentos reanudando con Range si se corta
+        
+        Al reanudar se envía If-Range con ``validator`` (o el de la primera
+        respuesta); si el servidor ignora el Range o el reporte cambió (responde
+        200 en lugar de 206) se llama a ``on_restart`` para descartar lo ya
+        recibido o, si no hay, se lanza APIError. ``on_validator`` recibe el
+        validador de cada respuesta completa.
+        Renovación del token, RetryPolicy e Instrumentation funcionan como en
+        ``request``; cada reintento continúa desde el último byte recibido.
+        """
+        endpoint = f'/reports/{report_type}/export'
+        self._ensure_fresh_token(endpoint)
+        instrumentation = self.instrumentation
+        last_error = None
+        trace = None
+        refreshed = False
+        call, attempts = self._begin_call(endpoint)
+        
+        for attempt in range(1, attempts + 1):
+            if self.rate_limiter is not None:
+                wait = self.rate_limiter.acquire()
+                if wait:
+                    if instrumentation is not None:
+                        instrumentation.event('rate_limit_wait', endpoint, wait)
+                    time.sleep(wait)
+            
+            url, query, headers = self._export_request_args(report_type, format, params, offset, 
+                                                            compress, validator)
+            token_used = self.access_token
+            if instrumentation is not None:
+                trace = instrumentation.start('GET', endpoint, attempt)
+            received = 0
+            try:
+                with self.session.get(url, params=query, headers=headers, stream=True, 
+                                      timeout=self.retry_policy.attempt_timeout(call, self.timeout) if call else self.timeout
+                                      ) as response:
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.update(response.status_code, response.headers)
+                    if call is not None:
+                        self.retry_policy.record(call, response.status_code)
+                    ttfb = response.elapsed.total_seconds()
+                    
+                    if response.status_code == 416 and offset:
+                        if trace is not None:
+                            instrumentation.finish(trace, response.status_code, 0, ttfb)
+                        return  # Ya se había descargado completo
+                    if not response.ok:
+                        if trace is not None:
+                            instrumentation.finish(trace, response.status_code, len(response.content), ttfb)
+                        error = self._build_error(response.status_code, response.reason, 
+                                                  self._decode_error(response.content))
+                        retry_headers = response.headers
+                    else:
+                        if offset and response.status_code != 206:
+                            if on_restart is None:
+                                raise APIError('EXPORT_ERROR', 'El servidor no admite reanudar la descarga', 
+                                               response.status_code)
+                            on_restart()
+                            offset = 0
+                        if response.status_code != 206:
+                            validator = self._export_validator(response.headers)
+                            if on_validator is not None:
+                                on_validator(validator)
+                        
+                        for chunk in response.iter_content(chunk_size):
+                            offset += len(chunk)
+                            received += len(chunk)
+                            yield chunk
+                        if trace is not None:
+                            instrumentation.finish(trace, response.status_code, received, ttfb)
+                        return
+                
+                # Renovar token si es necesario (una vez por descarga)
+                if error.status == 401 and self.refresh_token and not refreshed:
+                    refreshed = True
+                    if instrumentation is not None:
+                        instrumentation.event('token_refresh', endpoint)
+                    self.refresh_access_token(stale_token=token_used)
+                    continue
+                
+                if 400 <= error.status < 500 and error.status != 429:
+                    raise error
+                
+                last_error = error
+                if instrumentation is not None and error.status == 429:
+                    instrumentation.event('rate_limited', endpoint)
+                if attempt < attempts:
+                    delay = self._retry_wait(attempt, error.status, retry_headers, call)
+                    if delay is None:
+                        break
+                    if trace is not None:
+                        instrumentation.retry(trace, delay)
+                    if delay:
+                        time.sleep(delay)
+            
+            except requests.exceptions.RequestException as e:
+                last_error = APIError('NETWORK_ERROR', str(e), 0)
+                if trace is not None and trace.total is None:
+                    instrumentation.finish(trace, 0, received, error=e)
+                if call is not None:
+                    self.retry_policy.record(call, 0)
+                if not resume and offset:
+                    raise last_error
+                
+                if attempt < attempts:
+                    delay = self._network_retry_wait(attempt, call)
+                    if delay is None:
+                        break
+                    if trace is not None:
+                        instrumentation.retry(trace, delay)
+                    time.sleep(delay)
+        
+        self._retry_stopped(call, endpoint)
+        raise last_error
+    
+    def export_report(self, report_type: str, format: str = 'csv', **params) -> bytes:
+        """Exportar reporte"""
+        return b''.join(self._iter_export(report_type, format, params, 64 * 1024))
+    
+    def iter_report_chunks(self, report_type: str, format: str = 'csv', chunk_size: int = 64 * 1024, 
+                           compress: bool = True, **params) -> Iterator[bytes]:
+        """Exportar reporte como un iterador de fragmentos de bytes"""
+        return self._iter_export(report_type, format, params, chunk_size, compress)
+    
+    def export_report_to(self, report_type: str, destination: Any, format: str = 'csv', 
+                         chunk_size: int = 64 * 1024, compress: bool = True, resume: bool = False, 
+                         **params) -> int:
+        """Exportar reporte en streaming a una ruta o a un objeto de archivo binario
+        
+        Por defecto un archivo existente se sobrescribe. Con ``resume`` una
+        descarga incompleta de este mismo reporte (registrada en
+        ``<destination>.resume``) continúa desde donde quedó, siempre que el
+        servidor confirme con If-Range que el reporte no cambió. Devuelve el
+        tamaño total del reporte escrito.
+        """
+        if isinstance(destination, (str, os.PathLike)):
+            offset, validator, remember = self._export_resume_state(destination, report_type, format, params)
+            if not resume:
+                offset, validator = 0, None
+                remember(None)
+            with open(destination, 'ab' if offset else 'wb') as f:
+                written = self._write_export(report_type, f, format, params, chunk_size, compress, offset, 
+                                             validator, remember if resume else None)
+            if resume:
+                remember(None)
+            return written
+        return self._write_export(report_type, destination, format, params, chunk_size, 
+                                  compress, 0)
+    
+    def _write_export(self, report_type: str, f: Any, format: str, params: Dict, chunk_size: int, 
+                      compress: bool, offset: int, validator: str = None, 
+                      on_validator: Callable[[Optional[str]], None] = None) -> int:
+        try:
+            base = f.tell() - offset
+        except (AttributeError, OSError, ValueError):
+            base = None  # Destino no posicionable (socket, pipe...)
+        written = offset
+        
+        def restart():
+            nonlocal written
+            if base is None:
+                raise APIError('EXPORT_ERROR', 'El servidor no admite reanudar la descarga', 200)
+            f.seek(base)
+            f.truncate()
+            written = 0
+        
+        for chunk in self._iter_export(report_type, format, params, chunk_size, compress, 
+                                       True, offset, restart, validator, on_validator):
+            f.write(chunk)
+            written += len(chunk)
+        return written
+    
+    def iter_report_rows(self, report_type: str, delimiter: str = ',', 
+                         chunk_size: int = 64 * 1024, **params) -> Iterator[Dict]:
+        """Exportar un reporte CSV como iterador de filas (dict) parseadas incrementalmente"""
+        splitter = CSVLineSplitter()
+        
+        def lines():
+            for chunk in self._iter_export(report_type, 'csv', params, chunk_size):
+                yield from splitter.feed(chunk)
+            yield from splitter.close()
+        
+        return csv.DictReader(lines(), delimiter=delimiter)
+    
+    # ==================== ALERTAS ====================
+    
+    def get_alerts(self, status: str = None, product_id: str = None) -> List[Dict]:
+        """Obtener alertas"""
+        params = {}
+        if status:
+            params['status'] = status
+        if product_id:
+            params['productId'] = product_id
+        
+        return self.request('/alerts', params=params, record_type=self._model(Alert))
+    
+    def create_alert(self, alert_data: Dict) -> Dict:
+        """Crear alerta"""
+        return self.request('/alerts', 'POST', alert_data, record_type=self._model(Alert))
+    
+    def update_alert(self, alert_id: str, alert_data: Dict) -> Dict:
+        """Actualizar alerta"""
+        return self.request(f'/alerts/{alert_id}', 'PUT', alert_data, record_type=self._model(Alert))
+    
+    def delete_alert(self, alert_id: str) -> None:
+        """Eliminar alerta"""
+        self.request(f'/alerts/{alert_id}', 'DELETE')
+    
+    def get_active_alerts(self) -> List[Dict]:
+        """Obtener alertas activas"""
+        return self.get_alerts(status='active')
+    
+    # ==================== WEBHOOKS ====================
+    
+    def get_webhooks(self) -> List[Dict]:
+        """Obtener webhooks"""
+        return self.request('/webhooks', record_type=self._model(Webhook))
+    
+    def create_webhook(self, webhook_data: Dict) -> Dict:
+        """Crear webhook"""
+        return self.request('/webhooks', 'POST', webhook_data, record_type=self._model(Webhook))
+    
+    def get_webhook(self, webhook_id: str) -> Dict:
+        """Obtener webhook específico"""
+        return self.request(f'/webhooks/{webhook_id}', record_type=self._model(Webhook))
+    
+    def update_webhook(self, webhook_id: str, webhook_data: Dict) -> Dict:
+        """Actualizar webhook"""
+        return self.request(f'/webhooks/{webhook_id}', 'PUT', webhook_data, 
+                            record_type=self._model(Webhook))
+    
+    def delete_webhook(self, webhook_id: str) -> None:
+        """Eliminar webhook"""
+        self.request(f'/webhooks/{webhook_id}', 'DELETE')
+    
+    def test_webhook(self, webhook_id: str, test_data: Dict = None) -> Dict:
+        """Probar webhook"""
+        return self.request(f'/webhooks/{webhook_id}/test', 'POST', test_data or {})
+    
+    def get_webhook_stats(self, webhook_id: str) -> Dict:
+        """Obtener estadísticas de webhook"""
+        return self.request(f'/webhooks/{webhook_id}/stats')
+    
+    def get_webhook_logs(self, webhook_id: str, limit: int = 50, offset: int = 0) -> Dict:
+        """Obtener logs de webhook"""
+        params = {'limit': limit, 'offset': offset}
+        return self.request(f'/webhooks/{webhook_id}/logs', params=params)
+    
+    # ==================== USUARIOS (ADMIN) ====================
+    
+    def get_users(self, role: str = None, is_active: bool = None) -> List[Dict]:
+        """Obtener usuarios"""
+        params = {}
+        if role:
+            params['role'] = role
+        if is_active is not None:
+            params['isActive'] = str(is_active).lower()
+        
+        return self.request('/users', params=params)
+    
+    def create_user(self, user_data: Dict) -> Dict:
+        """Crear usuario"""
+        return self.request('/users', 'POST', user_data)
+    
+    def get_user(self, user_id: str) -> Dict:
+        """Obtener usuario específico"""
+        return self.request(f'/users/{user_id}')
+    
+    def update_user(self, user_id: str, user_data: Dict) -> Dict:
+        """Actualizar usuario"""
+        return self.request(f'/users/{user_id}', 'PUT', user_data)
+    
+    def deactivate_user(self, user_id: str) -> Dict:
+        """Desactivar usuario"""
+        return self.request(f'/users/{user_id}/deactivate', 'PATCH')
+    
+    def activate_user(self, user_id: str) -> Dict:
+        """Activar usuario"""
+        return self.request(f'/users/{user_id}/activate', 'PATCH')
+    
+    # ==================== UTILIDADES DE ALTO NIVEL ====================
+    
+    def ensure_stock(self, product_id: str, location_id: str, minimum_quantity: float) -> Dict:
+        """Asegurar stock mínimo"""
+        stock = self.get_product_stock(product_id, location_id)
+        current_stock = stock[0]['quantity'] if stock else 0
+        
+        if current_stock < minimum_quantity:
+            needed = minimum_quantity - current_stock
+            self.create_movement({
+                'productId': product_id,
+                'locationId': location_id,
+                'movementType': 'in',
+                'quantity': needed,
+                'notes': f'Reposición automática - mínimo requerido: {minimum_quantity}'
+            })
+            
+            return {'restocked': True, 'quantity': needed}
+        
+        return {'restocked': False, 'currentStock': current_stock}
+    
+    def get_low_stock_products(self, threshold: float = None) -> List[Dict]:
+        """Obtener productos con stock bajo"""
+        params = {'lowStock': True}
+        if threshold:
+            params['threshold'] = threshold
+        
+        return self.get_stock_levels(**params)
+    
+    def bulk_stock_update(self, updates: List[Dict], batch_size: int = 100) -> List[Dict]:
+        """Actualizar stock en lotes"""
+        results = []
+        
+        for i in range(0, len(updates), batch_size):
+            batch = updates[i:i + batch_size]
+            result = self.update_stock_batch(batch, f'BULK-{int(time.time())}-{i}')
+            results.append(result)
+        
+        return results
+    
+    @staticmethod
+    def _prepare_chunk(chunk: ChunkResult, reference_prefix: str) -> None:
+        """Asigna al lote una referencia idempotente derivada de su contenido"""
+        payload = json.dumps(chunk.updates, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha1(payload).hexdigest()[:16]
+        chunk.reference = f'{reference_prefix}-{chunk.start}-{digest}'
+        chunk.payload_bytes = len(payload)
+    
+    def _send_chunk(self, chunk: ChunkResult, notes: str, reference_prefix: str) -> ChunkResult:
+        """Envía un lote con una referencia idempotente
+        
+        Los reintentos los hace ``request()`` (``retry_attempts`` o
+        ``RetryPolicy``) reenviando la misma ``Idempotency-Key``.
+        """
+        self._prepare_chunk(chunk, reference_prefix)
+        chunk.sent = True
+        started = time.monotonic()
+        try:
+            chunk.result = self.request('/inventory/stock/batch-update', 'POST', {
+                'updates': chunk.updates,
+                'referenceNumber': chunk.reference,
+                'notes': notes
+            }, headers={'Idempotency-Key': chunk.reference})
+        except APIError as e:
+            chunk.error = e
+            return chunk
+        chunk.latency = time.monotonic() - started
+        chunk.updates = None
+        return chunk
+    
+    def parallel_stock_update(self, updates: Iterable[Dict], max_workers: int = 4, 
+                              batch_size: int = 100, min_batch_size: int = 10, 
+                              max_batch_size: int = 1000, target_latency: float = 2.0, 
+                              max_payload_bytes: int = 1024 * 1024, 
+                              reference_prefix: str = 'BULK', notes: str = '') -> BulkUpdateReport:
+        """Actualizar stock en lotes concurrentes con informe de fallos parciales
+        
+        ``updates`` puede ser cualquier iterable: los lotes se construyen bajo
+        demanda y nunca hay más de ``max_workers`` en memoria. Un lote fallido no
+        detiene el resto; sus actualizaciones quedan en ``failed_updates()``.
+        """
+        report = BulkUpdateReport()
+        chunker = AdaptiveChunker(batch_size, min_batch_size, max_batch_size, 
+                                  target_latency, max_payload_bytes)
+        source = iter(updates)
+        started = time.monotonic()
+        in_flight = {}
+        index = offset = 0
+        exhausted = False
+        
+        with concurrent_futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                while not exhausted and len(in_flight) < max_workers:
+                    batch = list(islice(source, chunker.next_size()))
+                    if not batch:
+                        exhausted = True
+                        break
+                    chunk = ChunkResult(index, offset, batch)
+                    future = executor.submit(self._send_chunk, chunk, notes, reference_prefix)
+                    in_flight[future] = chunk
+                    index += 1
+                    offset += len(batch)
+                
+                if not in_flight:
+                    break
+                
+                done, _ = concurrent_futures.wait(in_flight, return_when=concurrent_futures.FIRST_COMPLETED)
+                for future in done:
+                    chunk = in_flight.pop(future)
+                    report.chunks.append(chunk)
+                    if chunk.ok:
+                        chunker.observe(chunk.size, chunk.latency, chunk.payload_bytes)
+                    else:
+                        chunker.shrink()
+                        self.logger.warning('Lote %s (%s) falló: %s', chunk.index, chunk.reference, chunk.error)
+        
+        report.chunks.sort(key=lambda c: c.index)
+        report.elapsed = time.monotonic() - started
+        return report
+    
+    @staticmethod
+    def _load_counts(source: Any, format: str, location_id: str, tolerance: float, 
+                     zero_uncounted: bool, dry_run: bool) -> ReconciliationReport:
+        report = ReconciliationReport(tolerance, zero_uncounted, dry_run)
+        for row_number, row in enumerate(iter_product_rows(source, format), 1):
+            report._add_count(row_number, row, location_id)
+        return report
+    
+    def reconcile_stock(self, source: Any, format: str = None, location_id: str = None, 
+                        dry_run: bool = True, zero_uncounted: bool = False, tolerance: float = 0.0, 
+                        operation: str = 'add', max_workers: int = 4, page_size: int = 1000, 
+                        batch_size: int = 500, reference_prefix: str = 'RECON', 
+                        notes: str = 'Conciliación de conteo físico') -> ReconciliationReport:
+        """Conciliar un conteo físico (CSV, JSONL o iterable) contra el stock de la API
+        
+        Cada fila necesita ``productId`` (o ``sku``), ``locationId`` (o el
+        ``location_id`` por defecto) y ``countedQuantity``/``quantity``. El stock
+        de cada ubicación contada se descarga en paralelo con
+        ``iter_stock_levels`` y se cruza contra el conteo indexado. Con
+        ``dry_run`` solo se calcula el informe; si no, los ajustes se envían en
+        lotes con ``parallel_stock_update`` (``operation='add'`` envía la
+        diferencia, ``'set'`` la cantidad contada).
+        """
+        started = time.monotonic()
+        report = self._load_counts(source, format, location_id, tolerance, zero_uncounted, dry_run)
+        
+        def scan(location: str) -> None:
+            for level in self.iter_stock_levels(location_id=location, page_size=page_size):
+                report._match_level(level)
+        
+        with concurrent_futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for future in [executor.submit(scan, location) for location in report.locations()]:
+                future.result()
+        report._finish()
+        
+        if not dry_run and report.diffs:
+            report.applied = self.parallel_stock_update(report.updates(operation), max_workers=max_workers, 
+                                                        batch_size=batch_size, reference_prefix=reference_prefix, 
+                                                        notes=notes)
+        report.elapsed = time.monotonic() - started
+        return report
+    
+    def get_inventory_value(self, location_id: str = None) -> Dict:
+        """Obtener valor total del inventario"""
+        params = {}
+        if location_id:
+            params['locationId'] = location_id
+        
+        summary = self.get_stock_summary(**params)
+        return {
+            'totalValue': summary['totalValue'],
+            'totalProducts': summary['totalProducts'],
+            'averageValue': summary['totalValue'] / summary['totalProducts'] if summary['totalProducts'] > 0 else 0
+        }
+    
+    # ==================== CONTEXT MANAGERS ====================
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.access_token:
+            try:
+                self.logout()
+            except:
+                pass  # Ignorar errores al cerrar sesión
+        self.close()
+
+# ==================== CLIENTE ASÍNCRONO ====================
+
+class AsyncInventoryAPI(InventoryAPI):
+    """Cliente asíncrono (asyncio + aiohttp) para la API de Sistema de Inventario PYMES
+    
+    Ofrece los mismos métodos de endpoint que InventoryAPI, pero cada llamada
+    devuelve un awaitable. Todas las peticiones comparten un único pool de
+    conexiones keep-alive y ``max_concurrency`` limita las peticiones en vuelo.
+    
+    Uso:
+    async with AsyncInventoryAPI(api_key='your-api-key') as client:
+        stocks = await asyncio.gather(*(client.get_product_stock(pid) for pid in ids))
+    """
+    
+    def __init__(self, *args, max_concurrency: int = 100, max_connections: int = 100, 
+                 keepalive_timeout: float = 30.0, **kwargs):
+        if not aiohttp:
+            raise ImportError('AsyncInventoryAPI requiere aiohttp: pip install aiohttp')
+        
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self._semaphore = None
+        self._refresh_lock = None
+        
+        super().__init__(*args, **kwargs)
+        
+        if self.transport.http2:
+            raise ValueError('aiohttp no soporta HTTP/2: use InventoryAPI con TransportConfig(http2=True)')
+        if self.transport.max_connections is not None:
+            self.max_connections = self.transport.max_connections
+        if self.transport.keepalive_expiry is not None:
+            self.keepalive_timeout = self.transport.keepalive_expiry
+    
+    def _create_session(self) -> None:
+        """La sesión aiohttp se crea en el primer request, dentro del event loop"""
+        return None
+    
+    def _create_single_flight(self) -> AsyncSingleFlight:
+        return AsyncSingleFlight()
+    
+    def _get_loader(self, name: str, batch_fn: Callable) -> AsyncBatchLoader:
+        """Obtiene (o crea) el AsyncBatchLoader de un tipo de consulta"""
+        loader = self._loaders.get(name)
+        if loader is None:
+            loader = self._loaders.setdefault(name, AsyncBatchLoader(batch_fn, self.batch_window))
+        return loader
+    
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        """Obtiene (o crea) la sesión aiohttp compartida"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.transport.max_per_host or 0,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.transport.dns_cache_ttl or 10
+            )
+            trace_configs = []
+            if self.instrumentation is not None:
+                trace_configs.append(self.instrumentation.aiohttp_trace_config())
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.DEFAULT_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=trace_configs
+            )
+        return self.session
+    
+    def _get_semaphore(self) -> 'asyncio.Semaphore':
+        """Obtiene el semáforo que limita las peticiones concurrentes"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    async def _batch_products(self, product_ids: List[str]) -> Dict[str, Any]:
+        """Versión asíncrona de InventoryAPI._batch_products"""
+        found = {}
+        try:
+            response = await self.request('/products', params={'ids': ','.join(product_ids), 'limit': len(product_ids)}, 
+                                          record_type=self._model(Product))
+            found = {product.get('id'): product for product in _records(response)}
+        except APIError as e:
+            if e.status not in (400, 404, 422):
+                raise
+        
+        missing = [product_id for product_id in product_ids if product_id not in found]
+        found.update(await self._fetch_each(self._fetch_product, missing))
+        return found
+    
+    @staticmethod
+    async def _fetch_each(fetch: Callable, keys: List[Any]) -> Dict[Any, Any]:
+        """Carga cada clave en paralelo; los errores de API quedan como valor de su clave"""
+        async def one(key):
+            try:
+                return await (fetch(*key) if isinstance(key, tuple) else fetch(key))
+            except APIError as e:
+                return e
+        
+        values = await asyncio.gather(*(one(key) for key in keys))
+        return dict(zip(keys, values))
+    
+    async def _batch_product_stock(self, keys: List[Tuple[str, Optional[str]]]) -> Dict:
+        """Versión asíncrona de InventoryAPI._batch_product_stock"""
+        results = {}
+        missing = []
+        for location_id, product_ids in self._group_stock_keys(keys).items():
+            params = {'productId': ','.join(product_ids)}
+            if location_id:
+                params['locationId'] = location_id
+            try:
+                levels = await self.request('/inventory/stock', params=params, record_type=self._model(StockLevel))
+            except APIError as e:
+                if e.status not in (400, 404, 422):
+                    raise
+                missing.extend((product_id, location_id) for product_id in product_ids)
+                continue
+            for key, stock in self._split_stock_levels(levels, product_ids, location_id).items():
+                if stock:
+                    results[key] = stock
+                else:
+                    missing.append(key)
+        results.update(await self._fetch_each(self._fetch_product_stock, missing))
+        return results
+    
+    async def _iter_pages(self, fetch_page: Callable[[int], Any], limit: int, 
+                          max_items: int = None, prefetch: bool = True):
+        """Versión asíncrona de InventoryAPI._iter_pages (se usa con ``async for``)
+        
+        Para cortar la iteración antes de tiempo envuelva el iterador en
+        ``contextlib.aclosing`` y así se cancela la página que se esté precargando.
+        """
+        page = 1
+        pending = asyncio.ensure_future(fetch_page(page)) if prefetch else None
+        yielded = 0
+        previous = None
+        
+        try:
+            while True:
+                response = await pending if prefetch else await fetch_page(page)
+                pending = None
+                items, has_more = self._split_page(response, page, limit)
+                signature = self._page_signature(items)
+                if page > 1 and signature == previous:
+                    return  # El servidor ignoró ``page`` y devolvió la misma página
+                previous = signature
+                
+                # Pedir la siguiente página antes de procesar la actual
+                wants_more = max_items is None or yielded + len(items) < max_items
+                if prefetch and has_more and wants_more:
+                    pending = asyncio.ensure_future(fetch_page(page + 1))
+                
+                for item in items:
+                    yield item
+                    yielded += 1
+                    if max_items is not None and yielded >= max_items:
+                        return
+                
+                if not has_more or not items:
+                    return
+                page += 1
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+    
+    async def close(self) -> None:
+        """Cerrar el pool de conexiones"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+    
+    async def request(self, endpoint: str, method: str = 'GET', data: Dict = None, 
+                      params: Dict = None, headers: Dict = None, 
+                      record_type: Callable[[Dict], Any] = None, **kwargs) -> Any:
+        """Realiza una petición HTTP asíncrona con reintentos automáticos"""
+        key = self._coalesce_key(endpoint, method, data, params, headers, record_type, kwargs)
+        if key is not None:
+            return await self._single_flight.do(key, lambda: self._perform_request(
+                endpoint, method, data, params, headers, record_type))
+        return await self._perform_request(endpoint, method, data, params, headers, record_type, **kwargs)
+    
+    async def _perform_request(self, endpoint: str, method: str = 'GET', data: Dict = None, 
+                               params: Dict = None, headers: Dict = None, 
+                               record_type: Callable[[Dict], Any] = None, **kwargs) -> Any:
+        """Ejecuta la petición HTTP asíncrona con reintentos (sin coalescencia)"""
+        url = f"{self.base_url}{endpoint}"
+        session = self._get_session()
+        await self._ensure_fresh_token(endpoint)
+        
+        # Preparar headers
+        request_headers = dict(self.DEFAULT_HEADERS)
+        token_used = self.access_token
+        request_headers.update(self._get_auth_headers())
+        if headers:
+            request_headers.update(headers)
+        
+        instrumentation = self.instrumentation
+        
+        # Consultar la cache
+        cache_key, cached, stale = self._lookup_cache(method, endpoint, params, request_headers)
+        if instrumentation is not None and cache_key is not None:
+            instrumentation.event('cache_hit' if cached is not None else 'cache_miss', endpoint)
+        if cached is not None:
+            return cached.value(self.codec, record_type)
+        
+        # Preparar datos
+        body, body_headers = self._encode_body(data)
+        request_headers.update(body_headers)
+        
+        last_error = None
+        trace = None
+        call, attempts = self._begin_call(endpoint)
+        
+        for attempt in range(1, attempts + 1):
+            try:
+                if self.rate_limiter is not None:
+                    wait = self.rate_limiter.acquire()
+                    if wait:
+                        if instrumentation is not None:
+                            instrumentation.event('rate_limit_wait', endpoint, wait)
+                        await asyncio.sleep(wait)
+                
+                async with self._get_semaphore():
+                    if instrumentation is not None:
+                        trace = instrumentation.start(method, endpoint, attempt, len(body) if body else 0)
+                        kwargs['trace_request_ctx'] = trace
+                    if call is not None and call.deadline is not None:
+                        kwargs['timeout'] = aiohttp.ClientTimeout(
+                            total=self.retry_policy.attempt_timeout(call, self.timeout))
+                    
+                    async with session.request(
+                        method=method,
+                        url=url,
+                        data=body,
+                        params=params,
+                        headers=request_headers,
+                        **kwargs
+                    ) as response:
+                        ttfb = time.perf_counter() - trace.started if trace is not None else None
+                        if self.rate_limiter is not None:
+                            self.rate_limiter.update(response.status, response.headers)
+                        if call is not None:
+                            self.retry_policy.record(call, response.status)
+                        content = await response.read()
+                        if trace is not None:
+                            instrumentation.finish(trace, response.status, len(content), ttfb)
+                        
+                        # Manejar respuestas exitosas
+                        if response.status < 400:
+                            if self.cache is not None and method.upper() != 'GET':
+                                self.cache.invalidate_for(endpoint)
+                            if cache_key is not None:
+                                if instrumentation is not None and response.status == 304:
+                                    instrumentation.event('cache_revalidated', endpoint)
+                                return self._store_cached(cache_key, endpoint, stale, response.status, 
+                                                          response.headers, content, record_type)
+                            if response.headers.get('content-type', '').startswith('application/json'):
+                                return self.codec.decode(content, record_type)
+                            return await response.text()
+                        
+                        # Manejar errores
+                        error_data = self._decode_error(content)
+                        
+                        status = response.status
+                        error = self._build_error(status, response.reason, error_data)
+                        retry_headers = response.headers
+                
+                # Renovar token si es necesario
+                if status == 401 and self.refresh_token and attempt == 1 and not endpoint.startswith('/auth/'):
+                    if instrumentation is not None:
+                        instrumentation.event('token_refresh', endpoint)
+                    await self.refresh_access_token(stale_token=token_used)
+                    token_used = self.access_token
+                    request_headers.update(self._get_auth_headers())
+                    continue
+                
+                # No reintentar errores 4xx (excepto 429)
+                if 400 <= status < 500 and status != 429:
+                    raise error
+                
+                last_error = error
+                if instrumentation is not None and status == 429:
+                    instrumentation.event('rate_limited', endpoint)
+                
+                # Esperar antes del siguiente intento
+                if attempt < attempts:
+                    delay = self._retry_wait(attempt, status, retry_headers, call)
+                    if delay is None:
+                        break
+                    if trace is not None:
+                        instrumentation.retry(trace, delay)
+                    if delay:
+                        await asyncio.sleep(delay)
+                    
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = APIError('NETWORK_ERROR', str(e) or type(e).__name__, 0)
+                if trace is not None and trace.total is None:
+                    instrumentation.finish(trace, 0, error=e)
+                if call is not None:
+                    self.retry_policy.record(call, 0)
+                
+                if attempt < attempts:
+                    delay = self._network_retry_wait(attempt, call)
+                    if delay is None:
+                        break
+                    if trace is not None:
+                        instrumentation.retry(trace, delay)
+                    await asyncio.sleep(delay)
+        
+        self._retry_stopped(call, endpoint)
+        raise last_error
+    
+    # ==================== AUTENTICACIÓN ====================
+    
+    async def login(self, email: str, password: str) -> Dict:
+        """Iniciar sesión y obtener tokens"""
+        response = await self.request('/auth/login', 'POST', {
+            'email': email,
+            'password': password
+        })
+        
+        self._set_tokens(response['accessToken'], response['refreshToken'], response.get('expiresIn'))
+        if self.cache is not None:
+            self.cache.clear()
+        
+        return response
+    
+    async def refresh_access_token(self, stale_token: str = None) -> Dict:
+        """Renovar el access token (una sola renovación en curso por cliente)"""
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        
+        async with self._refresh_lock:
+            if stale_token is not None and self.access_token != stale_token:
+                return {'accessToken': self.access_token}
+            if not self.refresh_token:
+                raise ValueError('No refresh token available')
+            
+            response = await self.request('/auth/refresh', 'POST', {
+                'refreshToken': self.refresh_token
+            })
+            
+            self._set_tokens(response['accessToken'], response.get('refreshToken'), response.get('expiresIn'))
+            return response
+    
+    async def _ensure_fresh_token(self, endpoint: str) -> None:
+        if self._token_needs_refresh(endpoint):
+            try:
+                await self.refresh_access_token(stale_token=self.access_token)
+            except APIError as e:
+                self.logger.warning('No se pudo renovar el token antes de expirar: %s', e)
+    
+    async def logout(self) -> Dict:
+        """Cerrar sesión"""
+        response = await self.request('/auth/logout', 'POST', {
+            'refreshToken': self.refresh_token
+        })
+        
+        self.access_token = None
+        self.refresh_token = None
+        if self.cache is not None:
+            self.cache.clear()
+        
+        return response
+    
+    # ==================== ENDPOINTS SIN VALOR DE RETORNO ====================
+    
+    async def delete_product(self, product_id: str) -> None:
+        """Eliminar producto"""
+        await self.request(f'/products/{product_id}', 'DELETE')
+    
+    async def delete_alert(self, alert_id: str) -> None:
+        """Eliminar alerta"""
+        await self.request(f'/alerts/{alert_id}', 'DELETE')
+    
+    async def delete_webhook(self, webhook_id: str) -> None:
+        """Eliminar webhook"""
+        await self.request(f'/webhooks/{webhook_id}', 'DELETE')
+    
+    # ==================== REPORTES ====================
+    
+    async def _iter_export(self, report_type: str, format: str, params: Dict, chunk_size: int, 
+                           compress: bool = True, resume: bool = True, offset: int = 0, 
+                           on_restart: Callable[[], None] = None, validator: str = None, 
+                           on_validator: Callable[[Optional[str]], None] = None):
+        """Descarga un reporte por fragmentos reanudando con Range si se corta
+        
+        El timeout de la sesión no se aplica al cuerpo completo: solo a conectar
+        y a cada lectura, para que un reporte grande pueda tardar lo que necesite.
+        """
+        endpoint = f'/reports/{report_type}/export'
+        await self._ensure_fresh_token(endpoint)
+        instrumentation = self.instrumentation
+        last_error = None
+        trace = None
+        refreshed = False
+        call, attempts = self._begin_call(endpoint)
+        
+        for attempt in range(1, attempts + 1):
+            if self.rate_limiter is not None:
+                wait = self.rate_limiter.acquire()
+                if wait:
+                    if instrumentation is not None:
+                        instrumentation.event('rate_limit_wait', endpoint, wait)
+                    await asyncio.sleep(wait)
+            
+            url, query, headers = self._export_request_args(report_type, format, params, offset, 
+                                                            compress, validator)
+            token_used = self.access_token
+            read_timeout = self.retry_policy.attempt_timeout(call, self.timeout) if call else self.timeout
+            kwargs = {'timeout': aiohttp.ClientTimeout(total=None, sock_connect=read_timeout, 
+                                                       sock_read=read_timeout)}
+            if instrumentation is not None:
+                trace = instrumentation.start('GET', endpoint, attempt)
+                kwargs['trace_request_ctx'] = trace
+            received = 0
+            try:
+                async with self._get_semaphore():
+                    async with self._get_session().get(url, params=query, headers=headers, 
+                                                       auto_decompress=compress, **kwargs) as response:
+                        ttfb = time.perf_counter() - trace.started if trace is not None else None
+                        if self.rate_limiter is not None:
+                            self.rate_limiter.update(response.status, response.headers)
+                        if call is not None:
+                            self.retry_policy.record(call, response.status)
+                        
+                        if response.status == 416 and offset:
+                            if trace is not None:
+                                instrumentation.finish(trace, response.status, 0, ttfb)
+                            return  # Ya se había descargado completo
+                        if response.status >= 400:
+                            content = await response.read()
+                            if trace is not None:
+                                instrumentation.finish(trace, response.status, len(content), ttfb)
+                            error = self._build_error(response.status, response.reason, self._decode_error(content))
+                            retry_headers = response.headers
+                        else:
+                            if offset and response.status != 206:
+                                if on_restart is None:
+                                    raise APIError('EXPORT_ERROR', 'El servidor no admite reanudar la descarga', 
+                                                   response.status)
+                                on_restart()
+                                offset = 0
+                            if response.status != 206:
+                                validator = self._export_validator(response.headers)
+                                if on_validator is not None:
+                                    on_validator(validator)
+                            
+                            async for chunk in response.content.iter_chunked(chunk_size):
+                                offset += len(chunk)
+                                received += len(chunk)
+                                yield chunk
+                            if trace is not None:
+                                instrumentation.finish(trace, response.status, received, ttfb)
+                            return
+                
+                # Renovar token si es necesario (una vez por descarga)
+                if error.status == 401 and self.refresh_token and not refreshed:
+                    refreshed = True
+                    if instrumentation is not None:
+                        instrumentation.event('token_refresh', endpoint)
+                    await self.refresh_access_token(stale_token=token_used)
+                    continue
+                
+                if 400 <= error.status < 500 and error.status != 429:
+                    raise error
+                
+                last_error = error
+                if instrumentation is not None and error.status == 429:
+                    instrumentation.event('rate_limited', endpoint)
+                if attempt < attempts:
+                    delay = self._retry_wait(attempt, error.status, retry_headers, call)
+                    if delay is None:
+                        break
+                    if trace is not None:
+                        instrumentation.retry(trace, delay)
+                    if delay:
+                        await asyncio.sleep(delay)
+            
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = APIError('NETWORK_ERROR', str(e) or type(e).__name__, 0)
+                if trace is not None and trace.total is None:
+                    instrumentation.finish(trace, 0, received, error=e)
+                if call is not None:
+                    self.retry_policy.record(call, 0)
+                if not resume and offset:
+                    raise last_error
+                
+                if attempt < attempts:
+                    delay = self._network_retry_wait(attempt, call)
+                    if delay is None:
+                        break
+                    if trace is not None:
+                        instrumentation.retry(trace, delay)
+                    await asyncio.sleep(delay)
+        
+        self._retry_stopped(call, endpoint)
+        raise last_error
+    
+    async def export_report(self, report_type: str, format: str = 'csv', **params) -> bytes:
+        """Exportar reporte"""
+        return b''.join([chunk async for chunk in self._iter_export(report_type, format, params, 64 * 1024)])
+    
+    async def export_report_to(self, report_type: str, destination: Any, format: str = 'csv', 
+                               chunk_size: int = 64 * 1024, compress: bool = True, resume: bool = False, 
+                               **params) -> int:
+        """Exportar reporte en streaming a una ruta o a un objeto de archivo binario"""
+        if isinstance(destination, (str, os.PathLike)):
+            offset, validator, remember = self._export_resume_state(destination, report_type, format, params)
+            if not resume:
+                offset, validator = 0, None
+                remember(None)
+            with open(destination, 'ab' if offset else 'wb') as f:
+                written = await self._write_export(report_type, f, format, params, chunk_size, compress, offset, 
+                                                   validator, remember if resume else None)
+            if resume:
+                remember(None)
+            return written
+        return await self._write_export(report_type, destination, format, params, chunk_size, 
+                                        compress, 0)
+    
+    async def _write_export(self, report_type: str, f: Any, format: str, params: Dict, chunk_size: int, 
+                            compress: bool, offset: int, validator: str = None, 
+                            on_validator: Callable[[Optional[str]], None] = None) -> int:
+        try:
+            base = f.tell() - offset
+        except (AttributeError, OSError, ValueError):
+            base = None  # Destino no posicionable (socket, pipe...)
+        written = offset
+        
+        def restart():
+            nonlocal written
+            if base is None:
+                raise APIError('EXPORT_ERROR', 'El servidor no admite reanudar la descarga', 200)
+            f.seek(base)
+            f.truncate()
+            written = 0
+        
+        async for chunk in self._iter_export(report_type, format, params, chunk_size, compress, 
+                                             True, offset, restart, validator, on_validator):
+            f.write(chunk)
+            written += len(chunk)
+        return written
+    
+    async def iter_report_rows(self, report_type: str, delimiter: str = ',', 
+                               chunk_size: int = 64 * 1024, **params):
+        """Exportar un reporte CSV como iterador asíncrono de filas (dict)"""
+        splitter = CSVLineSplitter()
+        header = None
+        
+        async def lines():
+            async for chunk in self._iter_export(report_type, 'csv', params, chunk_size):
+                for line in splitter.feed(chunk):
+                    yield line
+            for line in splitter.close():
+                yield line
+        
+        # csv.reader es síncrono: se le pasan bloques de líneas que no cortan un
+        # campo entrecomillado (número par de comillas acumuladas)
+        pending = []
+        quotes = 0
+        async for line in lines():
+            pending.append(line)
+            quotes += line.count('"')
+            if len(pending) >= 256 and quotes % 2 == 0:
+                for row in csv.reader(pending, delimiter=delimiter):
+                    if header is None:
+                        header = row
+                    elif row:
+                        yield dict(zip(header, row))
+                pending = []
+                quotes = 0
+        for row in csv.reader(pending, delimiter=delimiter):
+            if header is None:
+                header = row
+            elif row:
+                yield dict(zip(header, row))
+    
+    # ==================== UTILIDADES DE ALTO NIVEL ====================
+    
+    async def ensure_stock(self, product_id: str, location_id: str, minimum_quantity: float) -> Dict:
+        """Asegurar stock mínimo"""
+        stock = await self.get_product_stock(product_id, location_id)
+        current_stock = stock[0]['quantity'] if stock else 0
+        
+        if current_stock < minimum_quantity:
+            needed = minimum_quantity - current_stock
+            await self.create_movement({
+                'productId': product_id,
+                'locationId': location_id,
+                'movementType': 'in',
+                'quantity': needed,
+                'notes': f'Reposición automática - mínimo requerido: {minimum_quantity}'
+            })
+            
+            return {'restocked': True, 'quantity': needed}
+        
+        return {'restocked': False, 'currentStock': current_stock}
+    
+    async def bulk_stock_update(self, updates: List[Dict], batch_size: int = 100) -> List[Dict]:
+        """Actualizar stock en lotes"""
+        results = []
+        
+        for i in range(0, len(updates), batch_size):
+            batch = updates[i:i + batch_size]
+            result = await self.update_stock_batch(batch, f'BULK-{int(time.time())}-{i}')
+            results.append(result)
+        
+        return results
+    
+    async def _send_chunk(self, chunk: ChunkResult, notes: str, reference_prefix: str) -> ChunkResult:
+        """Envía un lote con una referencia idempotente (reintentos en ``request()``)"""
+        self._prepare_chunk(chunk, reference_prefix)
+        chunk.sent = True
+        started = time.monotonic()
+        try:
+            chunk.result = await self.request('/inventory/stock/batch-update', 'POST', {
+                'updates': chunk.updates,
+                'referenceNumber': chunk.reference,
+                'notes': notes
+            }, headers={'Idempotency-Key': chunk.reference})
+        except APIError as e:
+            chunk.error = e
+            return chunk
+        chunk.latency = time.monotonic() - started
+        chunk.updates = None
+        return chunk
+    
+    async def parallel_stock_update(self, updates: Iterable[Dict], max_workers: int = 4, 
+                                    batch_size: int = 100, min_batch_size: int = 10, 
+                                    max_batch_size: int = 1000, target_latency: float = 2.0, 
+                                    max_payload_bytes: int = 1024 * 1024, 
+                                    reference_prefix: str = 'BULK', notes: str = '') -> BulkUpdateReport:
+        """Actualizar stock en lotes concurrentes con informe de fallos parciales"""
+        report = BulkUpdateReport()
+        chunker = AdaptiveChunker(batch_size, min_batch_size, max_batch_size, 
+                                  target_latency, max_payload_bytes)
+        source = iter(updates)
+        started = time.monotonic()
+        in_flight = {}
+        index = offset = 0
+        exhausted = False
+        
+        while True:
+            while not exhausted and len(in_flight) < max_workers:
+                batch = list(islice(source, chunker.next_size()))
+                if not batch:
+                    exhausted = True
+                    break
+                chunk = ChunkResult(index, offset, batch)
+                task = asyncio.ensure_future(self._send_chunk(chunk, notes, reference_prefix))
+                in_flight[task] = chunk
+                index += 1
+                offset += len(batch)
+            
+            if not in_flight:
+                break
+            
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                chunk = in_flight.pop(task)
+                report.chunks.append(chunk)
+                if chunk.ok:
+                    chunker.observe(chunk.size, chunk.latency, chunk.payload_bytes)
+                else:
+                    chunker.shrink()
+                    self.logger.warning('Lote %s (%s) falló: %s', chunk.index, chunk.reference, chunk.error)
+        
+        report.chunks.sort(key=lambda c: c.index)
+        report.elapsed = time.monotonic() - started
+        return report
+    
+    async def reconcile_stock(self, source: Any, format: str = None, location_id: str = None, 
+                              dry_run: bool = True, zero_uncounted: bool = False, tolerance: float = 0.0, 
+                              operation: str = 'add', max_workers: int = 4, page_size: int = 1000, 
+                              batch_size: int = 500, reference_prefix: str = 'RECON', 
+                              notes: str = 'Conciliación de conteo físico') -> ReconciliationReport:
+        """Versión asíncrona de InventoryAPI.reconcile_stock"""
+        started = time.monotonic()
+        report = self._load_counts(source, format, location_id, tolerance, zero_uncounted, dry_run)
+        semaphore = asyncio.Semaphore(max_workers)
+        
+        async def scan(location: str) -> None:
+            async with semaphore:
+                async for level in self.iter_stock_levels(location_id=location, page_size=page_size):
+                    report._match_level(level)
+        
+        await asyncio.gather(*(scan(location) for location in report.locations()))
+        report._finish()
+        
+        if not dry_run and report.diffs:
+            report.applied = await self.parallel_stock_update(report.updates(operation), max_workers=max_workers, 
+                                                              batch_size=batch_size, 
+                                                              reference_prefix=reference_prefix, notes=notes)
+        report.elapsed = time.monotonic() - started
+        return report
+    
+    async def _send_product_batch(self, batch: List[Tuple[int, Dict]]) -> List[ProductImportResult]:
+        """Envía un lote a /products/batch; si excede el tamaño permitido (413) lo divide"""
+        try:
+            response = await self.create_products_batch([product for _, product in batch])
+            return self._product_batch_results(batch, response)
+        except APIError as e:
+            if e.status == 413 and len(batch) > 1:
+                middle = len(batch) // 2
+                return (await self._send_product_batch(batch[:middle]) + 
+                        await self._send_product_batch(batch[middle:]))
+            return [ProductImportResult(row, product.get('sku'), 'failed', [str(e)]) for row, product in batch]
+    
+    async def import_products(self, source: Any, format: str = None, batch_rows: int = 500, 
+                              batch_bytes: int = 1024 * 1024, max_workers: int = 4, 
+                              required_fields: Tuple[str, ...] = PRODUCT_REQUIRED_FIELDS):
+        """Importar productos desde CSV, JSONL o un iterable (usar con ``async for``)"""
+        invalid = deque()
+        batches = self._iter_product_batches(iter_product_rows(source, format), batch_rows, 
+                                             batch_bytes, required_fields, invalid)
+        in_flight = set()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(in_flight) < max_workers:
+                    batch = next(batches, None)
+                    if batch is None:
+                        exhausted = True
+                    else:
+                        in_flight.add(asyncio.ensure_future(self._send_product_batch(batch)))
+                    while invalid:
+                        yield invalid.popleft()
+                
+                if not in_flight:
+                    return
+                
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    for result in task.result():
+                        yield result
+        finally:
+            for task in in_flight:
+                task.cancel()
+    
+    async def get_inventory_value(self, location_id: str = None) -> Dict:
+        """Obtener valor total del inventario"""
+        params = {}
+        if location_id:
+            params['locationId'] = location_id
+        
+        summary = await self.get_stock_summary(**params)
+        return {
+            'totalValue': summary['totalValue'],
+            'totalProducts': summary['totalProducts'],
+            'averageValue': summary['totalValue'] / summary['totalProducts'] if summary['totalProducts'] > 0 else 0
+        }
+    
+    # ==================== CONTEXT MANAGERS ====================
+    
+    def __enter__(self):
+        # El __exit__ heredado llamaría a logout()/close() sin esperar las corrutinas
+        raise TypeError(f'{type(self).__name__} es asíncrono: use async with')
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        raise TypeError(f'{type(self).__name__} es asíncrono: use async with')
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if self.access_token:
+                try:
+                    await self.logout()
+                except Exception:
+                    pass  # Ignorar errores al cerrar sesión
+        finally:
+            await self.close()
+
+# ==================== POOL MULTI-TENANT ====================
+
+class _EvictedSession:
+    """Sesión de un cliente descartado por TenantClientPool: cualquier uso falla"""
+    
+    def __getattr__(self, name: str) -> Any:
+        raise RuntimeError('Cliente descartado por TenantClientPool: obtenga uno nuevo con pool.client(tenant_id)')
+
+_EVICTED_SESSION = _EvictedSession()
+
+class TenantStats:
+    """Contadores de trabajo de un tenant dentro de TenantClientPool"""
+    
+    __slots__ = ('submitted', 'completed', 'failed', 'in_flight', 'wait_total')
+    
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.wait_total = 0.0
+    
+    def to_dict(self) -> Dict:
+        finished = self.completed + self.failed
+        return {'submitted': self.submitted, 'completed': self.completed, 'failed': self.failed, 
+                'inFlight': self.in_flight, 'avgQueueWait': self.wait_total / finished if finished else 0.0}
+
+class TenantClientPool:
+    """Clientes de muchos tenants (empresas) sobre un único pool de conexiones
+    
+    Cada tenant tiene su propio InventoryAPI (credenciales, RateLimitGovernor y
+    ResponseCache aislados), pero todos comparten la misma sesión HTTP, de modo
+    que las conexiones keep-alive se reutilizan entre tenants. La sesión
+    compartida no guarda cookies para que nada pase de un tenant a otro. Los
+    clientes se crean al primer uso y se descartan por LRU (``max_tenants``) o
+    tras ``idle_timeout`` segundos sin uso; las credenciales, con el último
+    token renovado, se conservan para recrearlos. Un cliente descartado deja de
+    funcionar (RuntimeError), así que no conviene guardar la referencia
+    devuelta por ``client()``: pídala de nuevo o use ``submit()``.
+    
+    ``submit(tenant_id, fn, ...)`` ejecuta ``fn(client, ...)`` en un grupo de
+    ``max_workers`` hilos con planificación round-robin entre tenants: cada
+    hilo libre atiende al siguiente tenant con trabajo pendiente y ninguno
+    ocupa más de ``max_in_flight_per_tenant`` hilos, así que un trabajo masivo
+    de un tenant no deja sin servicio a los demás::
+    
+        pool = TenantClientPool(base_url)
+        pool.register('acme', api_key='...')
+        pool.register('globex', access_token='...', refresh_token='...')
+        future = pool.submit('acme', lambda client: client.get_stock_levels())
+    """
+    
+    def __init__(self, base_url: str = None, max_tenants: int = 256, idle_timeout: float = None, 
+                 max_workers: int = 32, max_in_flight_per_tenant: int = 4, max_pending_per_tenant: int = None, 
+                 transport: TransportConfig = None, 
+                 rate_limiter_factory: Optional[Callable[[], RateLimitGovernor]] = RateLimitGovernor, 
+                 cache_factory: Optional[Callable[[], ResponseCache]] = None, 
+                 credentials_loader: Callable[[str], Dict] = None, **client_options):
+        self.base_url = base_url
+        self.max_tenants = max_tenants
+        self.idle_timeout = idle_timeout
+        self.max_workers = max_workers
+        self.max_in_flight_per_tenant = max_in_flight_per_tenant
+        self.max_pending_per_tenant = max_pending_per_tenant
+        # El pool HTTP debe admitir tantas conexiones por host como hilos
+        self.transport = transport or TransportConfig(max_per_host=max_workers)
+        self.rate_limiter_factory = rate_limiter_factory
+        self.cache_factory = cache_factory
+        self.credentials_loader = credentials_loader
+        self.client_options = client_options
+        self.logger = logging.getLogger(__name__)
+        
+        self._credentials = {}
+        self._clients = OrderedDict()  # tenant -> (cliente, último uso)
+        self._session = None
+        self._lock = threading.RLock()
+        
+        # Planificación justa: una cola por tenant y un anillo de tenants listos
+        self._cond = threading.Condition(threading.Lock())
+        self._pending = {}
+        self._ready = deque()
+        self._ready_set = set()
+        self._stats = {}
+        self._workers = []
+        self._closed = False
+        self.evictions = 0
+    
+    # ==================== TENANTS ====================
+    
+    def register(self, tenant_id: str, api_key: str = None, access_token: str = None, 
+                 refresh_token: str = None, **overrides) -> None:
+        """Registra (o actualiza) las credenciales de un tenant"""
+        with self._lock:
+            entry = self._clients.pop(tenant_id, None)
+            if entry is not None:
+                entry[0].session = _EVICTED_SESSION
+            self._credentials[tenant_id] = dict(overrides, api_key=api_key, access_token=access_token, 
+                                                refresh_token=refresh_token)
+    
+    def _shared_session(self) -> Any:
+        if self._session is None:
+            self._session = InventoryAPI(base_url=self.base_url, transport=self.transport)._create_session()
+            if hasattr(self._session, 'cookies'):
+                from http.cookiejar import DefaultCookiePolicy
+                self._session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return self._session
+    
+    def _create_client(self, tenant_id: str) -> InventoryAPI:
+        credentials = self._credentials.get(tenant_id)
+        if credentials is None:
+            if self.credentials_loader is None:
+                raise KeyError(f'Tenant no registrado: {tenant_id}')
+            credentials = self._credentials[tenant_id] = dict(self.credentials_loader(tenant_id))
+        
+        options = dict(self.client_options, base_url=self.base_url, transport=self.transport)
+        if self.rate_limiter_factory is not None:
+            options['rate_limiter'] = self.rate_limiter_factory()
+        if self.cache_factory is not None:
+            options['cache'] = self.cache_factory()
+        options.update(credentials)
+        client = InventoryAPI(**options)
+        client.session = self._shared_session()
+        return client
+    
+    def _release(self, tenant_id: str, client: InventoryAPI) -> None:
+        """Descarta un cliente conservando sus tokens; la sesión compartida no se cierra"""
+        credentials = self._credentials.get(tenant_id)
+        if credentials is not None and credentials.get('refresh_token'):
+            credentials['access_token'] = client.access_token
+            credentials['refresh_token'] = client.refresh_token
+        client.session = _EVICTED_SESSION
+        with self._cond:
+            if not self._busy(tenant_id):
+                self._stats.pop(tenant_id, None)
+        self.evictions += 1
+    
+    def _busy(self, tenant_id: str) -> bool:
+        stats = self._stats.get(tenant_id)
+        return bool(self._pending.get(tenant_id)) or (stats is not None and stats.in_flight > 0)
+    
+    def _evict(self, now: float) -> None:
+        """LRU por ``max_tenants`` e inactividad por ``idle_timeout`` (nunca tenants ocupados)"""
+        with self._cond:
+            busy = {tenant_id for tenant_id in self._clients if self._busy(tenant_id)}
+        for tenant_id, (client, last_used) in list(self._clients.items()):
+            over_capacity = len(self._clients) > self.max_tenants
+            idle = self.idle_timeout is not None and now - last_used > self.idle_timeout
+            if not (over_capacity or idle):
+                break  # OrderedDict en orden de uso: el resto es más reciente
+            if tenant_id in busy:
+                continue
+            del self._clients[tenant_id]
+            self._release(tenant_id, client)
+    
+    def client(self, tenant_id: str) -> InventoryAPI:
+        """Cliente del tenant (se crea al primer uso sobre la sesión compartida)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._clients.pop(tenant_id, None)
+            client = entry[0] if entry is not None else self._create_client(tenant_id)
+            self._clients[tenant_id] = (client, now)
+            self._evict(now)
+            return client
+    
+    def evict(self, tenant_id: str) -> bool:
+        """Descarta el cliente de un tenant; sus credenciales siguen registradas"""
+        with self._lock:
+            entry = self._clients.pop(tenant_id, None)
+            if entry is not None:
+                self._release(tenant_id, entry[0])
+            return entry is not None
+    
+    def tenants(self) -> List[str]:
+        """Tenants con cliente activo, del menos al más recientemente usado"""
+        with self._lock:
+            return list(self._clients)
+    
+    # ==================== PLANIFICACIÓN ====================
+    
+    def submit(self, tenant_id: str, fn: Callable[..., Any], *args, **kwargs) -> 'concurrent_futures.Future':
+        """Ejecuta ``fn(cliente_del_tenant, *args, **kwargs)`` en el grupo de hilos compartido"""
+        future = concurrent_futures.Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('TenantClientPool cerrado')
+            pending = self._pending.setdefault(tenant_id, deque())
+            if self.max_pending_per_tenant is not None and len(pending) >= self.max_pending_per_tenant:
+                raise queue.Full(f'Demasiado trabajo pendiente para el tenant {tenant_id}')
+            pending.append((future, fn, args, kwargs, time.monotonic()))
+            self._stats.setdefault(tenant_id, TenantStats()).submitted += 1
+            self._mark_ready(tenant_id)
+            if len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, name=f'tenant-pool-{len(self._workers)}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        return future
+    
+    def map(self, tenant_id: str, fn: Callable[..., Any], *iterables) -> Iterator[Any]:
+        """Como ``Executor.map`` pero sobre el cliente del tenant"""
+        futures = [self.submit(tenant_id, fn, *args) for args in zip(*iterables)]
+        return (future.result() for future in futures)
+    
+    def _mark_ready(self, tenant_id: str) -> None:
+        """Pone al tenant al final del anillo si tiene trabajo y le queda cupo (con _cond tomado)"""
+        if (tenant_id not in self._ready_set and self._pending.get(tenant_id) 
+                and self._stats[tenant_id].in_flight < self.max_in_flight_per_tenant):
+            self._ready.append(tenant_id)
+            self._ready_set.add(tenant_id)
+            self._cond.notify()
+    
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._ready and not self._closed:
+                    self._cond.wait()
+                if not self._ready:
+                    return
+                tenant_id = self._ready.popleft()
+                self._ready_set.discard(tenant_id)
+                future, fn, args, kwargs, queued_at = self._pending[tenant_id].popleft()
+                stats = self._stats[tenant_id]
+                stats.in_flight += 1
+                stats.wait_total += time.monotonic() - queued_at
+                self._mark_ready(tenant_id)  # Round-robin: vuelve al final si le queda trabajo
+            
+            failed = False
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(self.client(tenant_id), *args, **kwargs))
+                except BaseException as e:
+                    failed = True
+                    future.set_exception(e)
+            
+            with self._cond:
+                stats.in_flight -= 1
+                if failed:
+                    stats.failed += 1
+                else:
+                    stats.completed += 1
+                if self._pending.get(tenant_id):
+                    self._mark_ready(tenant_id)
+                elif stats.in_flight == 0:
+                    self._pending.pop(tenant_id, None)
+    
+    # ==================== CICLO DE VIDA ====================
+    
+    def stats(self) -> Dict:
+        """Tenants activos, desalojos y contadores por tenant"""
+        with self._cond:
+            per_tenant = {tenant_id: dict(stats.to_dict(), queued=len(self._pending.get(tenant_id, ()))) 
+                          for tenant_id, stats in self._stats.items()}
+        return {'activeClients': len(self._clients), 'evictions': self.evictions, 
+                'workers': len(self._workers), 'tenants': per_tenant}
+    
+    def close(self, wait: bool = True) -> None:
+        """Termina el trabajo encolado (con ``wait``), detiene los hilos y cierra la sesión compartida"""
+        with self._cond:
+            self._closed = True
+            if not wait:
+                for pending in self._pending.values():
+                    for future, *_ in pending:
+                        future.cancel()
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join()
+        with self._lock:
+            for client, _ in self._clients.values():
+                client.session = _EVICTED_SESSION
+            self._clients.clear()
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+# ==================== SNAPSHOT LOCAL ====================
+
+def _records(response: Any) -> List[Dict]:
+    """Lista de registros de una respuesta, paginada (``data``) o plana"""
+    if isinstance(response, dict):
+        return response.get('data') or []
+    return response or []
+
+def _parse_timestamp(value: Any) -> Optional[float]:
+    """Convierte una fecha ISO 8601 de la API en epoch (segundos)"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def _movement_deltas(movement: Dict) -> List[Tuple[str, str, float]]:
+    """Efecto de un movimiento sobre el stock: [(producto, ubicación, delta)]"""
+    quantity = float(movement.get('quantity') or 0)
+    product_id = movement.get('productId')
+    location_id = movement.get('locationId')
+    movement_type = movement.get('movementType')
+    
+    if movement_type == 'in':
+        return [(product_id, location_id, abs(quantity))]
+    if movement_type == 'out':
+        return [(product_id, location_id, -abs(quantity))]
+    if movement_type == 'transfer':
+        deltas = [(product_id, location_id, -abs(quantity))]
+        if movement.get('destinationLocationId'):
+            deltas.append((product_id, movement['destinationLocationId'], abs(quantity)))
+        return deltas
+    return [(product_id, location_id, quantity)]  # adjustment: cantidad con signo
+
+class InventorySnapshot:
+    """Copia local en SQLite del stock y los movimientos con sincronización incremental
+    
+    ``full_sync()`` descarga todos los niveles de stock (y opcionalmente el
+    historial de movimientos). Después, ``sync()`` solo pide los movimientos
+    nuevos con ``get_movements(start_date=...)`` y aplica sus deltas al stock
+    local. Las consultas de stock bajo, valorización y totales por ubicación se
+    resuelven localmente sin llamar a la API. Conviene repetir ``full_sync()``
+    de vez en cuando para corregir cualquier deriva.
+    
+    El momento del stock descargado se toma del reloj del servidor (el
+    ``lastUpdated`` más reciente), no del local, para decidir qué movimientos
+    ya están incluidos en él. Los movimientos sin ``createdAt`` válido se
+    guardan pero no se aplican; se cuentan en ``unparsed``.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS stock_levels (
+            product_id TEXT NOT NULL,
+            location_id TEXT NOT NULL,
+            sku TEXT,
+            product_name TEXT,
+            category_id TEXT,
+            unit_price REAL DEFAULT 0,
+            quantity REAL DEFAULT 0,
+            reserved_quantity REAL DEFAULT 0,
+            min_stock REAL,
+            max_stock REAL,
+            last_updated TEXT,
+            PRIMARY KEY (product_id, location_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_stock_location ON stock_levels (location_id);
+        CREATE TABLE IF NOT EXISTS movements (
+            id TEXT PRIMARY KEY,
+            product_id TEXT NOT NULL,
+            location_id TEXT,
+            destination_location_id TEXT,
+            movement_type TEXT,
+            quantity REAL,
+            reference_number TEXT,
+            created_at TEXT,
+            created_ts REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_movements_created ON movements (created_ts);
+        CREATE INDEX IF NOT EXISTS idx_movements_product ON movements (product_id, location_id);
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+    
+    # Margen al pedir movimientos desde la última sincronización (los repetidos se descartan por id)
+    SYNC_OVERLAP = timedelta(days=1)
+    
+    def __init__(self, client: InventoryAPI, path: str = ':memory:', page_size: int = 500):
+        self.client = client
+        self.path = path
+        self.page_size = page_size
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(self.SCHEMA)
+        self.logger = logging.getLogger(__name__)
+    
+    def close(self) -> None:
+        """Cerrar la base de datos local"""
+        with self._lock:
+            self._db.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    # ==================== SINCRONIZACIÓN ====================
+    
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self._db.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else None
+    
+    def _set_state(self, key: str, value: Any) -> None:
+        self._db.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (key, str(value)))
+    
+    def _store_movements(self, movements: Iterable[Dict], apply_after: float) -> Tuple[int, int, int]:
+        """Guarda movimientos nuevos y aplica al stock los posteriores a ``apply_after``
+        
+        Devuelve (movimientos_nuevos, movimientos_aplicados, sin_fecha_válida).
+        """
+        inserted = applied = unparsed = 0
+        for i, movement in enumerate(movements, 1):
+            created_ts = _parse_timestamp(movement.get('createdAt'))
+            cursor = self._db.execute(
+                'INSERT OR IGNORE INTO movements VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (movement.get('id'), movement.get('productId'), movement.get('locationId'),
+                 movement.get('destinationLocationId'), movement.get('movementType'),
+                 movement.get('quantity'), movement.get('referenceNumber'),
+                 movement.get('createdAt'), created_ts)
+            )
+            if cursor.rowcount != 1:
+                continue
+            inserted += 1
+            
+            if created_ts is None:
+                unparsed += 1
+                self.logger.warning('Movimiento %s con createdAt no válido (%r): no se aplica al stock local', 
+                                    movement.get('id'), movement.get('createdAt'))
+            elif created_ts > apply_after:
+                for product_id, location_id, delta in _movement_deltas(movement):
+                    # Una ubicación nueva hereda los datos del producto de sus otras ubicaciones
+                    self._db.execute(
+                        'INSERT INTO stock_levels (product_id, location_id, sku, product_name, category_id, '
+                        'unit_price, quantity) SELECT ?, ?, p.sku, p.product_name, p.category_id, '
+                        'COALESCE(p.unit_price, 0), ? FROM (SELECT NULL) LEFT JOIN '
+                        '(SELECT * FROM stock_levels WHERE product_id = ? LIMIT 1) p ON 1 WHERE 1 '
+                        'ON CONFLICT (product_id, location_id) DO UPDATE SET quantity = quantity + excluded.quantity',
+                        (product_id, location_id, delta, product_id)
+                    )
+                applied += 1
+            
+            if i % self.page_size == 0:
+                self._db.commit()
+        self._db.commit()
+        return inserted, applied, unparsed
+    
+    def full_sync(self, history_since: str = None, include_history: bool = True) -> Dict:
+        """Descargar el stock completo (y el historial de movimientos) desde la API"""
+        with self._lock:
+            started = time.time()
+            seen = {'levels': 0, 'asOf': None}
+            
+            def rows():
+                for level in self.client.iter_stock_levels(page_size=self.page_size):
+                    seen['levels'] += 1
+                    updated_ts = _parse_timestamp(level.get('lastUpdated'))
+                    if updated_ts is not None and (seen['asOf'] is None or updated_ts > seen['asOf']):
+                        seen['asOf'] = updated_ts
+                    product = level.get('product') or {}
+                    yield (level.get('productId'), level.get('locationId'), product.get('sku'), 
+                           product.get('name'), product.get('categoryId'), float(product.get('unitPrice') or 0), 
+                           float(level.get('quantity') or 0), float(level.get('reservedQuantity') or 0), 
+                           level.get('minStock'), level.get('maxStock'), level.get('lastUpdated'))
+            
+            try:
+                self._db.execute('DELETE FROM stock_levels')
+                self._db.executemany('INSERT OR REPLACE INTO stock_levels VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', 
+                                     rows())
+            except BaseException:
+                self._db.rollback()
+                raise
+            
+            # Hora del servidor: el último lastUpdated ya está incluido en el stock descargado
+            stock_as_of = seen['asOf']
+            if stock_as_of is None:
+                self.logger.warning('Stock sin lastUpdated: se usa el reloj local para aplicar movimientos')
+                stock_as_of = started
+            self._set_state('stock_as_of', stock_as_of)
+            self._set_state('last_sync', started)
+            self._db.commit()
+            
+            inserted = applied = unparsed = 0
+            if include_history:
+                movements = self.client.iter_movements(start_date=history_since, page_size=self.page_size)
+                inserted, applied, unparsed = self._store_movements(movements, stock_as_of)
+            
+            return {'stockLevels': seen['levels'], 'movements': inserted, 'applied': applied, 'unparsed': unparsed}
+    
+    def sync(self) -> Dict:
+        """Sincronizar solo los movimientos nuevos desde la última sincronización"""
+        with self._lock:
+            last_sync = self._get_state('last_sync')
+            if last_sync is None:
+                return self.full_sync()
+            
+            started = time.time()
+            since = datetime.fromtimestamp(float(last_sync), timezone.utc) - self.SYNC_OVERLAP
+            stock_as_of = float(self._get_state('stock_as_of') or 0)
+            
+            movements = self.client.iter_movements(start_date=since.strftime('%Y-%m-%d'), 
+                                                   page_size=self.page_size)
+            inserted, applied, unparsed = self._store_movements(movements, stock_as_of)
+            self._set_state('last_sync', started)
+            self._db.commit()
+            
+            return {'movements': inserted, 'applied': applied, 'unparsed': unparsed}
+    
+    # ==================== CONSULTAS LOCALES ====================
+    
+    def _query(self, sql: str, params: Tuple = ()) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params)]
+    
+    def low_stock(self, threshold: float = None, location_id: str = None) -> List[Dict]:
+        """Productos con stock bajo (bajo ``threshold`` o bajo su stock mínimo)"""
+        sql = 'SELECT * FROM stock_levels WHERE '
+        params = []
+        if threshold is not None:
+            sql += 'quantity < ?'
+            params.append(threshold)
+        else:
+            sql += 'min_stock IS NOT NULL AND quantity <= min_stock'
+        if location_id:
+            sql += ' AND location_id = ?'
+            params.append(location_id)
+        return self._query(sql + ' ORDER BY quantity', tuple(params))
+    
+    def valuation(self, location_id: str = None) -> Dict:
+        """Valor del inventario (cantidad × precio unitario)"""
+        sql = ('SELECT COUNT(DISTINCT product_id) AS totalProducts, COALESCE(SUM(quantity), 0) AS totalQuantity, '
+               'COALESCE(SUM(quantity * unit_price), 0) AS totalValue FROM stock_levels')
+        params = ()
+        if location_id:
+            sql += ' WHERE location_id = ?'
+            params = (location_id,)
+        result = self._query(sql, params)[0]
+        result['averageValue'] = result['totalValue'] / result['totalProducts'] if result['totalProducts'] else 0
+        return result
+    
+    def stock_by_location(self) -> List[Dict]:
+        """Totales de stock y valor por ubicación"""
+        return self._query(
+            'SELECT location_id AS locationId, COUNT(*) AS products, SUM(quantity) AS totalQuantity, '
+            'SUM(quantity * unit_price) AS totalValue, '
+            'SUM(CASE WHEN min_stock IS NOT NULL AND quantity <= min_stock THEN 1 ELSE 0 END) AS lowStockProducts '
+            'FROM stock_levels GROUP BY location_id ORDER BY location_id'
+        )
+    
+    def product_stock(self, product_id: str) -> List[Dict]:
+        """Stock local de un producto en todas sus ubicaciones"""
+        return self._query('SELECT * FROM stock_levels WHERE product_id = ?', (product_id,))
+    
+    def movements(self, product_id: str = None, location_id: str = None, since: str = None) -> List[Dict]:
+        """Movimientos almacenados localmente"""
+        sql = 'SELECT * FROM movements WHERE 1 = 1'
+        params = []
+        if product_id:
+            sql += ' AND product_id = ?'
+            params.append(product_id)
+        if location_id:
+            sql += ' AND location_id = ?'
+            params.append(location_id)
+        if since:
+            sql += ' AND created_ts >= ?'
+            params.append(_parse_timestamp(since))
+        return self._query(sql + ' ORDER BY created_ts', tuple(params))
+
+# ==================== COLA DE MOVIMIENTOS OFFLINE ====================
+
+class MovementQueue:
+    """Cola local persistente (SQLite) de movimientos con reenvío por lotes
+    
+    ``create_movement``, ``adjust_stock`` y ``transfer_stock`` escriben el
+    movimiento en disco y devuelven al instante su clave de idempotencia, esté
+    o no disponible la API. ``flush()`` (o el hilo de ``start()``) los reenvía
+    en orden de llegada con ``update_stock_batch`` en lotes de hasta
+    ``batch_size``. La referencia de cada lote (también enviada como
+    ``Idempotency-Key``) se guarda junto a sus filas: tras un corte o un
+    reinicio se reenvía exactamente el mismo lote. Un error reintentable
+    detiene el reenvío hasta el siguiente intento con espera creciente; un lote
+    rechazado por validación pasa a ``dead_letters()`` para no bloquear la cola.
+    
+    Requiere un cliente síncrono (InventoryAPI). Uso::
+    
+        with MovementQueue(client, 'movimientos.db') as outbox:
+            outbox.adjust_stock(product_id, location_id, -1, 'venta')
+            print(outbox.metrics()['lagSeconds'])
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pending_movements (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            payload TEXT NOT NULL,
+            enqueued_at REAL NOT NULL,
+            batch_ref TEXT
+        );
+        CREATE TABLE IF NOT EXISTS dead_letters (
+            seq INTEGER PRIMARY KEY,
+            idempotency_key TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            enqueued_at REAL NOT NULL,
+            batch_ref TEXT,
+            error TEXT,
+            failed_at REAL
+        );
+    """
+    
+    # Respuestas que no mejoran reintentando: el lote se aparta a dead_letters
+    REJECTED_STATUSES = (400, 404, 409, 422)
+    
+    def __init__(self, client: InventoryAPI, path: str = 'movements-queue.db', batch_size: int = 500, 
+                 flush_interval: float = 1.0, max_backoff: float = 60.0, reference_prefix: str = 'WAL', 
+                 notes: str = '', durable: bool = False, lag_window: int = 10000):
+        self.client = client
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.reference_prefix = reference_prefix
+        self.notes = notes
+        self.logger = logging.getLogger(__name__)
+        
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._failures = 0
+        self._lags = deque(maxlen=lag_window)
+        self.last_error = None
+        self.last_flush = None
+        self.counters = {
+            'enqueued': 0,
+            'duplicates': 0,
+            'replayed': 0,
+            'batches': 0,
+            'failedBatches': 0,
+            'deadLettered': 0
+        }
+        
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        # NORMAL sobrevive a la caída del proceso; FULL también a un corte de energía
+        self._db.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+        self._db.executescript(self.SCHEMA)
+    
+    # ==================== ENCOLADO ====================
+    
+    def enqueue(self, movement: Dict, idempotency_key: str = None) -> str:
+        """Guarda un movimiento y devuelve su clave de idempotencia
+        
+        Una clave repetida mientras el movimiento sigue pendiente se ignora.
+        """
+        key = idempotency_key or uuid.uuid4().hex
+        payload = json.dumps(movement, separators=(',', ':'), default=str)
+        with self._lock:
+            cursor = self._db.execute(
+                'INSERT OR IGNORE INTO pending_movements (idempotency_key, payload, enqueued_at) VALUES (?, ?, ?)',
+                (key, payload, time.time())
+            )
+            self._db.commit()
+            self.counters['enqueued' if cursor.rowcount == 1 else 'duplicates'] += 1
+        return key
+    
+    def enqueue_many(self, movements: Iterable[Dict]) -> List[str]:
+        """Guarda varios movimientos en una sola transacción"""
+        now = time.time()
+        rows = [(uuid.uuid4().hex, json.dumps(movement, separators=(',', ':'), default=str), now) 
+                for movement in movements]
+        with self._lock:
+            self._db.executemany(
+                'INSERT INTO pending_movements (idempotency_key, payload, enqueued_at) VALUES (?, ?, ?)', rows
+            )
+            self._db.commit()
+            self.counters['enqueued'] += len(rows)
+        return [row[0] for row in rows]
+    
+    def create_movement(self, movement_data: Dict, idempotency_key: str = None) -> Dict:
+        """Encolar un movimiento de inventario"""
+        return {'queued': True, 'idempotencyKey': self.enqueue(movement_data, idempotency_key)}
+    
+    def adjust_stock(self, product_id: str, location_id: str, quantity: float, 
+                    reason: str = '', idempotency_key: str = None) -> Dict:
+        """Encolar un ajuste de stock"""
+        return self.create_movement({
+            'productId': product_id,
+            'locationId': location_id,
+            'movementType': 'adjustment',
+            'quantity': quantity,
+            'notes': reason
+        }, idempotency_key)
+    
+    def transfer_stock(self, product_id: str, from_location_id: str, to_location_id: str, 
+                      quantity: float, notes: str = '', idempotency_key: str = None) -> Dict:
+        """Encolar una transferencia entre ubicaciones"""
+        return self.create_movement({
+            'productId': product_id,
+            'locationId': from_location_id,
+            'movementType': 'transfer',
+            'quantity': -abs(quantity),
+            'destinationLocationId': to_location_id,
+            'notes': notes
+        }, idempotency_key)
+    
+    # ==================== REENVÍO ====================
+    
+    @staticmethod
+    def _to_updates(key: str, payload: str) -> List[Dict]:
+        """Movimiento → actualizaciones ``add`` de batch-update (una transferencia da dos)
+        
+        Cada actualización conserva los metadatos del movimiento (``movementType``,
+        ``notes``, ``destinationLocationId``...) para que el servidor lo registre igual.
+        """
+        movement = json.loads(payload)
+        metadata = {field: value for field, value in movement.items() 
+                    if field not in ('productId', 'locationId', 'quantity')}
+        return [dict(metadata, productId=product_id, locationId=location_id, quantity=delta, 
+                     operation='add', referenceNumber=key)
+                for product_id, location_id, delta in _movement_deltas(movement)]
+    
+    def _claim_batch(self) -> Tuple[Optional[str], List[Tuple]]:
+        """Siguiente lote en orden; si ya tenía referencia asignada se reenvía tal cual"""
+        with self._lock:
+            head = self._db.execute(
+                'SELECT batch_ref FROM pending_movements ORDER BY seq LIMIT 1'
+            ).fetchone()
+            if head is None:
+                return None, []
+            if head[0] is not None:
+                rows = self._db.execute(
+                    'SELECT seq, idempotency_key, payload, enqueued_at FROM pending_movements '
+                    'WHERE batch_ref = ? ORDER BY seq', (head[0],)
+                ).fetchall()
+                return head[0], rows
+            
+            rows = self._db.execute(
+                'SELECT seq, idempotency_key, payload, enqueued_at FROM pending_movements '
+                'WHERE batch_ref IS NULL ORDER BY seq LIMIT ?', (self.batch_size,)
+            ).fetchall()
+            digest = hashlib.sha1('\n'.join(row[1] for row in rows).encode('utf-8')).hexdigest()[:16]
+            reference = f'{self.reference_prefix}-{rows[0][0]}-{rows[-1][0]}-{digest}'
+            self._db.execute('UPDATE pending_movements SET batch_ref = ? WHERE seq BETWEEN ? AND ?', 
+                             (reference, rows[0][0], rows[-1][0]))
+            self._db.commit()
+            return reference, rows
+    
+    def _send_batch(self, reference: str, rows: List[Tuple]) -> Optional[int]:
+        """Envía un lote; devuelve los movimientos confirmados o None si hay que esperar"""
+        updates = [update for row in rows for update in self._to_updates(row[1], row[2])]
+        try:
+            self.client.update_stock_batch(updates, reference, self.notes, idempotency_key=reference)
+        except APIError as e:
+            self.last_error = e
+            with self._lock:
+                self.counters['failedBatches'] += 1
+                if e.status == 413 and len(rows) > 1:
+                    # Lote demasiado grande: se libera y los siguientes se arman con la mitad
+                    self.batch_size = max(1, len(rows) // 2)
+                    self._db.execute('UPDATE pending_movements SET batch_ref = NULL WHERE batch_ref = ?', (reference,))
+                    self._db.commit()
+                    return 0
+                if e.status not in self.REJECTED_STATUSES:
+                    self._failures += 1
+                    self.logger.warning('Cola de movimientos: lote %s pendiente (%s)', reference, e)
+                    return None
+                
+                self._db.execute(
+                    'INSERT OR REPLACE INTO dead_letters SELECT seq, idempotency_key, payload, enqueued_at, '
+                    'batch_ref, ?, ? FROM pending_movements WHERE batch_ref = ?', (str(e), time.time(), reference)
+                )
+                self._db.execute('DELETE FROM pending_movements WHERE batch_ref = ?', (reference,))
+                self._db.commit()
+                self.counters['deadLettered'] += len(rows)
+            self.logger.error('Cola de movimientos: lote %s rechazado (%s)', reference, e)
+            return 0
+        
+        now = time.time()
+        with self._lock:
+            self._db.execute('DELETE FROM pending_movements WHERE batch_ref = ?', (reference,))
+            self._db.commit()
+            self._failures = 0
+            self.counters['replayed'] += len(rows)
+            self.counters['batches'] += 1
+            self._lags.extend(now - row[3] for row in rows)
+        return len(rows)
+    
+    def flush(self, max_batches: int = None) -> Dict:
+        """Reenvía los movimientos pendientes hasta vaciar la cola o encontrar un error"""
+        replayed = batches = 0
+        with self._flush_lock:
+            while max_batches is None or batches < max_batches:
+                reference, rows = self._claim_batch()
+                sent = self._send_batch(reference, rows) if rows else None
+                if sent is None:
+                    break
+                replayed += sent
+                batches += 1 if sent else 0
+            self.last_flush = time.time()
+        return {'replayed': replayed, 'batches': batches, 'pending': self.pending()}
+    
+    def _retry_delay(self) -> float:
+        if not self._failures:
+            return self.flush_interval
+        return min(self.max_backoff, self.flush_interval * (2 ** self._failures)) * random.uniform(0.5, 1.0)
+    
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.flush()
+            except Exception:
+                self.logger.exception('Error reenviando la cola de movimientos')
+            self._stop_event.wait(self._retry_delay())
+    
+    def start(self) -> 'MovementQueue':
+        """Inicia el reenvío en segundo plano cada ``flush_interval`` segundos"""
+        with self._lock:
+            if self._thread is None:
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._run, name='movement-queue', daemon=True)
+                self._thread.start()
+        return self
+    
+    def stop(self, drain: bool = True, timeout: float = None) -> None:
+        """Detiene el hilo; con ``drain`` intenta un último reenvío"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        self._stop_event.set()
+        if thread is not None:
+            thread.join(timeout)
+        if drain:
+            self.flush()
+    
+    def close(self) -> None:
+        self.stop()
+        with self._lock:
+            self._db.close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    # ==================== MÉTRICAS ====================
+    
+    def pending(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM pending_movements').fetchone()[0]
+    
+    def dead_letters(self) -> List[Dict]:
+        """Movimientos rechazados por la API, con el error recibido"""
+        with self._lock:
+            rows = self._db.execute('SELECT * FROM dead_letters ORDER BY seq').fetchall()
+        return [{'idempotencyKey': row[1], 'movement': json.loads(row[2]), 'enqueuedAt': row[3], 
+                 'batchReference': row[4], 'error': row[5], 'failedAt': row[6]} for row in rows]
+    
+    def metrics(self) -> Dict:
+        """Contadores, pendientes y retraso de la cola (segundos)
+        
+        ``lagSeconds`` es la antigüedad del movimiento pendiente más viejo;
+        ``replayLagP50``/``P99`` miden cuánto tardaron en llegar a la API los ya enviados.
+        """
+        with self._lock:
+            pending, oldest = self._db.execute(
+                'SELECT COUNT(*), MIN(enqueued_at) FROM pending_movements'
+            ).fetchone()
+            dead = self._db.execute('SELECT COUNT(*) FROM dead_letters').fetchone()[0]
+            counters = dict(self.counters)
+            lags = sorted(self._lags)
+        return {
+            **counters,
+            'pending': pending,
+            'deadLetters': dead,
+            'lagSeconds': time.time() - oldest if oldest is not None else 0.0,
+            'replayLagP50': _percentile(lags, 50),
+            'replayLagP99': _percentile(lags, 99),
+            'consecutiveFailures': self._failures,
+            'lastError': str(self.last_error) if self.last_error else None,
+            'lastFlush': self.last_flush,
+            'running': self._thread is not None
+        }
+
+# ==================== FEED DE CAMBIOS ====================
+
+class FeedChange:
+    """Cambio de inventario (un movimiento) emitido por ChangeFeed"""
+    
+    __slots__ = ('id', 'created_at', 'created_ts', 'source', 'movement')
+    
+    def __init__(self, movement: Dict, source: str):
+        self.id = movement.get('id')
+        self.created_at = movement.get('createdAt')
+        self.created_ts = _parse_timestamp(self.created_at)  # None si falta o no se entiende
+        self.source = source  # 'poll' o 'webhook'
+        self.movement = movement
+    
+    def __repr__(self):
+        return f'FeedChange({self.id!r}, {self.created_at!r}, {self.source!r})'
+
+def _webhook_movement(delivery: 'WebhookDelivery') -> Optional[Dict]:
+    """Movimiento (con la forma de /inventory/movements) contenido en una entrega de webhook"""
+    data = delivery.data or {}
+    movement = dict(data.get('movement') or {})
+    if not movement.get('id'):
+        return None
+    change = data.get('stockChange') or {}
+    product = data.get('product') or {}
+    location = data.get('location') or {}
+    movement.setdefault('productId', product.get('id') or data.get('productId'))
+    movement.setdefault('locationId', location.get('id') or data.get('locationId'))
+    if change:
+        movement.setdefault('movementType', change.get('movementType'))
+        movement.setdefault('quantity', abs(change.get('difference') or 0))
+    movement.setdefault('createdAt', delivery.payload.get('timestamp') if delivery.payload else None)
+    return movement
+
+class ChangeFeed:
+    """Flujo ordenado y sin duplicados de movimientos de inventario, casi en tiempo real
+    
+    Sigue ``get_movements`` con un cursor (el ``createdAt`` más reciente
+    obtenido por consulta; por defecto empieza en el momento actual), pidiendo
+    solo lo posterior al cursor menos ``overlap``; los movimientos repetidos
+    por ese solapamiento se descartan por id. El
+    intervalo entre consultas baja a ``min_interval`` cuando hay cambios y
+    crece por ``backoff`` hasta ``max_interval`` mientras no los hay.
+    
+    Una consulta nunca carga más de ``max_items`` movimientos: si hay más
+    pendientes (p. ej. tras una caída larga) el feed se pone al día por
+    ventanas de ``endDate`` de hasta ``catchup_window`` segundos, que se
+    emiten y guardan una a una (la ventana se reduce a la mitad si aun así
+    excede ``max_items``).
+    
+    Con ``attach(receiver)`` los webhooks de movimientos se incorporan al
+    flujo en cuanto llegan y adelantan la siguiente consulta; el sondeo sigue
+    como red de seguridad para entregas perdidas (los webhooks no mueven el
+    cursor). Cada lote se emite ordenado por (createdAt, id) y el cursor nunca
+    retrocede; los movimientos sin ``createdAt`` válido se deduplican solo
+    por id y van al final del lote.
+    
+    Con ``checkpoint_path`` el cursor y los ids recientes se guardan en un JSON
+    (escritura atómica) al terminar de consumir cada lote, así que tras un
+    reinicio se continúa donde se dejó (entrega al menos una vez)::
+    
+        feed = ChangeFeed(client, checkpoint_path='feed.json')
+        feed.attach(receiver)
+        for change in feed.changes():
+            procesar(change.movement)
+    """
+    
+    WEBHOOK_EVENTS = ('inventory.movement.created', 'inventory.stock.updated', 'inventory.adjustment.created')
+    
+    def __init__(self, client: InventoryAPI, checkpoint_path: str = None, start: str = None, 
+                 min_interval: float = 1.0, max_interval: float = 30.0, backoff: float = 2.0, 
+                 overlap: float = 5.0, page_size: int = 200, dedup_size: int = 100000, 
+                 max_items: int = 10000, catchup_window: float = 3600.0):
+        self.client = client
+        self.checkpoint_path = checkpoint_path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.overlap = overlap  # Segundos que se vuelven a pedir antes del cursor
+        self.page_size = page_size
+        self.dedup_size = dedup_size
+        self.max_items = max_items  # Movimientos como máximo en memoria por consulta
+        self.catchup_window = catchup_window  # Segundos por ventana al ponerse al día
+        self.logger = logging.getLogger(__name__)
+        
+        # createdAt (ISO 8601) del último movimiento consultado
+        self.cursor = start or datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        self.date_only = False  # El servidor solo acepta fechas en startDate
+        self.interval = min_interval
+        self._seen = OrderedDict()  # id -> created_ts, en orden de llegada
+        self._catchup_until = None  # createdAt más reciente visto al detectar el atraso
+        self._webhooks = deque()
+        self._wake = threading.Event()
+        self._poll_now = False
+        self._stopped = False
+        self.counters = {'polls': 0, 'emptyPolls': 0, 'errors': 0, 'fromPoll': 0, 
+                         'fromWebhook': 0, 'duplicates': 0, 'catchupWindows': 0}
+        self._load_checkpoint()
+    
+    # ==================== CHECKPOINT ====================
+    
+    def _load_checkpoint(self) -> None:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path, encoding='utf-8') as f:
+            state = json.load(f)
+        self.cursor = state.get('cursor') or self.cursor
+        self.date_only = bool(state.get('dateOnly'))
+        self._seen = OrderedDict((movement_id, ts) for movement_id, ts in state.get('recent', []))
+    
+    def commit(self) -> None:
+        """Guarda el cursor y los ids recientes (lo hace ``changes()`` tras cada lote)"""
+        if not self.checkpoint_path:
+            return
+        state = {'cursor': self.cursor, 'dateOnly': self.date_only, 'recent': list(self._seen.items())}
+        temporary = f'{self.checkpoint_path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.checkpoint_path)
+    
+    # ==================== CONSULTA ====================
+    
+    def _format(self, ts: float) -> str:
+        moment = datetime.fromtimestamp(ts, timezone.utc)
+        return moment.strftime('%Y-%m-%d') if self.date_only else moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+    
+    def _start_date(self) -> Optional[str]:
+        """``startDate`` para la siguiente consulta: el cursor menos el solapamiento"""
+        cursor_ts = _parse_timestamp(self.cursor)
+        if cursor_ts is None:
+            return self.cursor
+        return self._format(cursor_ts - self.overlap)
+    
+    def _query(self, end_ts: float = None, limit: int = None) -> List[Dict]:
+        movements = self.client.iter_movements(start_date=self._start_date(), page_size=self.page_size, 
+                                               end_date=self._format(end_ts) if end_ts is not None else None)
+        return list(islice(movements, limit))
+    
+    def _fetch(self) -> Tuple[List[Dict], Optional[float]]:
+        """Movimientos desde el cursor y, al ponerse al día, el fin de la ventana consultada"""
+        try:
+            return self._fetch_window()
+        except APIError as e:
+            if e.status in (400, 422) and not self.date_only and self.cursor:
+                # startDate solo admite fechas: se pide el día completo y se deduplica por id
+                self.date_only = True
+                return self._fetch_window()
+            raise
+    
+    def _fetch_window(self) -> Tuple[List[Dict], Optional[float]]:
+        cursor_ts = _parse_timestamp(self.cursor)
+        if self._catchup_until is None or cursor_ts is None:
+            movements = self._query(limit=self.max_items + 1)
+            if len(movements) <= self.max_items or cursor_ts is None:
+                return movements, None
+            # Demasiado atraso: ventanas hasta lo más reciente visto ahora (que
+            # garantiza que cada ventana ya no recibirá movimientos nuevos)
+            self._catchup_until = max(filter(None, map(_parse_timestamp, 
+                                                       (m.get('createdAt') for m in movements))), 
+                                      default=cursor_ts)
+        
+        window = self.catchup_window
+        while True:
+            end_ts = min(cursor_ts + window, self._catchup_until)
+            if self.date_only:
+                # endDate por día: la ventana termina a medianoche (UTC)
+                end_ts = max(end_ts - end_ts % 86400, cursor_ts - cursor_ts % 86400 + 86400)
+            minimal = window <= 1.0 or self.date_only
+            movements = self._query(end_ts, None if minimal else self.max_items + 1)
+            if minimal or len(movements) <= self.max_items:
+                break
+            window /= 2
+        
+        self.counters['catchupWindows'] += 1
+        if end_ts >= self._catchup_until:
+            self._catchup_until = None
+        return movements, end_ts
+    
+    def _accept(self, changes: Iterable[FeedChange]) -> List[FeedChange]:
+        """Descarta repetidos y los anteriores a la ventana; devuelve el lote ordenado"""
+        # Lo anterior a cursor - overlap ya lo cubrieron consultas previas (o es
+        # parte del día completo que devuelve una consulta solo por fecha)
+        cursor_ts = _parse_timestamp(self.cursor) or 0.0
+        horizon = cursor_ts - self.overlap
+        
+        batch = {}
+        for change in changes:
+            if change.id is None or change.id in self._seen or change.id in batch:
+                self.counters['duplicates'] += 1
+                continue
+            if change.created_ts is not None and change.created_ts < horizon:
+                self.counters['duplicates'] += 1
+                continue
+            batch[change.id] = change
+        
+        ordered = sorted(batch.values(), key=lambda c: (c.created_ts is None, c.created_ts or 0.0, str(c.id)))
+        for change in ordered:
+            # Sin fecha: se recuerda como si fuera de ahora para deduplicar la consulta que lo traiga
+            self._seen[change.id] = change.created_ts if change.created_ts is not None else max(cursor_ts, time.time())
+            self.counters['fromWebhook' if change.source == 'webhook' else 'fromPoll'] += 1
+            if (change.source == 'poll' and change.created_ts is not None 
+                    and change.created_ts >= (_parse_timestamp(self.cursor) or 0.0)):
+                self.cursor = change.created_at
+        
+        # Olvidar ids que ya no pueden volver a aparecer
+        horizon = (_parse_timestamp(self.cursor) or 0.0) - self.overlap
+        while self._seen and (len(self._seen) > self.dedup_size or next(iter(self._seen.values())) < horizon):
+            self._seen.popitem(last=False)
+        return ordered
+    
+    def _drain_webhooks(self) -> List[FeedChange]:
+        changes = []
+        while self._webhooks:
+            changes.append(self._webhooks.popleft())
+        return changes
+    
+    def poll(self, fetch: bool = True) -> List[FeedChange]:
+        """Una iteración: webhooks recibidos y (con ``fetch``) una consulta a la API
+        
+        Ajusta ``interval`` según haya habido cambios o no.
+        """
+        changes = self._drain_webhooks()
+        window_end = None
+        if fetch:
+            self.counters['polls'] += 1
+            try:
+                movements, window_end = self._fetch()
+            except APIError as e:
+                self.counters['errors'] += 1
+                self.logger.warning('ChangeFeed: consulta fallida (%s)', e)
+                self.interval = min(self.max_interval, self.interval * self.backoff)
+                return self._accept(changes)
+            changes.extend(FeedChange(movement, 'poll') for movement in movements)
+        
+        batch = self._accept(changes)
+        if window_end is not None:
+            # Ventana de puesta al día completa: el cursor llega a su final aunque estuviera vacía
+            if window_end > (_parse_timestamp(self.cursor) or 0.0):
+                self.cursor = datetime.fromtimestamp(window_end, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+            if self._catchup_until is not None:
+                self._poll_now = True
+        if batch:
+            self.interval = self.min_interval
+        elif fetch:
+            self.counters['emptyPolls'] += 1
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return batch
+    
+    def changes(self, idle_timeout: float = None) -> Iterator[FeedChange]:
+        """Generador bloqueante de cambios; termina con ``stop()`` o tras ``idle_timeout`` sin cambios"""
+        self._stopped = False
+        next_poll = 0.0
+        idle_since = time.monotonic()
+        while not self._stopped:
+            fetch = self._poll_now or time.monotonic() >= next_poll
+            self._poll_now = False
+            batch = self.poll(fetch)
+            now = time.monotonic()
+            if fetch:
+                next_poll = now + self.interval
+            elif batch:
+                # Llegaron webhooks: una consulta pronto confirma que no falta nada
+                next_poll = min(next_poll, now + self.min_interval)
+            
+            if batch:
+                idle_since = now
+                yield from batch
+                self.commit()
+            elif idle_timeout is not None and now - idle_since >= idle_timeout:
+                return
+            
+            self._wake.wait(max(0.0, next_poll - time.monotonic()))
+            self._wake.clear()
+    
+    def stop(self) -> None:
+        self._stopped = True
+        self._wake.set()
+    
+    # ==================== WEBHOOKS ====================
+    
+    def on_delivery(self, delivery: 'WebhookDelivery') -> None:
+        """Manejador de webhooks: encola el movimiento y despierta al consumidor"""
+        movement = _webhook_movement(delivery)
+        if movement is not None:
+            self._webhooks.append(FeedChange(movement, 'webhook'))
+        else:
+            self._poll_now = True  # Cambio sin movimiento identificable: consultar ya
+        self._wake.set()
+    
+    def attach(self, receiver: 'WebhookReceiver') -> 'ChangeFeed':
+        """Registra el feed en un WebhookReceiver para los eventos de movimientos"""
+        for event in self.WEBHOOK_EVENTS:
+            receiver.on(event, self.on_delivery)
+        return self
+    
+    def stats(self) -> Dict:
+        return {**self.counters, 'cursor': self.cursor, 'interval': self.interval, 
+                'dateOnly': self.date_only, 'tracked': len(self._seen), 'pendingWebhooks': len(self._webhooks)}
+
+# ==================== PROGRAMADOR DE REPORTES ====================
+
+def _period_dates(period: Any, today: date = None) -> Tuple[str, str]:
+    """(inicio, fin) ISO de un periodo: tupla, ``'inicio/fin'``, ``'7days'``, ``'today'`` o ``'yesterday'``"""
+    if isinstance(period, (tuple, list)):
+        return str(period[0]), str(period[1])
+    today = today or date.today()
+    text = str(period)
+    if '/' in text:
+        start, end = text.split('/', 1)
+        return start, end
+    if text == 'today':
+        return today.isoformat(), today.isoformat()
+    if text == 'yesterday':
+        day = (today - timedelta(days=1)).isoformat()
+        return day, day
+    if text.endswith('days') and text[:-4].isdigit():
+        return (today - timedelta(days=int(text[:-4]) - 1)).isoformat(), today.isoformat()
+    raise ValueError(f'Periodo no reconocido: {period!r}')
+
+class ReportSpec:
+    """Un reporte concreto (tipo, ubicación, periodo y parámetros) dentro de un ReportScheduler"""
+    
+    __slots__ = ('report', 'location_id', 'period', 'params', 'key')
+    
+    def __init__(self, report: str, location_id: str = None, period: Any = None, params: Dict = None):
+        self.report = report
+        self.location_id = location_id
+        self.period = '/'.join(map(str, period)) if isinstance(period, (tuple, list)) else period
+        self.params = params or {}
+        key = f"{report}|{location_id or '*'}|{self.period or '*'}"
+        if self.params:
+            key += '|' + ','.join(f'{k}={v}' for k, v in sorted(self.params.items()))
+        self.key = key
+    
+    def call(self) -> Tuple[str, Dict]:
+        """Método del cliente y argumentos; reportes iguales dan la misma llamada"""
+        params = dict(self.params)
+        if self.report == 'stock-summary':
+            return 'get_stock_summary', {'location_id': self.location_id, **params}
+        if self.report == 'movement-summary':
+            start, end = _period_dates(self.period or '30days')
+            return 'get_movement_summary', {'start_date': start, 'end_date': end, **params}
+        if self.report == 'top-products':
+            return 'get_top_products', {'period': self.period or '30days', **params}
+        if self.report == 'inventory-value':
+            return 'get_inventory_value', {'location_id': self.location_id}
+        if self.report.startswith('export:'):
+            if self.location_id:
+                params['locationId'] = self.location_id
+            if self.period:
+                params['startDate'], params['endDate'] = _period_dates(self.period)
+            return 'export_report', {'report_type': self.report[len('export:'):], **params}
+        raise ValueError(f'Reporte no soportado: {self.report}')
+    
+    def __repr__(self):
+        return f'ReportSpec({self.key!r})'
+
+class ReportBundle:
+    """Resultados de un conjunto de reportes, indexados por ``ReportSpec.key``"""
+    
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+        self.fetched_at = {}  # key -> time.time() de la descarga
+        self.requests = 0
+        self.elapsed = 0.0
+    
+    def __getitem__(self, key: str) -> Any:
+        if key in self.errors:
+            raise self.errors[key]
+        return self.results[key]
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.results
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.results.get(key, default)
+    
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+    
+    def summary(self) -> Dict:
+        now = time.time()
+        ages = [now - fetched for fetched in self.fetched_at.values()]
+        return {
+            'reports': len(self.results) + len(self.errors),
+            'failed': len(self.errors),
+            'requests': self.requests,
+            'maxAge': max(ages) if ages else None,
+            'elapsed': self.elapsed
+        }
+
+class ReportScheduler:
+    """Ejecuta y precarga en paralelo un conjunto declarativo de reportes por ubicación y periodo
+    
+    Cada entrada de ``reports`` indica ``report`` (``stock-summary``,
+    ``movement-summary``, ``top-products``, ``inventory-value`` o
+    ``export:<tipo>``) y opcionalmente ``locations``, ``periods`` y
+    ``params``; se expande en un ReportSpec por combinación. Los reportes que
+    se traducen en la misma llamada (p. ej. ``top-products`` o
+    ``movement-summary``, que la API no filtra por ubicación) se piden una sola
+    vez. Las llamadas se reparten en ``max_workers`` hilos; el ritmo lo marca
+    el RateLimitGovernor del cliente, si tiene uno.
+    
+    ``bundle()`` devuelve un ReportBundle: lo que está en cache y no supera
+    ``max_age`` se sirve sin llamar a la API y solo se descarga lo que falta.
+    ``start(daily_at=['06:30'])`` o ``start(every=900)`` precarga todo en
+    segundo plano, por ejemplo antes del horario de oficina::
+    
+        scheduler = ReportScheduler(client, [
+            {'report': 'stock-summary', 'locations': ['loc-1', 'loc-2']},
+            {'report': 'movement-summary', 'periods': ['yesterday', '7days']},
+            {'report': 'top-products', 'params': {'limit': 20}},
+        ], max_age=3600).start(daily_at=['06:30'])
+        bundle = scheduler.bundle()
+        bundle['stock-summary|loc-1|*']
+    """
+    
+    def __init__(self, client: InventoryAPI, reports: Iterable[Dict], locations: List[str] = None, 
+                 max_workers: int = 4, max_age: float = None):
+        self.client = client
+        self.locations = locations
+        self.max_workers = max_workers
+        self.max_age = max_age  # Segundos que un resultado en cache se considera vigente
+        self.specs = self.expand(reports)
+        self.logger = logging.getLogger(__name__)
+        
+        self._cache = {}  # key -> (resultado, time.time())
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.last_refresh = None
+    
+    def expand(self, reports: Iterable[Dict]) -> List[ReportSpec]:
+        """Convierte las entradas declarativas en ReportSpec sin repetidos"""
+        specs = {}
+        for entry in reports:
+            locations = entry.get('locations') or ([entry['location']] if entry.get('location') else None)
+            periods = entry.get('periods') or [entry.get('period')]
+            for location_id in locations or self.locations or [None]:
+                for period in periods:
+                    spec = ReportSpec(entry['report'], location_id, period, entry.get('params'))
+                    self._validate(spec)
+                    specs.setdefault(spec.key, spec)
+        return list(specs.values())
+    
+    def _validate(self, spec: ReportSpec) -> None:
+        """Falla al registrar (ValueError) un reporte, periodo o método de cliente no válido"""
+        method, kwargs = spec.call()
+        if not callable(getattr(self.client, method, None)):
+            raise ValueError(f'El cliente no implementa {method} (reporte {spec.key})')
+        try:
+            hash(tuple(sorted(kwargs.items())))
+        except TypeError:
+            raise ValueError(f'Parámetros no admitidos (deben ser escalares) en el reporte {spec.key}') from None
+    
+    def _run(self, specs: List[ReportSpec], bundle: ReportBundle) -> None:
+        """Descarga los specs agrupados por llamada, con una petición por llamada distinta"""
+        calls = OrderedDict()
+        for spec in specs:
+            try:
+                method, kwargs = spec.call()
+                calls.setdefault((method, tuple(sorted(kwargs.items()))), (method, kwargs, []))[2].append(spec)
+            except Exception as e:
+                bundle.errors[spec.key] = e
+        
+        with concurrent_futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(getattr(self.client, method), **kwargs): grouped 
+                       for method, kwargs, grouped in calls.values()}
+            bundle.requests += len(futures)
+            for future in concurrent_futures.as_completed(futures):
+                fetched = time.time()
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Un fallo (de API o no) afecta solo a los reportes de esa llamada
+                    for spec in futures[future]:
+                        bundle.errors[spec.key] = e
+                    self.logger.warning('Reporte %s falló: %r', futures[future][0].key, e)
+                    continue
+                with self._lock:
+                    for spec in futures[future]:
+                        self._cache[spec.key] = (result, fetched)
+                        bundle.results[spec.key] = result
+                        bundle.fetched_at[spec.key] = fetched
+    
+    def bundle(self, keys: Iterable[str] = None, max_age: float = None) -> ReportBundle:
+        """Resultados de todos los reportes (o de ``keys``), descargando solo los que no están vigentes"""
+        started = time.monotonic()
+        max_age = self.max_age if max_age is None else max_age
+        wanted = set(keys) if keys is not None else None
+        specs = [spec for spec in self.specs if wanted is None or spec.key in wanted]
+        
+        bundle = ReportBundle()
+        now = time.time()
+        missing = []
+        with self._lock:
+            for spec in specs:
+                entry = self._cache.get(spec.key)
+                if entry is not None and (max_age is None or now - entry[1] <= max_age):
+                    bundle.results[spec.key], bundle.fetched_at[spec.key] = entry
+                else:
+                    missing.append(spec)
+        if missing:
+            self._run(missing, bundle)
+        bundle.elapsed = time.monotonic() - started
+        return bundle
+    
+    def refresh(self) -> ReportBundle:
+        """Descarga de nuevo todos los reportes y actualiza la cache"""
+        with self._refresh_lock:
+            started = time.monotonic()
+            bundle = ReportBundle()
+            self._run(self.specs, bundle)
+            bundle.elapsed = time.monotonic() - started
+            self.last_refresh = time.time()
+            return bundle
+    
+    @staticmethod
+    def _next_run(daily_at: List[str], every: float, now: datetime) -> float:
+        """Segundos hasta la próxima precarga"""
+        waits = [every] if every else []
+        for moment in daily_at or []:
+            hour, minute = map(int, moment.split(':'))
+            run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if run_at <= now:
+                run_at += timedelta(days=1)
+            waits.append((run_at - now).total_seconds())
+        return min(waits)
+    
+    def _schedule(self, daily_at: List[str], every: float) -> None:
+        while not self._stop_event.wait(self._next_run(daily_at, every, datetime.now())):
+            try:
+                summary = self.refresh().summary()
+                self.logger.info('Reportes precargados: %s', summary)
+            except Exception:
+                self.logger.exception('Error precargando reportes')
+    
+    def start(self, daily_at: List[str] = None, every: float = None, warm: bool = False) -> 'ReportScheduler':
+        """Precarga en segundo plano a las horas ``daily_at`` (``'HH:MM'`` local) y/o cada ``every`` segundos
+        
+        Con ``warm`` se hace además una precarga inmediata.
+        """
+        if not daily_at and not every:
+            raise ValueError('Indique daily_at o every')
+        if self._thread is None:
+            self._stop_event.clear()
+            if warm:
+                threading.Thread(target=self.refresh, name='report-warmup', daemon=True).start()
+            self._thread = threading.Thread(target=self._schedule, args=(daily_at, every), 
+                                            name='report-scheduler', daemon=True)
+            self._thread.start()
+        return self
     
-    def adjust_stock(self, product_id: str, location_id: str, quantity: float, 
-                    reason: str = '') -> Dict:
-        """Ajustar stock de producto"""
-        return self.create_movement({
-            'productId': product_id,
-            'locationId': location_id,
-            'movementType': 'adjustment',
-            'quantity': quantity,
-            'notes': reason
-        })
+    def stop(self, timeout: float = None) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+# ==================== ANALÍTICA LOCAL ====================
+
+class InventoryAnalytics:
+    """Analítica vectorizada (NumPy/pandas) sobre movimientos y niveles de stock
     
-    def transfer_stock(self, product_id: str, from_location_id: str, 
-                      to_location_id: str, quantity: float, notes: str = '') -> Dict:
-        """Transferir stock entre ubicaciones"""
-        return self.create_movement({
-            'productId': product_id,
-            'locationId': from_location_id,
-            'movementType': 'transfer',
-            'quantity': -abs(quantity),
-            'destinationLocationId': to_location_id,
-            'notes': notes
+    Carga los movimientos paginados en un DataFrame columnar con tipos fijos
+    (ids y tipo de movimiento como categorías, cantidades float64, fechas UTC)
+    y calcula valorización, rotación, clasificación ABC, consumo móvil, días
+    de cobertura y puntos de reorden sin bucles por registro en Python.
+    """
+    
+    MOVEMENT_TYPES = ['in', 'out', 'adjustment', 'transfer']
+    
+    def __init__(self, movements: 'pd.DataFrame', stock: 'pd.DataFrame'):
+        if not pd:
+            raise ImportError('InventoryAnalytics requiere pandas: pip install pandas')
+        self.movements = movements
+        self.stock = stock
+    
+    # ==================== CARGA ====================
+    
+    @classmethod
+    def _movement_frame(cls, columns: Dict[str, list]) -> 'pd.DataFrame':
+        frame = pd.DataFrame({
+            'id': columns['id'],
+            'product_id': pd.Categorical(columns['product_id']),
+            'location_id': pd.Categorical(columns['location_id']),
+            'movement_type': pd.Categorical(columns['movement_type'], categories=cls.MOVEMENT_TYPES),
+            'quantity': pd.to_numeric(pd.Series(columns['quantity'], dtype='object'), 
+                                      errors='coerce').fillna(0.0).astype('float64'),
+            'created_at': pd.to_datetime(pd.Series(columns['created_at'], dtype='object'), 
+                                         utc=True, errors='coerce', format='ISO8601')
         })
+        
+        movement_type = frame['movement_type']
+        quantity = frame['quantity'].to_numpy()
+        is_in = (movement_type == 'in').to_numpy()
+        is_out = (movement_type == 'out').to_numpy()
+        is_transfer = (movement_type == 'transfer').to_numpy()
+        
+        # Efecto sobre el stock total del producto (las transferencias no lo cambian)
+        frame['delta'] = np.select([is_in, is_out, is_transfer], 
+                                   [np.abs(quantity), -np.abs(quantity), 0.0], default=quantity)
+        # Consumo: solo salidas
+        frame['outflow'] = np.where(is_out, np.abs(quantity), 0.0)
+        return frame
     
-    def update_stock_batch(self, updates: List[Dict], reference_number: str = '', 
-                          notes: str = '') -> Dict:
-        """Actualizar stock en lote"""
-        return self.request('/inventory/stock/batch-update', 'POST', {
-            'updates': updates,
-            'referenceNumber': reference_number,
-            'notes': notes
+    @staticmethod
+    def _stock_frame(levels: List[Dict]) -> 'pd.DataFrame':
+        products = [level.get('product') or {} for level in levels]
+        return pd.DataFrame({
+            'product_id': pd.Categorical([level.get('productId') for level in levels]),
+            'location_id': pd.Categorical([level.get('locationId') for level in levels]),
+            'quantity': np.array([float(level.get('quantity') or 0) for level in levels], dtype='float64'),
+            'unit_price': np.array([float(product.get('unitPrice') or 0) for product in products], dtype='float64'),
+            'min_stock': np.array([np.nan if level.get('minStock') is None else float(level['minStock']) 
+                                   for level in levels], dtype='float64')
         })
     
-    # ==================== REPORTES ====================
+    @classmethod
+    def from_api(cls, client: InventoryAPI, start_date: str = None, end_date: str = None, 
+                 location_id: str = None, page_size: int = 500) -> 'InventoryAnalytics':
+        """Cargar movimientos (paginados, en streaming) y stock actual desde la API"""
+        if not pd:
+            raise ImportError('InventoryAnalytics requiere pandas: pip install pandas')
+        
+        columns = {name: [] for name in ('id', 'product_id', 'location_id', 'movement_type', 
+                                         'quantity', 'created_at')}
+        for movement in client.iter_movements(location_id=location_id, start_date=start_date, 
+                                              end_date=end_date, page_size=page_size):
+            columns['id'].append(movement.get('id'))
+            columns['product_id'].append(movement.get('productId'))
+            columns['location_id'].append(movement.get('locationId'))
+            columns['movement_type'].append(movement.get('movementType'))
+            columns['quantity'].append(movement.get('quantity'))
+            columns['created_at'].append(movement.get('createdAt'))
+        
+        levels = _records(client.get_stock_levels(location_id=location_id))
+        return cls(cls._movement_frame(columns), cls._stock_frame(levels))
     
-    def get_stock_summary(self, location_id: str = None, category_id: str = None) -> Dict:
-        """Obtener resumen de stock"""
-        params = {}
-        if location_id:
-            params['locationId'] = location_id
-        if category_id:
-            params['categoryId'] = category_id
+    @classmethod
+    def from_snapshot(cls, snapshot: InventorySnapshot) -> 'InventoryAnalytics':
+        """Cargar desde un InventorySnapshot sin llamar a la API"""
+        if not pd:
+            raise ImportError('InventoryAnalytics requiere pandas: pip install pandas')
         
-        return self.request('/reports/stock-summary', params=params)
+        with snapshot._lock:
+            movements = pd.read_sql_query(
+                'SELECT id, product_id, location_id, movement_type, quantity, created_at FROM movements', 
+                snapshot._db)
+            stock = pd.read_sql_query(
+                'SELECT product_id, location_id, quantity, unit_price, min_stock FROM stock_levels', 
+                snapshot._db)
+        
+        stock['product_id'] = stock['product_id'].astype('category')
+        stock['location_id'] = stock['location_id'].astype('category')
+        stock[['quantity', 'unit_price', 'min_stock']] = stock[['quantity', 'unit_price', 'min_stock']].astype('float64')
+        return cls(cls._movement_frame({name: movements[name].tolist() for name in movements.columns}), stock)
     
-    def get_movement_summary(self, start_date: str, end_date: str, 
-                           group_by: str = None) -> Dict:
-        """Obtener resumen de movimientos"""
-        params = {'startDate': start_date, 'endDate': end_date}
-        if group_by:
-            params['groupBy'] = group_by
+    # ==================== AGREGACIONES ====================
+    
+    def _recent(self, days: Optional[float]) -> 'pd.DataFrame':
+        """Movimientos de los últimos ``days`` días (todos si es None)"""
+        if days is None:
+            return self.movements
+        cutoff = pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=days)
+        return self.movements[self.movements['created_at'] >= cutoff]
+    
+    def _unit_prices(self) -> 'pd.Series':
+        return self.stock.groupby('product_id', observed=True)['unit_price'].max()
+    
+    def valuation(self, by: str = None) -> Any:
+        """Valor del inventario total o agrupado por 'product' o 'location'"""
+        stock = self.stock.assign(value=self.stock['quantity'] * self.stock['unit_price'])
+        if by is None:
+            return {
+                'totalValue': float(stock['value'].sum()),
+                'totalQuantity': float(stock['quantity'].sum()),
+                'totalProducts': int(stock['product_id'].nunique())
+            }
+        column = {'product': 'product_id', 'location': 'location_id'}[by]
+        return stock.groupby(column, observed=True)[['quantity', 'value']].sum().sort_values('value', ascending=False)
+    
+    def daily_consumption(self, days: float = None, by: str = 'product') -> 'pd.DataFrame':
+        """Matriz fecha × producto (o producto-ubicación) con las salidas diarias"""
+        movements = self._recent(days)
+        movements = movements[movements['outflow'] > 0]
+        keys = ['product_id'] if by == 'product' else ['product_id', 'location_id']
+        if movements.empty:
+            return pd.DataFrame()
         
-        return self.request('/reports/movement-summary', params=params)
+        daily = (movements.assign(day=movements['created_at'].dt.floor('D'))
+                 .groupby(keys + ['day'], observed=True)['outflow'].sum()
+                 .unstack(keys, fill_value=0.0))
+        end = pd.Timestamp.now(tz='UTC').floor('D')
+        start = end - pd.Timedelta(days=days - 1) if days else daily.index.min()
+        return daily.reindex(pd.date_range(start, end, freq='D'), fill_value=0.0)
     
-    def get_top_products(self, period: str = '30days', product_type: str = 'sold', 
-                        limit: int = 10) -> Dict:
-        """Obtener productos más vendidos/comprados"""
-        params = {'period': period, 'type': product_type, 'limit': limit}
-        return self.request('/reports/top-products', params=params)
+    def rolling_consumption(self, window_days: int = 30, days: float = None, by: str = 'product') -> 'pd.DataFrame':
+        """Consumo diario promedio en una ventana móvil de ``window_days``"""
+        daily = self.daily_consumption(days, by)
+        return daily.rolling(window_days, min_periods=1).mean()
     
-    def export_report(self, report_type: str, format: str = 'csv', **params) -> bytes:
-        """Exportar reporte"""
-        params['format'] = format
+    def turnover(self, days: float = 365) -> 'pd.DataFrame':
+        """Rotación por producto: salidas del período / inventario promedio"""
+        movements = self._recent(days)
+        outflow = movements.groupby('product_id', observed=True)['outflow'].sum()
+        net = movements.groupby('product_id', observed=True)['delta'].sum()
+        closing = self.stock.groupby('product_id', observed=True)['quantity'].sum()
         
-        accept_headers = {
-            'csv': 'text/csv',
-            'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            'pdf': 'application/pdf'
-        }
+        frame = pd.DataFrame({'outflow': outflow, 'closing': closing}).fillna(0.0)
+        frame['opening'] = frame['closing'] - net.reindex(frame.index, fill_value=0.0)
+        frame['average'] = (frame['opening'] + frame['closing']) / 2
+        frame['turnover'] = frame['outflow'] / frame['average'].where(frame['average'] > 0)
+        frame['daysOfInventory'] = days / frame['turnover'].where(frame['turnover'] > 0)
+        return frame.sort_values('turnover', ascending=False)
+    
+    def abc_classification(self, days: float = 365, a_share: float = 0.8, b_share: float = 0.95) -> 'pd.DataFrame':
+        """Clasificación ABC por valor de consumo (salidas × precio unitario)"""
+        outflow = self._recent(days).groupby('product_id', observed=True)['outflow'].sum()
+        prices = self._unit_prices().reindex(outflow.index, fill_value=0.0)
+        frame = pd.DataFrame({'outflow': outflow, 'value': outflow * prices}).sort_values('value', ascending=False)
         
-        headers = {'Accept': accept_headers.get(format, 'application/json')}
+        total = frame['value'].sum()
+        share = frame['value'] / total if total > 0 else frame['value'] * 0.0
+        previous = share.cumsum() - share
+        frame['share'] = share
+        frame['cumulativeShare'] = share.cumsum()
+        frame['class'] = np.where(previous < a_share, 'A', np.where(previous < b_share, 'B', 'C'))
+        return frame
+    
+    def days_of_cover(self, window_days: int = 30) -> 'pd.DataFrame':
+        """Días de cobertura por producto y ubicación según el consumo reciente"""
+        outflow = (self._recent(window_days)
+                   .groupby(['product_id', 'location_id'], observed=True)['outflow'].sum() / window_days)
+        stock = self.stock.groupby(['product_id', 'location_id'], observed=True)['quantity'].sum()
+        frame = pd.DataFrame({'quantity': stock, 'dailyConsumption': outflow}).fillna(0.0)
+        frame['daysOfCover'] = np.where(frame['dailyConsumption'] > 0, 
+                                        frame['quantity'] / frame['dailyConsumption'].where(frame['dailyConsumption'] > 0), 
+                                        np.inf)
+        return frame.sort_values('daysOfCover')
+    
+    def reorder_points(self, lead_time_days: float = 7, service_z: float = 1.65, 
+                       window_days: int = 90) -> 'pd.DataFrame':
+        """Punto de reorden por producto: demanda media × plazo + stock de seguridad"""
+        daily = self.daily_consumption(window_days)
+        stock = self.stock.groupby('product_id', observed=True)['quantity'].sum()
+        if daily.empty:
+            mean = std = pd.Series(0.0, index=stock.index)
+        else:
+            mean, std = daily.mean(), daily.std(ddof=0)
         
-        response = self.session.get(
-            f"{self.base_url}/reports/{report_type}/export",
-            params=params,
-            headers={**self._get_auth_headers(), **headers},
-            timeout=self.timeout
-        )
+        frame = pd.DataFrame({'dailyDemand': mean, 'demandStd': std, 'quantity': stock}).fillna(0.0)
+        frame['safetyStock'] = service_z * frame['demandStd'] * np.sqrt(lead_time_days)
+        frame['reorderPoint'] = frame['dailyDemand'] * lead_time_days + frame['safetyStock']
+        frame['needsReorder'] = frame['quantity'] <= frame['reorderPoint']
+        return frame.sort_values('reorderPoint', ascending=False)
+
+# ==================== RECEPCIÓN DE WEBHOOKS ====================
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Percentil ``q`` (0-100) de una lista ya ordenada, por rango más cercano"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+class WebhookDelivery:
+    """Entrega de webhook verificada y encolada para procesarse"""
+    
+    __slots__ = ('event', 'data', 'delivery_id', 'webhook_id', 'timestamp', 'payload', 'received_at')
+    
+    def __init__(self, event: str, data: Dict, delivery_id: Optional[str], webhook_id: Optional[str], 
+                 timestamp: Optional[int], payload: Dict, received_at: float):
+        self.event = event
+        self.data = data
+        self.delivery_id = delivery_id
+        self.webhook_id = webhook_id
+        self.timestamp = timestamp
+        self.payload = payload
+        self.received_at = received_at  # time.monotonic() al recibirse
+    
+    def __repr__(self):
+        return f'WebhookDelivery({self.event!r}, {self.delivery_id!r})'
+
+class WebhookReceiver:
+    """Receptor de webhooks: verifica, deduplica, confirma y procesa en segundo plano
+    
+    ``receive(body, headers)`` comprueba la firma HMAC (``X-Webhook-Signature``)
+    en tiempo constante y la antigüedad de ``X-Webhook-Timestamp``, descarta
+    entregas repetidas según ``X-Webhook-Delivery`` y encola el evento,
+    devolviendo de inmediato el ``(status, cuerpo)`` que debe responderse. Un
+    grupo acotado de hilos ejecuta los manejadores registrados con ``on()``, de
+    modo que un manejador lento no retrasa la confirmación ni provoca
+    reintentos del servidor. Si la cola está llena se responde 503.
+    
+    Uso con cualquier framework::
+    
+        receiver = WebhookReceiver(secret=os.environ['WEBHOOK_SECRET'])
         
-        if response.ok:
-            return response.content
-        else:
-            raise APIError('EXPORT_ERROR', 'Failed to export report', response.status_code)
+        @receiver.on('inventory.stock.low')
+        def on_low_stock(delivery):
+            ...
+        
+        status, body = receiver.receive(request.get_data(), request.headers)
+    """
     
-    # ==================== ALERTAS ====================
+    def __init__(self, secret: str, max_workers: int = 8, max_queue: int = 10000, 
+                 tolerance: int = 300, dedup_size: int = 100000, codec: JSONCodec = None, 
+                 latency_window: int = 10000):
+        self.secret = secret.encode('utf-8') if isinstance(secret, str) else secret
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.tolerance = tolerance  # Segundos de diferencia admitidos en X-Webhook-Timestamp
+        self.dedup_size = dedup_size
+        self.codec = codec or get_json_codec()
+        self.logger = logging.getLogger(__name__)
+        
+        self._handlers = {}
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = None
+        self._workers = []
+        self._latencies = deque(maxlen=latency_window)
+        self._waits = deque(maxlen=latency_window)
+        self.counters = {
+            'received': 0,
+            'accepted': 0,
+            'duplicates': 0,
+            'rejected': 0,
+            'overloaded': 0,
+            'processed': 0,
+            'failed': 0,
+            'unhandled': 0
+        }
     
-    def get_alerts(self, status: str = None, product_id: str = None) -> List[Dict]:
-        """Obtener alertas"""
-        params = {}
-        if status:
-            params['status'] = status
-        if product_id:
-            params['productId'] = product_id
+    def on(self, event: str, handler: Callable[[WebhookDelivery], Any] = None) -> Callable:
+        """Registra un manejador para un tipo de evento (``'*'`` para todos)
+        
+        Puede usarse como decorador. Los manejadores reciben un WebhookDelivery.
+        """
+        def register(fn):
+            self._handlers.setdefault(event, []).append(fn)
+            return fn
         
-        return self.request('/alerts', params=params)
+        return register(handler) if handler is not None else register
     
-    def create_alert(self, alert_data: Dict) -> Dict:
-        """Crear alerta"""
-        return self.request('/alerts', 'POST', alert_data)
+    def _handlers_for(self, event: str) -> List[Callable]:
+        return self._handlers.get(event, []) + self._handlers.get('*', [])
     
-    def update_alert(self, alert_id: str, alert_data: Dict) -> Dict:
-        """Actualizar alerta"""
-        return self.request(f'/alerts/{alert_id}', 'PUT', alert_data)
+    # ---- Verificación ----
     
-    def delete_alert(self, alert_id: str) -> None:
-        """Eliminar alerta"""
-        self.request(f'/alerts/{alert_id}', 'DELETE')
+    def verify_signature(self, body: bytes, signature: Optional[str]) -> bool:
+        """Comprueba ``sha256=<hex>`` contra el HMAC del cuerpo en tiempo constante"""
+        if not signature:
+            return False
+        expected = 'sha256=' + hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected.encode('ascii'), signature.strip().encode('utf-8', 'replace'))
     
-    def get_active_alerts(self) -> List[Dict]:
-        """Obtener alertas activas"""
-        return self.get_alerts(status='active')
+    def verify_timestamp(self, timestamp: Optional[str], now: float = None) -> bool:
+        """Rechaza entregas fuera de la tolerancia (protección ante repetición)"""
+        try:
+            sent = int(timestamp)
+        except (TypeError, ValueError):
+            return False
+        return abs((now if now is not None else time.time()) - sent) <= self.tolerance
     
-    # ==================== WEBHOOKS ====================
+    def _mark_seen(self, delivery_id: Optional[str]) -> bool:
+        """Registra la entrega; False si ya se había recibido"""
+        if not delivery_id:
+            return True
+        with self._lock:
+            if delivery_id in self._seen:
+                self._seen.move_to_end(delivery_id)
+                return False
+            self._seen[delivery_id] = True
+            if len(self._seen) > self.dedup_size:
+                self._seen.popitem(last=False)
+            return True
     
-    def get_webhooks(self) -> List[Dict]:
-        """Obtener webhooks"""
-        return self.request('/webhooks')
+    def _forget(self, delivery_id: Optional[str]) -> None:
+        if delivery_id:
+            with self._lock:
+                self._seen.pop(delivery_id, None)
     
-    def create_webhook(self, webhook_data: Dict) -> Dict:
-        """Crear webhook"""
-        return self.request('/webhooks', 'POST', webhook_data)
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
     
-    def get_webhook(self, webhook_id: str) -> Dict:
-        """Obtener webhook específico"""
-        return self.request(f'/webhooks/{webhook_id}')
+    def receive(self, body: bytes, headers: Dict[str, str]) -> Tuple[int, Dict]:
+        """Verifica y encola una entrega; devuelve ``(status, cuerpo)`` para responder"""
+        received_at = time.monotonic()
+        headers = {k.lower(): v for k, v in headers.items()}
+        self._count('received')
+        
+        if not self.verify_signature(body, headers.get('x-webhook-signature')):
+            self._count('rejected')
+            return 401, {'error': 'Invalid signature'}
+        timestamp = headers.get('x-webhook-timestamp')
+        if not self.verify_timestamp(timestamp):
+            self._count('rejected')
+            return 401, {'error': 'Request too old'}
+        
+        try:
+            payload = self.codec.decode(body)
+        except Exception:
+            self._count('rejected')
+            return 400, {'error': 'Invalid payload'}
+        if not isinstance(payload, dict):
+            self._count('rejected')
+            return 400, {'error': 'Invalid payload'}
+        
+        delivery_id = headers.get('x-webhook-delivery') or payload.get('deliveryId')
+        if not self._mark_seen(delivery_id):
+            self._count('duplicates')
+            return 200, {'received': True, 'duplicate': True}
+        
+        delivery = WebhookDelivery(
+            event=headers.get('x-webhook-event') or payload.get('event'),
+            data=payload.get('data') or {},
+            delivery_id=delivery_id,
+            webhook_id=headers.get('x-webhook-id') or payload.get('webhookId'),
+            timestamp=int(timestamp),
+            payload=payload,
+            received_at=received_at
+        )
+        if not self._enqueue(delivery):
+            # Sin capacidad: el servidor reintentará más tarde la misma entrega
+            self._forget(delivery_id)
+            self._count('overloaded')
+            return 503, {'error': 'Receiver overloaded'}
+        
+        self._count('accepted')
+        return 200, {'received': True}
     
-    def update_webhook(self, webhook_id: str, webhook_data: Dict) -> Dict:
-        """Actualizar webhook"""
-        return self.request(f'/webhooks/{webhook_id}', 'PUT', webhook_data)
+    # ---- Procesamiento ----
     
-    def delete_webhook(self, webhook_id: str) -> None:
-        """Eliminar webhook"""
-        self.request(f'/webhooks/{webhook_id}', 'DELETE')
+    def start(self) -> 'WebhookReceiver':
+        """Arranca los hilos de trabajo (``receive`` lo hace automáticamente)"""
+        with self._lock:
+            if self._queue is None:
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                for i in range(self.max_workers):
+                    worker = threading.Thread(target=self._work, args=(self._queue,), 
+                                              name=f'webhook-worker-{i}', daemon=True)
+                    worker.start()
+                    self._workers.append(worker)
+        return self
     
-    def test_webhook(self, webhook_id: str, test_data: Dict = None) -> Dict:
-        """Probar webhook"""
-        return self.request(f'/webhooks/{webhook_id}/test', 'POST', test_data or {})
+    def _enqueue(self, delivery: WebhookDelivery) -> bool:
+        if self._queue is None:
+            self.start()
+        try:
+            self._queue.put_nowait(delivery)
+        except queue.Full:
+            return False
+        return True
     
-    def get_webhook_stats(self, webhook_id: str) -> Dict:
-        """Obtener estadísticas de webhook"""
-        return self.request(f'/webhooks/{webhook_id}/stats')
+    def _work(self, work_queue: 'queue.Queue') -> None:
+        while True:
+            delivery = work_queue.get()
+            try:
+                if delivery is None:
+                    return
+                self._dispatch(delivery)
+            finally:
+                work_queue.task_done()
     
-    def get_webhook_logs(self, webhook_id: str, limit: int = 50, offset: int = 0) -> Dict:
-        """Obtener logs de webhook"""
-        params = {'limit': limit, 'offset': offset}
-        return self.request(f'/webhooks/{webhook_id}/logs', params=params)
+    def _dispatch(self, delivery: WebhookDelivery) -> None:
+        started = time.monotonic()
+        handlers = self._handlers_for(delivery.event)
+        if not handlers:
+            self._count('unhandled')
+        else:
+            try:
+                for handler in handlers:
+                    handler(delivery)
+            except Exception:
+                self.logger.exception('Error procesando webhook %s (%s)', delivery.event, delivery.delivery_id)
+                self._count('failed')
+            else:
+                self._count('processed')
+        self._record_latency(delivery, started)
     
-    # ==================== USUARIOS (ADMIN) ====================
+    def _record_latency(self, delivery: WebhookDelivery, started: float) -> None:
+        with self._lock:
+            self._waits.append(started - delivery.received_at)
+            self._latencies.append(time.monotonic() - delivery.received_at)
     
-    def get_users(self, role: str = None, is_active: bool = None) -> List[Dict]:
-        """Obtener usuarios"""
-        params = {}
-        if role:
-            params['role'] = role
-        if is_active is not None:
-            params['isActive'] = str(is_active).lower()
-        
-        return self.request('/users', params=params)
+    def join(self) -> None:
+        """Espera a que se procesen todas las entregas encoladas"""
+        if self._queue is not None:
+            self._queue.join()
     
-    def create_user(self, user_data: Dict) -> Dict:
-        """Crear usuario"""
-        return self.request('/users', 'POST', user_data)
+    def stop(self, drain: bool = True, timeout: float = None) -> None:
+        """Detiene los hilos; con ``drain`` procesa antes lo ya encolado"""
+        with self._lock:
+            work_queue, workers = self._queue, self._workers
+            self._queue, self._workers = None, []
+        if work_queue is None:
+            return
+        if not drain:
+            try:
+                while True:
+                    work_queue.get_nowait()
+                    work_queue.task_done()
+            except queue.Empty:
+                pass
+        for _ in workers:
+            work_queue.put(None)
+        for worker in workers:
+            worker.join(timeout)
     
-    def get_user(self, user_id: str) -> Dict:
-        """Obtener usuario específico"""
-        return self.request(f'/users/{user_id}')
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
     
-    def update_user(self, user_id: str, user_data: Dict) -> Dict:
-        """Actualizar usuario"""
-        return self.request(f'/users/{user_id}', 'PUT', user_data)
+    def stats(self) -> Dict:
+        """Contadores, profundidad de cola y latencias (segundos) desde la recepción"""
+        with self._lock:
+            counters = dict(self.counters)
+            latencies = sorted(self._latencies)
+            waits = sorted(self._waits)
+        return {
+            **counters,
+            'queueDepth': self.queue_depth(),
+            'workers': self.max_workers,
+            'latencyP50': _percentile(latencies, 50),
+            'latencyP99': _percentile(latencies, 99),
+            'latencyMax': latencies[-1] if latencies else None,
+            'queueWaitP50': _percentile(waits, 50),
+            'queueWaitP99': _percentile(waits, 99)
+        }
     
-    def deactivate_user(self, user_id: str) -> Dict:
-        """Desactivar usuario"""
-        return self.request(f'/users/{user_id}/deactivate', 'PATCH')
+    def __enter__(self):
+        return self.start()
     
-    def activate_user(self, user_id: str) -> Dict:
-        """Activar usuario"""
-        return self.request(f'/users/{user_id}/activate', 'PATCH')
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+def _webhook_product_id(delivery: WebhookDelivery) -> Any:
+    """Id de producto de una entrega (``data.product.id`` o ``productId`` anidado)"""
+    data = delivery.data or {}
+    product = data.get('product')
+    if isinstance(product, dict) and product.get('id'):
+        return product['id']
+    if data.get('productId'):
+        return data['productId']
+    for section in ('movement', 'stock', 'stockChange', 'alert'):
+        value = data.get(section)
+        if isinstance(value, dict) and value.get('productId'):
+            return value['productId']
+    return None
+
+class OrderedWebhookReceiver(WebhookReceiver):
+    """WebhookReceiver con orden por producto y micro-lotes
     
-    # ==================== UTILIDADES DE ALTO NIVEL ====================
+    Las entregas se reparten en ``partitions`` colas según ``partition_key``
+    (por defecto el id de producto), cada una atendida por un único hilo: los
+    eventos de un mismo producto se procesan en orden de llegada y los de
+    productos distintos en paralelo. ``max_queue`` limita el total de entregas
+    pendientes entre todas las colas. Cada hilo acumula lo que llega durante
+    ``batch_window`` segundos; los manejadores registrados con ``on_batch()``
+    reciben de una vez la lista de entregas consecutivas del mismo evento y
+    producto (p. ej. todos sus movimientos de los últimos 200 ms), mientras que
+    los de ``on()`` siguen recibiendo una entrega cada vez.
+    """
     
-    def ensure_stock(self, product_id: str, location_id: str, minimum_quantity: float) -> Dict:
-        """Asegurar stock mínimo"""
-        stock = self.get_product_stock(product_id, location_id)
-        current_stock = stock[0]['quantity'] if stock else 0
-        
-        if current_stock < minimum_quantity:
-            needed = minimum_quantity - current_stock
-            self.create_movement({
-                'productId': product_id,
-                'locationId': location_id,
-                'movementType': 'in',
-                'quantity': needed,
-                'notes': f'Reposición automática - mínimo requerido: {minimum_quantity}'
-            })
-            
-            return {'restocked': True, 'quantity': needed}
-        
-        return {'restocked': False, 'currentStock': current_stock}
+    def __init__(self, secret: str, partitions: int = 8, batch_window: float = 0.2, 
+                 max_batch: int = 500, partition_key: Callable[[WebhookDelivery], Any] = None, 
+                 **kwargs):
+        super().__init__(secret, max_workers=partitions, **kwargs)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.partition_key = partition_key or _webhook_product_id
+        self._batch_handlers = {}
+        self._queues = []
+        self._slots = None  # Semáforo con los huecos libres de max_queue (global a las particiones)
+        self.counters['batches'] = 0
     
-    def get_low_stock_products(self, threshold: float = None) -> List[Dict]:
-        """Obtener productos con stock bajo"""
-        params = {'lowStock': True}
-        if threshold:
-            params['threshold'] = threshold
+    def on_batch(self, event: str, handler: Callable[[List[WebhookDelivery]], Any] = None) -> Callable:
+        """Registra un manejador de micro-lotes para un tipo de evento (``'*'`` para todos)"""
+        def register(fn):
+            self._batch_handlers.setdefault(event, []).append(fn)
+            return fn
         
-        return self.get_stock_levels(**params)
+        return register(handler) if handler is not None else register
     
-    def bulk_stock_update(self, updates: List[Dict], batch_size: int = 100) -> List[Dict]:
-        """Actualizar stock en lotes"""
-        results = []
+    def start(self) -> 'OrderedWebhookReceiver':
+        with self._lock:
+            if not self._queues:
+                self._slots = threading.Semaphore(self.max_queue)
+                self._queues = [queue.Queue() for _ in range(self.max_workers)]
+                for i, work_queue in enumerate(self._queues):
+                    worker = threading.Thread(target=self._work, args=(work_queue,), 
+                                              name=f'webhook-partition-{i}', daemon=True)
+                    worker.start()
+                    self._workers.append(worker)
+        return self
+    
+    def _enqueue(self, delivery: WebhookDelivery) -> bool:
+        if not self._queues:
+            self.start()
+        key = self.partition_key(delivery)
+        if key is None:
+            key = delivery.delivery_id
+        if not self._slots.acquire(blocking=False):
+            return False
+        self._queues[hash(key) % len(self._queues)].put(delivery)
+        return True
+    
+    def _work(self, work_queue: 'queue.Queue') -> None:
+        while True:
+            batch = [work_queue.get()]
+            if batch[0] is not None:
+                deadline = time.monotonic() + self.batch_window
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = work_queue.get(timeout=remaining) if remaining > 0 else work_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                    if item is None:
+                        break
+            
+            deliveries = [d for d in batch if d is not None]
+            try:
+                if deliveries:
+                    self._dispatch_batch(deliveries)
+            finally:
+                for _ in deliveries:
+                    self._slots.release()
+                for _ in batch:
+                    work_queue.task_done()
+            if len(deliveries) < len(batch):
+                return
+    
+    def _dispatch_batch(self, deliveries: List[WebhookDelivery]) -> None:
+        started = time.monotonic()
+        self._count('batches')
         
-        for i in range(0, len(updates), batch_size):
-            batch = updates[i:i + batch_size]
-            result = self.update_stock_batch(batch, f'BULK-{int(time.time())}-{i}')
-            results.append(result)
+        groups = OrderedDict()
+        for delivery in deliveries:
+            groups.setdefault(self.partition_key(delivery), []).append(delivery)
+        for items in groups.values():
+            # Tramos consecutivos del mismo evento: respetan el orden dentro del producto
+            run = [items[0]]
+            for delivery in items[1:]:
+                if delivery.event == run[0].event:
+                    run.append(delivery)
+                else:
+                    self._dispatch_run(run)
+                    run = [delivery]
+            self._dispatch_run(run)
         
-        return results
+        for delivery in deliveries:
+            self._record_latency(delivery, started)
     
-    def get_inventory_value(self, location_id: str = None) -> Dict:
-        """Obtener valor total del inventario"""
-        params = {}
-        if location_id:
-            params['locationId'] = location_id
-        
-        summary = self.get_stock_summary(**params)
-        return {
-            'totalValue': summary['totalValue'],
-            'totalProducts': summary['totalProducts'],
-            'averageValue': summary['totalValue'] / summary['totalProducts'] if summary['totalProducts'] > 0 else 0
-        }
+    def _dispatch_run(self, run: List[WebhookDelivery]) -> None:
+        event = run[0].event
+        handlers = self._handlers_for(event)
+        batch_handlers = self._batch_handlers.get(event, []) + self._batch_handlers.get('*', [])
+        if not handlers and not batch_handlers:
+            self._count('unhandled', len(run))
+            return
+        try:
+            for handler in batch_handlers:
+                handler(run)
+            for delivery in run:
+                for handler in handlers:
+                    handler(delivery)
+        except Exception:
+            self.logger.exception('Error procesando %s webhooks %s del producto %s', 
+                                  len(run), event, self.partition_key(run[0]))
+            self._count('failed', len(run))
+        else:
+            self._count('processed', len(run))
     
-    # ==================== CONTEXT MANAGERS ====================
+    def join(self) -> None:
+        for work_queue in self._queues:
+            work_queue.join()
     
-    def __enter__(self):
+    def stop(self, drain: bool = True, timeout: float = None) -> None:
+        with self._lock:
+            queues, workers = self._queues, self._workers
+            self._queues, self._workers = [], []
+        if not drain:
+            for work_queue in queues:
+                try:
+                    while True:
+                        if work_queue.get_nowait() is not None:
+                            self._slots.release()
+                        work_queue.task_done()
+                except queue.Empty:
+                    pass
+        for work_queue in queues:
+            work_queue.put(None)
+        for worker in workers:
+            worker.join(timeout)
+    
+    def queue_depth(self) -> int:
+        return sum(work_queue.qsize() for work_queue in self._queues)
+
+class AsyncWebhookReceiver(WebhookReceiver):
+    """WebhookReceiver sobre asyncio: los manejadores pueden ser corutinas
+    
+    ``receive`` debe llamarse desde el bucle de eventos (p. ej. en un handler
+    de aiohttp); ``max_workers`` tareas consumen la cola. Los manejadores
+    síncronos se ejecutan en el bucle, así que no deben bloquear.
+    """
+    
+    def start(self) -> 'AsyncWebhookReceiver':
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._workers = [asyncio.ensure_future(self._work()) for _ in range(self.max_workers)]
         return self
     
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.access_token:
+    def _enqueue(self, delivery: WebhookDelivery) -> bool:
+        if self._queue is None:
+            self.start()
+        try:
+            self._queue.put_nowait(delivery)
+        except asyncio.QueueFull:
+            return False
+        return True
+    
+    async def _work(self) -> None:
+        work_queue = self._queue
+        while True:
+            delivery = await work_queue.get()
             try:
-                self.logout()
-            except:
-                pass  # Ignorar errores al cerrar sesión
+                if delivery is None:
+                    return
+                await self._dispatch(delivery)
+            finally:
+                work_queue.task_done()
+    
+    async def _dispatch(self, delivery: WebhookDelivery) -> None:
+        started = time.monotonic()
+        handlers = self._handlers_for(delivery.event)
+        if not handlers:
+            self._count('unhandled')
+        else:
+            try:
+                for handler in handlers:
+                    result = handler(delivery)
+                    if asyncio.iscoroutine(result):
+                        await result
+            except Exception:
+                self.logger.exception('Error procesando webhook %s (%s)', delivery.event, delivery.delivery_id)
+                self._count('failed')
+            else:
+                self._count('processed')
+        self._record_latency(delivery, started)
+    
+    async def join(self) -> None:
+        if self._queue is not None:
+            await self._queue.join()
+    
+    async def stop(self, drain: bool = True, timeout: float = None) -> None:
+        work_queue, workers = self._queue, self._workers
+        self._queue, self._workers = None, []
+        if work_queue is None:
+            return
+        if not drain:
+            while not work_queue.empty():
+                work_queue.get_nowait()
+                work_queue.task_done()
+        for _ in workers:
+            await work_queue.put(None)
+        done, pending = await asyncio.wait(workers, timeout=timeout)
+        for task in pending:
+            task.cancel()
+    
+    async def __aenter__(self):
+        return self.start()
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
 
 # ==================== EJEMPLOS DE USO ====================
 
@@ -583,9 +6349,7 @@ def examples():
         print(f'🔗 Webhook configurado: {webhook["id"]}')
         
         # 8. Exportar reporte
-        csv_data = client.export_report('stock-summary', 'csv')
-        with open('stock-summary.csv', 'wb') as f:
-            f.write(csv_data)
+        client.export_report_to('stock-summary', 'stock-summary.csv', 'csv')
         print('📄 Reporte exportado a CSV')
         
     except APIError as e:
@@ -619,6 +6383,17 @@ def example_with_context_manager():
         
         # El logout se hace automáticamente al salir del context
 
+# Ejemplo con cliente asíncrono
+async def example_async_client(product_ids: List[str]):
+    """Ejemplo consultando el stock de muchos productos en paralelo"""
+    
+    async with AsyncInventoryAPI(max_concurrency=50) as client:
+        await client.login('admin@empresa.com', 'password123')
+        
+        # Todas las consultas comparten el pool de conexiones
+        stocks = await asyncio.gather(*(client.get_product_stock(pid) for pid in product_ids))
+        print(f'Stock consultado para {len(stocks)} productos')
+
 # Ejemplo de manejo de webhooks
 class WebhookHandler:
     """Manejador de webhooks"""
@@ -626,6 +6401,17 @@ class WebhookHandler:
     def __init__(self, client: InventoryAPI):
         self.client = client
     
+    def register(self, receiver: WebhookReceiver) -> WebhookReceiver:
+        """Registra los manejadores en un WebhookReceiver para procesarlos en segundo plano"""
+        if isinstance(receiver, OrderedWebhookReceiver):
+            # Una sola reacción por producto y micro-lote: el aviso más reciente
+            receiver.on_batch('inventory.stock.low', lambda run: self.handle_low_stock(run[-1].data))
+        else:
+            receiver.on('inventory.stock.low', lambda delivery: self.handle_low_stock(delivery.data))
+        receiver.on('product.created', lambda delivery: self.handle_product_created(delivery.data))
+        receiver.on('inventory.movement.created', lambda delivery: self.handle_movement_created(delivery.data))
+        return receiver
+    
     def process_webhook(self, webhook_data: Dict):
         """Procesar webhook recibido"""
         event = webhook_data.get('event')